@@ -1,10 +1,115 @@
-from fastapi import FastAPI, Query
+import asyncio
+import hmac
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as PrazoEsgotado
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from folder_analyzer import montar_relatorio_sms
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pathlib import Path
-from os import getlogin
 
-app = FastAPI(title="API - C3", version="1.0")
+# Raiz do projeto no fim do sys.path (sem sombrear os módulos do API/ nem os
+# pacotes instalados): src/utils.py é compartilhado com o dashboard (ver resumo.py)
+RAIZ_PROJETO = str(Path(__file__).resolve().parent.parent)
+if RAIZ_PROJETO not in sys.path:
+    sys.path.append(RAIZ_PROJETO)
+
+from contratos import Contrato, carregar_contratos
+from folder_analyzer import montar_relatorio_sms
+from formatos import MSGPACK, comprimir, compactar_relatorio, escolher_codificacao, escolher_midia, serializar
+from formatos import TAMANHO_MINIMO_COMPRESSAO
+from gabarito import carregar_gabarito
+import metricas
+from notificador import Notificador
+from relatorio_cache import CacheRelatorios, Resultado
+from report_store import CHAVE_CABECALHO, EstadoRelatorio, ReportStore, calcular_etag, etag_confere
+from resumo import CacheCruzamentos, Catalogo, resumir
+from sistema_arquivos import Manifesto, ManifestoInvalido
+from visoes import CacheVisoes, indexar_itens, item_enxuto, relatorio_enxuto
+from watcher import GerenciadorWatchers
+from os import getenv
+
+# Contratos monitorados (IDF_CONTRATOS, ver contratos.py). Cada um tem o seu
+# cache de listagens entre requisições (só diretórios alterados são relidos).
+CONTRATOS = carregar_contratos(getenv("IDF_CONTRATOS"))
+CONTRATO_PADRAO = next(iter(CONTRATOS.values()))
+metricas.registrar_scan_caches({nome: c.cache for nome, c in CONTRATOS.items()})
+
+# IDF_GABARITO=<arquivo .json/.yaml> troca a árvore esperada (padrão: MASTER_TREE).
+# O arquivo é validado e compilado aqui, uma única vez.
+GABARITO = carregar_gabarito(getenv("IDF_GABARITO")) if getenv("IDF_GABARITO") else None
+
+# IDF_ORCAMENTO_DIRETORIO: prazo (s) da listagem de cada diretório no scan.
+# Pasta que estoura o prazo entra como "desconhecida", com a última listagem
+# conhecida, sem travar o resto do relatório (0 = sem prazo).
+ORCAMENTO_DIRETORIO = float(getenv("IDF_ORCAMENTO_DIRETORIO", "5")) or None
+
+# IDF_MANIFESTO_TOKEN: token exigido no PUT /sms/manifesto (Authorization: Bearer <token>).
+# Sem ele, o envio de manifestos fica desligado.
+MANIFESTO_TOKEN = getenv("IDF_MANIFESTO_TOKEN")
+
+# Publicação dos scans de contratos por manifesto: uma de cada vez, para que
+# o scan de um manifesto já substituído nunca publique por cima do mais novo
+LOCK_MANIFESTOS = threading.Lock()
+
+# Inscritos do /sms/stream, avisados a cada versão nova de um mês
+NOTIFICADOR = Notificador()
+
+# Intervalo (s) dos comentários de keep-alive enviados no /sms/stream
+SSE_KEEPALIVE = 15
+
+# Scans sob demanda: requisições simultâneas do mesmo mês compartilham um scan,
+# e o resultado vale por IDF_CACHE_TTL segundos (0 = só coalescência)
+RELATORIOS = CacheRelatorios(ttl=float(getenv("IDF_CACHE_TTL", "15")))
+
+# Catálogo (static/data.json, ou IDF_CATALOGO) cruzado com o relatório no /sms/summary
+CRUZAMENTOS = CacheCruzamentos(Catalogo(getenv("IDF_CATALOGO")) if getenv("IDF_CATALOGO") else Catalogo())
+
+# Relatório enxuto e índice por item, calculados uma vez por versão (ETag) do relatório
+VISOES = CacheVisoes()
+
+# Pool limitado para o /sms/batch (evita dezenas de scans simultâneos no compartilhamento)
+BATCH_POOL = ThreadPoolExecutor(max_workers=int(getenv("IDF_BATCH_WORKERS", "4")), thread_name_prefix="batch")
+
+# Pool limitado para o /sms/contratos (um scan por contrato, em paralelo)
+CONTRATOS_POOL = ThreadPoolExecutor(
+    max_workers=int(getenv("IDF_CONTRATOS_WORKERS", "4")), thread_name_prefix="contratos"
+)
+
+
+def _notificar_mudanca(chave: str, estado: EstadoRelatorio) -> None:
+    NOTIFICADOR.publicar(chave, {"versao": estado.token, "etag": estado.etag})
+
+
+# Último relatório de cada mês, com ETag/versão (GET condicional e /sms/changes)
+REPORTS = ReportStore(ao_mudar=_notificar_mudanca)
+
+# IDF_WATCHER=1 mantém o relatório de cada mês consultado em memória,
+# atualizado por um watcher do sistema de arquivos (ver watcher.py).
+# Meses com inscritos no /sms/stream sempre usam o watcher.
+WATCHER_ATIVO = getenv("IDF_WATCHER", "0") == "1"
+WATCHERS = GerenciadorWatchers(
+    CONTRATO_PADRAO.cache,
+    ao_atualizar=lambda base_path, relatorio: REPORTS.publicar(str(base_path), relatorio),
+    gabarito=GABARITO,
+    orcamento_diretorio=ORCAMENTO_DIRETORIO,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    WATCHERS.parar_todos()
+    BATCH_POOL.shutdown(wait=False, cancel_futures=True)
+    CONTRATOS_POOL.shutdown(wait=False, cancel_futures=True)
+
+
+app = FastAPI(title="API - C3", version="1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,16 +119,515 @@ app.add_middleware(
 )
 
 # Caminho base que será analisado
+def _base_path(month: str, contrato: Contrato = CONTRATO_PADRAO) -> Path:
+    return contrato.pasta_mes(month)
+
+
+def _mes_existe(base_path: Path, contrato: Contrato) -> bool:
+    """No disco, a pasta do mês; num contrato por manifesto, um manifesto já enviado."""
+    return contrato.fs.estado(base_path) is not None
+
+
+def _contrato(nome: str | None) -> Contrato | None:
+    """Contrato do parâmetro ?contrato= (sem ele, o padrão); None se não existir."""
+    return CONTRATOS.get(nome) if nome else CONTRATO_PADRAO
+
+
+def _rotulo_mes(month: str | None) -> str:
+    """Rótulo de mês das métricas: só meses que já geraram relatório, para não criar séries à toa."""
+    if month and any(REPORTS.atual(str(_base_path(month, c))) is not None for c in CONTRATOS.values()):
+        return month
+    return "-"
+
+
+# Compressão das demais respostas (o /sms negocia e guarda o corpo já comprimido)
+app.add_middleware(GZipMiddleware, minimum_size=TAMANHO_MINIMO_COMPRESSAO)
+
+# Latência por endpoint e mês (o /sms/stream fica aberto e não entra)
+app.add_middleware(metricas.MiddlewareLatencia, rotulo_mes=_rotulo_mes, ignorar=("/metrics", "/sms/stream"))
+
+
+def _erro_mes_nao_encontrado(month: str, base_path: Path) -> dict:
+    return {"status": "erro", "messagem": f"O mês '{month}' não foi encontrado em {base_path}"}
+
+
+def _erro_contrato_nao_encontrado(contrato: str) -> dict:
+    return {"status": "erro", "messagem": f"O contrato '{contrato}' não existe (disponíveis: {', '.join(CONTRATOS)})"}
+
+
+def _obter_estado(base_path: Path, contrato: Contrato = CONTRATO_PADRAO) -> Resultado:
+    """
+    Relatório atual do mês (do watcher ou de um scan), já publicado no REPORTS.
+    O valor do Resultado é o EstadoRelatorio; origem/idade vão para os headers.
+    """
+    # Contrato por manifesto não tem watcher: cada envio já publica a versão nova
+    if contrato.por_manifesto:
+        return _obter_estado_manifesto(base_path, contrato)
+
+    chave = str(base_path)
+    if WATCHER_ATIVO or NOTIFICADOR.inscritos(chave):
+        materializado = WATCHERS.obter(base_path, cache=contrato.cache)
+        estado = REPORTS.publicar(chave, materializado.relatorio)
+        metricas.observar_origem("WATCHER")
+        return Resultado(estado, "WATCHER", time.time() - materializado.atualizado_em)
+
+    def _scan() -> EstadoRelatorio:
+        relatorio = montar_relatorio_sms(
+            base_path, cache=contrato.cache, gabarito=GABARITO, orcamento_diretorio=ORCAMENTO_DIRETORIO
+        )
+        return REPORTS.publicar(chave, relatorio)
+
+    resultado = RELATORIOS.obter(chave, _scan)
+    metricas.observar_origem(resultado.origem)
+    return resultado
+
+
+def _obter_estado_manifesto(base_path: Path, contrato: Contrato) -> Resultado:
+    """
+    _obter_estado de um contrato por manifesto. O scan usa o manifesto atual do
+    mês (sem cache de listagens: cada envio vale inteiro, mesmo com os mtimes
+    de antes) e fica no RELATORIOS com a geração do envio na chave, de modo
+    que uma requisição feita depois de um envio nunca aproveita o scan do
+    manifesto anterior.
+    """
+    chave = str(base_path)
+    geracao, manifesto = contrato.fs.atual(base_path)
+
+    def _scan() -> EstadoRelatorio:
+        relatorio = montar_relatorio_sms(
+            base_path, gabarito=GABARITO, orcamento_diretorio=ORCAMENTO_DIRETORIO, fs=manifesto
+        )
+        with LOCK_MANIFESTOS:
+            publicado = REPORTS.atual(chave)
+            if publicado is not None and contrato.fs.atual(base_path)[0] != geracao:
+                return publicado  # um envio mais novo já chegou
+            return REPORTS.publicar(chave, relatorio)
+
+    resultado = RELATORIOS.obter(f"{chave}@{geracao}", _scan)
+    metricas.observar_origem(resultado.origem)
+    return resultado
+
+
+def _etag_variante(etag: str, *variantes: str) -> str:
+    """ETag de uma variante (enxuto, compacto, msgpack...): diferente do ETag do relatório completo."""
+    return etag[:-1] + "".join(f"-{v}" for v in variantes) + '"'
+
+
+def _etag_enxuto(etag: str) -> str:
+    return _etag_variante(etag, "enxuto")
+
+
+def _relatorio_enxuto(estado: EstadoRelatorio) -> dict:
+    return VISOES.obter("enxuto", estado.etag, lambda: relatorio_enxuto(estado.relatorio))
+
+
+def _headers_estado(resultado: Resultado) -> dict:
+    estado: EstadoRelatorio = resultado.valor
+    return {
+        "ETag": estado.etag,
+        "X-Versao-Relatorio": estado.token,
+        "X-Cache": resultado.origem,
+        "Age": str(int(resultado.idade)),
+    }
+
 
 @app.get("/sms")
-def verificar_sms(month: str = Query(..., description="Ex: 10. Outubro ou 11. Novembro")):
+def verificar_sms(
+    month: str = Query(..., description="Ex: 10. Outubro ou 11. Novembro"),
+    contrato: str | None = Query(None, description="Nome do contrato (IDF_CONTRATOS); padrão: o primeiro"),
+    slim: bool = Query(False, description="Sem diretórios/arquivos: só status, contagens e percentuais"),
+    formato: str = Query("padrao", pattern="^(padrao|compacto)$", description="compacto: caminhos dos diretórios numa tabela de segmentos"),
+    if_none_match: str | None = Header(None),
+    accept: str | None = Header(None),
+    accept_encoding: str | None = Header(None),
+):
     """
     Executa a verificação do diretório SMS e retorna o relatório.
+    Responde 304 (sem corpo) se o If-None-Match já corresponde ao ETag atual.
+    O header X-Versao-Relatorio traz o token a usar em /sms/changes.
+    Com slim=true, cada item vem sem 'diretorios' (com os nomes das pastas
+    vazias em 'diretorios_pendentes'); os detalhes de um item ficam em /sms/item/{item_id}.
+
+    Formato negociado (ver formatos.py): msgpack com Accept: application/x-msgpack,
+    brotli/gzip pelo Accept-Encoding. O corpo de cada variante é serializado e
+    comprimido uma vez por versão do relatório.
     """
-    BASE_PATH = Path(fr"C:/Users/{getlogin()}/C3 ENGENHARIA/C3 Engenharia SEDE - 3.1.30 - IDF/{month}")
+    CONTRATO = _contrato(contrato)
+    if CONTRATO is None:
+        return _erro_contrato_nao_encontrado(contrato)
+    BASE_PATH = _base_path(month, CONTRATO)
+
+    if not _mes_existe(BASE_PATH, CONTRATO):
+        return _erro_mes_nao_encontrado(month, BASE_PATH)
+
+    resultado = _obter_estado(BASE_PATH, CONTRATO)
+    estado = resultado.valor
+    midia = escolher_midia(accept)
+    variantes = [v for v, ativa in (("enxuto", slim), ("compacto", formato == "compacto"), ("msgpack", midia == MSGPACK)) if ativa]
+
+    headers = _headers_estado(resultado)
+    headers["ETag"] = _etag_variante(estado.etag, *variantes)
+    headers["Vary"] = "Accept, Accept-Encoding"
+    if etag_confere(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    def _montar_corpo(codificacao):
+        relatorio = _relatorio_enxuto(estado) if slim else estado.relatorio
+        if formato == "compacto":
+            relatorio = compactar_relatorio(relatorio)
+        dados = serializar({"status": "ok", "result": relatorio, "path": str(BASE_PATH)}, midia)
+        if codificacao is None or len(dados) < TAMANHO_MINIMO_COMPRESSAO:
+            return dados, None
+        return comprimir(dados, codificacao), codificacao
+
+    codificacao = escolher_codificacao(accept_encoding)
+    corpo, codificacao = VISOES.obter(
+        f"corpo:{BASE_PATH}:{'-'.join(variantes)}:{codificacao}", estado.etag, lambda: _montar_corpo(codificacao)
+    )
+    if codificacao:
+        headers["Content-Encoding"] = codificacao
+    return Response(corpo, media_type=midia, headers=headers)
+
+
+@app.get("/sms/item/{item_id}")
+def detalhes_item_sms(
+    response: Response,
+    item_id: str,
+    month: str = Query(..., description="Ex: 10. Outubro ou 11. Novembro"),
+    contrato: str | None = Query(None, description="Nome do contrato (IDF_CONTRATOS); padrão: o primeiro"),
+    categoria: str | None = Query(None, description="Ex: Item SMS (só se o mesmo id existir em mais de uma categoria)"),
+):
+    """Um item completo (diretórios e arquivos), para carregar os detalhes sob demanda."""
+    CONTRATO = _contrato(contrato)
+    if CONTRATO is None:
+        return _erro_contrato_nao_encontrado(contrato)
+    BASE_PATH = _base_path(month, CONTRATO)
+
+    if not _mes_existe(BASE_PATH, CONTRATO):
+        return _erro_mes_nao_encontrado(month, BASE_PATH)
+
+    resultado = _obter_estado(BASE_PATH, CONTRATO)
+    estado = resultado.valor
+    if categoria:
+        item = estado.relatorio.get("result", {}).get(categoria, {}).get(item_id)
+    else:
+        categoria, item = VISOES.obter("indice", estado.etag, lambda: indexar_itens(estado.relatorio)).get(
+            item_id, (None, None)
+        )
+    if item is None:
+        return {"status": "erro", "messagem": f"O item '{item_id}' não foi encontrado no mês '{month}'"}
+
+    response.headers.update(_headers_estado(resultado))
+    return {"status": "ok", "versao": estado.token, "categoria": categoria, "item_id": item_id, "item": item}
+
+
+@app.get("/sms/changes")
+def mudancas_sms(
+    response: Response,
+    month: str = Query(..., description="Ex: 10. Outubro ou 11. Novembro"),
+    contrato: str | None = Query(None, description="Nome do contrato (IDF_CONTRATOS); padrão: o primeiro"),
+    since: str = Query(..., description="Token de versão que o cliente já tem (X-Versao-Relatorio)"),
+    slim: bool = Query(False, description="Itens sem diretórios/arquivos, como no /sms?slim=true"),
+):
+    """
+    Retorna só os itens que mudaram desde a versão 'since' e, se mudaram, os
+    campos do relatório fora de "result" ('cabecalho', sempre o conjunto atual
+    inteiro: um campo ausente foi removido).
+    Se 'since' já é a versão atual, responde 304 sem corpo.
+    Se o histórico não cobre essa versão, retorna o relatório completo (tipo "snapshot").
+    """
+    CONTRATO = _contrato(contrato)
+    if CONTRATO is None:
+        return _erro_contrato_nao_encontrado(contrato)
+    BASE_PATH = _base_path(month, CONTRATO)
+
+    if not _mes_existe(BASE_PATH, CONTRATO):
+        return _erro_mes_nao_encontrado(month, BASE_PATH)
+
+    resultado = _obter_estado(BASE_PATH, CONTRATO)
+    estado = resultado.valor
+    headers = _headers_estado(resultado)
+    if slim:
+        headers["ETag"] = _etag_enxuto(estado.etag)
+    etag = headers["ETag"]
+    mudancas = REPORTS.mudancas_desde(str(BASE_PATH), since)
+
+    if mudancas == {}:
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+
+    if mudancas is None:
+        return {
+            "status": "ok",
+            "tipo": "snapshot",
+            "versao": estado.token,
+            "etag": etag,
+            "result": _relatorio_enxuto(estado) if slim else estado.relatorio,
+        }
+
+    campos = mudancas.pop(CHAVE_CABECALHO, None)
+    itens_alterados: dict = {}
+    removidos = []
+    for (categoria, item_id), item in mudancas.items():
+        if item is None:
+            removidos.append([categoria, item_id])
+        else:
+            itens_alterados.setdefault(categoria, {})[item_id] = item_enxuto(item) if slim else item
+
+    delta = {
+        "status": "ok",
+        "tipo": "delta",
+        "versao": estado.token,
+        "etag": etag,
+        "mudancas": itens_alterados,
+        "removidos": removidos,
+    }
+    if campos is not None:
+        delta["cabecalho"] = campos
+    return delta
+
+
+def _lista_parametro(valores: list[str] | None) -> list[str]:
+    """Aceita ?x=a&x=b e ?x=a,b; remove vazios e repetidos mantendo a ordem."""
+    return list(dict.fromkeys(v.strip() for valor in valores or [] for v in valor.split(",") if v.strip()))
+
+
+@app.get("/sms/summary")
+def resumo_sms(
+    response: Response,
+    month: str = Query(..., description="Ex: 10. Outubro ou 11. Novembro"),
+    contrato: str | None = Query(None, description="Nome do contrato (IDF_CONTRATOS); padrão: o primeiro"),
+    setores: list[str] | None = Query(None, description="Filtra por setor (ex.: SMS,QUALIDADE)"),
+    responsaveis: list[str] | None = Query(None, description="Filtra por responsável (qualquer um dos informados)"),
+    if_none_match: str | None = Header(None),
+):
+    """
+    Só os agregados do dashboard (contagens por status, taxa de conclusão e
+    pendências por setor e por responsável), cruzando o relatório com o
+    catálogo. O cruzamento é refeito apenas quando o relatório muda.
+    Responde 304 se o If-None-Match já corresponde ao resumo atual.
+    """
+    CONTRATO = _contrato(contrato)
+    if CONTRATO is None:
+        return _erro_contrato_nao_encontrado(contrato)
+    BASE_PATH = _base_path(month, CONTRATO)
+
+    if not _mes_existe(BASE_PATH, CONTRATO):
+        return _erro_mes_nao_encontrado(month, BASE_PATH)
+
+    resultado = _obter_estado(BASE_PATH, CONTRATO)
+    estado = resultado.valor
+    cruzado = CRUZAMENTOS.obter(str(BASE_PATH), estado.etag, estado.relatorio)
+    resumo = resumir(cruzado, _lista_parametro(setores), _lista_parametro(responsaveis))
+
+    headers = _headers_estado(resultado)
+    headers["ETag"] = calcular_etag(resumo)
+    if etag_confere(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return {"status": "ok", "versao": estado.token, "resumo": resumo}
+
+
+def _relatorio_do_mes(month: str, contrato: Contrato = CONTRATO_PADRAO, slim: bool = False) -> dict:
+    """
+    Relatório de um mês para o /sms/batch e o /sms/contratos, com o tempo
+    gasto; erros ficam no próprio mês.
+    """
+    inicio = time.perf_counter()
+    BASE_PATH = _base_path(month, contrato)
+    try:
+        if not _mes_existe(BASE_PATH, contrato):
+            resultado = _erro_mes_nao_encontrado(month, BASE_PATH)
+        else:
+            obtido = _obter_estado(BASE_PATH, contrato)
+            resultado = {
+                "status": "ok",
+                "result": _relatorio_enxuto(obtido.valor) if slim else obtido.valor.relatorio,
+                "path": str(BASE_PATH),
+                "etag": obtido.valor.etag,
+                "cache": obtido.origem,
+                "idade_s": round(obtido.idade, 1),
+            }
+    except Exception as e:
+        resultado = {"status": "erro", "messagem": f"Falha ao analisar o mês '{month}': {e}"}
+    resultado["duracao_s"] = round(time.perf_counter() - inicio, 4)
+    return resultado
+
+
+@app.get("/sms/batch")
+def verificar_sms_batch(
+    months: list[str] = Query(..., description="Ex: ?months=10. Outubro&months=11. Novembro ou ?months=10. Outubro,11. Novembro"),
+    contrato: str | None = Query(None, description="Nome do contrato (IDF_CONTRATOS); padrão: o primeiro"),
+):
+    """
+    Analisa vários meses em paralelo (pool limitado a IDF_BATCH_WORKERS) e
+    retorna os relatórios por mês. Um mês com erro não impede os demais.
+    """
+    CONTRATO = _contrato(contrato)
+    if CONTRATO is None:
+        return _erro_contrato_nao_encontrado(contrato)
+    meses = _lista_parametro(months)
+
+    inicio = time.perf_counter()
+    futuros = {month: BATCH_POOL.submit(_relatorio_do_mes, month, CONTRATO) for month in meses}
+    resultado = {month: futuro.result() for month, futuro in futuros.items()}
+
+    return {
+        "status": "ok" if all(r["status"] == "ok" for r in resultado.values()) else "parcial",
+        "result": resultado,
+        "duracao_s": round(time.perf_counter() - inicio, 4),
+    }
+
+
+@app.get("/sms/contratos")
+def verificar_sms_contratos(
+    month: str = Query(..., description="Ex: 10. Outubro ou 11. Novembro"),
+    contratos: list[str] | None = Query(None, description="Só estes contratos (ex.: sede,obra-norte); padrão: todos"),
+    slim: bool = Query(True, description="Sem diretórios/arquivos, como no /sms?slim=true"),
+):
+    """
+    O mesmo mês em todos os contratos numa chamada. Os scans rodam em paralelo
+    (pool limitado a IDF_CONTRATOS_WORKERS), cada contrato com o seu cache e o
+    seu prazo ('timeout' em IDF_CONTRATOS): um compartilhamento lento vira
+    status "timeout" só no próprio contrato, sem atrasar a resposta dos demais.
+    O scan que estourou o prazo continua em segundo plano; chamadas dentro do
+    IDF_CACHE_TTL (ou com o watcher ativo) já aproveitam o resultado.
+    """
+    nomes = _lista_parametro(contratos) or list(CONTRATOS)
+    desconhecidos = [nome for nome in nomes if nome not in CONTRATOS]
+    if desconhecidos:
+        return _erro_contrato_nao_encontrado(", ".join(desconhecidos))
+
+    inicio = time.perf_counter()
+    futuros = {nome: CONTRATOS_POOL.submit(_relatorio_do_mes, month, CONTRATOS[nome], slim) for nome in nomes}
+
+    resultado = {}
+    for nome, futuro in futuros.items():
+        contrato = CONTRATOS[nome]
+        restante = contrato.timeout - (time.perf_counter() - inicio)
+        try:
+            resultado[nome] = futuro.result(timeout=max(restante, 0))
+        except PrazoEsgotado:
+            resultado[nome] = {
+                "status": "timeout",
+                "messagem": f"O scan de '{month}' em {contrato.raiz} passou de {contrato.timeout:g}s",
+                "path": str(_base_path(month, contrato)),
+                "duracao_s": round(time.perf_counter() - inicio, 4),
+            }
+
+    return {
+        "status": "ok" if all(r["status"] == "ok" for r in resultado.values()) else "parcial",
+        "month": month,
+        "result": resultado,
+        "duracao_s": round(time.perf_counter() - inicio, 4),
+    }
+
+
+def _erro_envio(status_code: int, mensagem: str) -> JSONResponse:
+    return JSONResponse({"status": "erro", "messagem": mensagem}, status_code=status_code)
+
+
+@app.put("/sms/manifesto")
+async def enviar_manifesto(
+    request: Request,
+    month: str = Query(..., description="Ex: 10. Outubro ou 11. Novembro"),
+    contrato: str | None = Query(None, description="Contrato com \"fonte\": \"manifesto\" (IDF_CONTRATOS)"),
+    authorization: str | None = Header(None),
+):
+    """
+    Recebe o manifesto do mês (JSON ou NDJSON, ver gerar_manifesto.py) de um
+    contrato por manifesto, troca o anterior e já publica o relatório novo:
+    inscritos no /sms/stream são avisados e /sms/changes passa a ter o delta.
+
+    Exige Authorization: Bearer <IDF_MANIFESTO_TOKEN>; sem o token configurado,
+    responde 403. Manifesto malformado: 400.
+    """
+    if not MANIFESTO_TOKEN:
+        return _erro_envio(403, "Envio de manifestos desligado (configure IDF_MANIFESTO_TOKEN)")
+    esquema, _, token = (authorization or "").partition(" ")
+    if esquema.lower() != "bearer" or not hmac.compare_digest(token.encode(), MANIFESTO_TOKEN.encode()):
+        return _erro_envio(401, "Token ausente ou inválido")
+
+    CONTRATO = _contrato(contrato)
+    if CONTRATO is None:
+        return _erro_contrato_nao_encontrado(contrato)
+    if not CONTRATO.por_manifesto:
+        return _erro_envio(400, f"O contrato '{CONTRATO.nome}' é lido do disco e não recebe manifesto")
+    BASE_PATH = _base_path(month, CONTRATO)
+
+    corpo = await request.body()
+    try:
+        manifesto = await run_in_threadpool(Manifesto.de_texto, corpo.decode("utf-8"), BASE_PATH)
+    except (ManifestoInvalido, UnicodeDecodeError) as e:
+        return _erro_envio(400, f"Manifesto inválido: {e}")
+
+    CONTRATO.fs.substituir(BASE_PATH, manifesto)
+    estado = (await run_in_threadpool(_obter_estado, BASE_PATH, CONTRATO)).valor
+    return {"status": "ok", "path": str(BASE_PATH), "versao": estado.token, "etag": estado.etag}
+
+
+@app.get("/sms/stream")
+async def stream_sms(
+    request: Request,
+    month: str = Query(..., description="Ex: 10. Outubro ou 11. Novembro"),
+    contrato: str | None = Query(None, description="Nome do contrato (IDF_CONTRATOS); padrão: o primeiro"),
+):
+    """
+    Server-Sent Events: envia um evento 'versao' logo ao conectar e depois a cada
+    mudança no relatório do mês. Enquanto houver inscritos, o mês fica com o
+    watcher ativo (num contrato por manifesto, a mudança vem de cada envio).
+    O cliente busca o conteúdo em /sms/changes ao ser avisado.
+    """
+    CONTRATO = _contrato(contrato)
+    if CONTRATO is None:
+        return _erro_contrato_nao_encontrado(contrato)
+    BASE_PATH = _base_path(month, CONTRATO)
+
+    if not _mes_existe(BASE_PATH, CONTRATO):
+        return _erro_mes_nao_encontrado(month, BASE_PATH)
+
+    chave = str(BASE_PATH)
+
+    async def eventos():
+        fila = NOTIFICADOR.assinar(chave)
+        try:
+            if CONTRATO.por_manifesto:
+                estado = (await run_in_threadpool(_obter_estado, BASE_PATH, CONTRATO)).valor
+            else:
+                materializado = await run_in_threadpool(WATCHERS.obter, BASE_PATH, CONTRATO.cache)
+                estado = REPORTS.publicar(chave, materializado.relatorio)
+            ultimo_token = estado.token
+            inicial = {"versao": estado.token, "etag": estado.etag}
+            yield f"event: versao\ndata: {json.dumps(inicial)}\n\n"
+
+            while not await request.is_disconnected():
+                try:
+                    evento = await asyncio.wait_for(fila.get(), timeout=SSE_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    # Mantém a conexão e o watcher do mês vivos
+                    if not CONTRATO.por_manifesto:
+                        await run_in_threadpool(WATCHERS.obter, BASE_PATH, CONTRATO.cache)
+                    yield ": keep-alive\n\n"
+                    continue
+                if evento["versao"] == ultimo_token:
+                    continue
+                ultimo_token = evento["versao"]
+                yield f"event: versao\ndata: {json.dumps(evento)}\n\n"
+        finally:
+            NOTIFICADOR.cancelar(chave, fila)
+
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    if not BASE_PATH.exists():
-        return {"status": "erro", "messagem": f"O mês '{month}' não foi encontrado em {BASE_PATH}"}
 
-    relatorio = montar_relatorio_sms(BASE_PATH)
-    return {"status": "ok", "result": relatorio, "path": BASE_PATH}
+@app.get("/metrics", response_class=PlainTextResponse)
+def exportar_metricas():
+    """Métricas no formato de exposição do Prometheus (503 se o prometheus_client não estiver instalado)."""
+    if not metricas.HABILITADO:
+        return PlainTextResponse("prometheus_client não está instalado\n", status_code=503)
+    return Response(metricas.exportar(), media_type=metricas.CONTENT_TYPE_LATEST)
@@ -0,0 +1,212 @@
+"""
+Compara o scan original (rglob + is_dir/iterdir) com o scan em passada única
+(os.scandir): confere que a saída é idêntica e conta as chamadas ao sistema
+de arquivos feitas por cada um.
+
+Uso:
+    python comparar_scan.py "C:/Users/<usuario>/C3 ENGENHARIA/C3 Engenharia SEDE - 3.1.30 - IDF/11. Novembro"
+"""
+import os
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict
+
+from folder_analyzer import (
+    MASTER_TREE,
+    SPECIAL_FILENAME_PATTERN,
+    SPECIAL_FILENAME_STEM,
+    agregar_relatorio,
+    montar_relatorio_sms,
+)
+from gabarito import calculate_item_id, chave_categoria, get_first_num
+
+# Funções do módulo os que geram uma ida ao disco (pathlib também passa por elas)
+FUNCOES_FS = ("stat", "lstat", "scandir", "listdir")
+
+
+# --- SCAN ORIGINAL (só para comparação; o servidor usa montar_relatorio_sms) ---
+def process_master_tree(
+    base_path: Path, 
+    master_node: Dict, 
+    num_X_categoria: str, 
+    new_category_key: str, 
+    special_paths: set, 
+    intermediate_data: Dict, 
+    rel_path_parts: list = None,
+    inherited_flag: bool = False
+):
+    """
+    Etapa 1 do scan original: percorre o MASTER_TREE com is_dir/iterdir em cada
+    nó e acumula o payload de cada pasta-folha em intermediate_data.
+    """
+    if rel_path_parts is None:
+        rel_path_parts = []
+
+    if not master_node: 
+        rel_key = "/".join(rel_path_parts)
+        disk_path = base_path / rel_key
+        item_id = calculate_item_id(num_X_categoria, rel_path_parts)
+        
+        flag_concluido_especial = inherited_flag
+        final_qtd = 0
+        final_diretorio = rel_key
+        final_itens = [] # Inicializa a lista de itens
+
+        if disk_path.is_dir():
+            # Pasta existe
+            all_files = [f for f in disk_path.iterdir() if f.is_file()]
+            real_files = [f for f in all_files if f.stem != SPECIAL_FILENAME_STEM]
+            final_qtd = len(real_files)
+            
+            # --- AQUI: Preenche os itens com os nomes dos arquivos reais ---
+            final_itens = [f.name for f in real_files]
+            
+            if disk_path in special_paths:
+                flag_concluido_especial = True
+            
+            # Se foi justificado e não tem arquivos, conta como 1
+            if flag_concluido_especial and final_qtd == 0:
+                final_qtd = 1
+                final_diretorio = f"{rel_key}/{SPECIAL_FILENAME_STEM}"
+                # Adiciona a justificativa na lista de itens
+                final_itens = [SPECIAL_FILENAME_STEM] 
+        else:
+            # Pasta NÃO existe: Injeção
+            flag_concluido_especial = True
+            final_qtd = 1
+            final_diretorio = f"{rel_key}/{SPECIAL_FILENAME_STEM}"
+            # Adiciona a justificativa na lista de itens
+            final_itens = [SPECIAL_FILENAME_STEM]
+
+        # --- Monta o Payload com a lista de itens ---
+        dir_payload = {
+            "diretorio": final_diretorio, 
+            "qtd": final_qtd,
+            "itens": final_itens, # <--- NOVA VARIÁVEL
+            "flag_concluido": flag_concluido_especial 
+        }
+        
+        if item_id not in intermediate_data[new_category_key]:
+            intermediate_data[new_category_key][item_id] = []
+        intermediate_data[new_category_key][item_id].append(dir_payload)
+
+        return
+
+    # Recursão para subpastas
+    for dir_name, child_node in master_node.items():
+        current_rel_path = rel_path_parts + [dir_name]
+        current_disk_path = base_path / Path("/".join(current_rel_path))
+        
+        current_flag = inherited_flag
+        if current_disk_path.is_dir() and current_disk_path in special_paths:
+            current_flag = True
+        
+        process_master_tree(
+            base_path, 
+            child_node, 
+            num_X_categoria, 
+            new_category_key, 
+            special_paths, 
+            intermediate_data, 
+            current_rel_path,
+            current_flag
+        )
+
+
+def montar_relatorio_sms_legacy(base_path: Path) -> Dict[str, Any]:
+    """
+    Implementação original (pré-scan com rglob + is_dir/iterdir por nó).
+    Mantida apenas como referência para comparar saída e contagem de
+    chamadas ao sistema de arquivos (aqui e em benchmarks/).
+    """
+    # --- PRÉ-SCAN ---
+    special_paths = set()
+    for f in base_path.rglob(SPECIAL_FILENAME_PATTERN):
+        if f.is_file():
+            special_paths.add(f.parent)
+
+    # ETAPA 1: COLETAR DADOS
+    intermediate_data: Dict[str, Any] = {}
+
+    for category_name, category_node in MASTER_TREE.items():
+        num_X_categoria = get_first_num(category_name)
+        if not num_X_categoria: continue
+
+        new_category_key = chave_categoria(category_name)
+        
+        if new_category_key not in intermediate_data:
+            intermediate_data[new_category_key] = {}
+        
+        category_path = base_path / category_name
+        
+        process_master_tree(
+            category_path, 
+            category_node, 
+            num_X_categoria, 
+            new_category_key, 
+            special_paths, 
+            intermediate_data,
+            rel_path_parts=[],
+            inherited_flag=False
+        )
+
+    # --- ETAPA 2: PROCESSAR DADOS ---
+    return agregar_relatorio(intermediate_data, base_path)
+
+
+@contextmanager
+def contar_chamadas_fs():
+    """Substitui temporariamente as funções de FS do módulo os por versões que contam as chamadas."""
+    contagem = Counter()
+    originais = {nome: getattr(os, nome) for nome in FUNCOES_FS}
+
+    def _wrap(nome, fn):
+        def contador(*args, **kwargs):
+            contagem[nome] += 1
+            return fn(*args, **kwargs)
+        return contador
+
+    for nome, fn in originais.items():
+        setattr(os, nome, _wrap(nome, fn))
+    try:
+        yield contagem
+    finally:
+        for nome, fn in originais.items():
+            setattr(os, nome, fn)
+
+
+def medir(funcao, base_path: Path):
+    with contar_chamadas_fs() as contagem:
+        inicio = time.perf_counter()
+        relatorio = funcao(base_path)
+        duracao = time.perf_counter() - inicio
+    return relatorio, contagem, duracao
+
+
+def main(argv):
+    if len(argv) != 2:
+        print(__doc__)
+        return 2
+
+    base_path = Path(argv[1])
+    antigo, contagem_antiga, t_antigo = medir(montar_relatorio_sms_legacy, base_path)
+    novo, contagem_nova, t_novo = medir(montar_relatorio_sms, base_path)
+
+    print(f"{'chamada':<10}{'original':>10}{'scandir':>10}")
+    for nome in FUNCOES_FS:
+        print(f"{nome:<10}{contagem_antiga[nome]:>10}{contagem_nova[nome]:>10}")
+    print(f"{'total':<10}{sum(contagem_antiga.values()):>10}{sum(contagem_nova.values()):>10}")
+    print(f"{'tempo (s)':<10}{t_antigo:>10.4f}{t_novo:>10.4f}")
+
+    if antigo != novo:
+        print("ERRO: os relatórios são diferentes!")
+        return 1
+    print("OK: relatórios idênticos.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
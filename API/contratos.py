@@ -0,0 +1,88 @@
+"""
+Contratos monitorados: cada um tem a sua pasta raiz do IDF (com uma subpasta
+por mês), o seu cache de listagens e o seu prazo de scan.
+
+IDF_CONTRATOS=<arquivo .json> define os contratos:
+
+    {
+        "sede": {"raiz": "C:/Users/fulano/C3 ENGENHARIA/C3 Engenharia SEDE - 3.1.30 - IDF", "timeout": 60},
+        "obra-norte": "//servidor/IDF Obra Norte",
+        "obra-remota": {"raiz": "/obra-remota", "fonte": "manifesto"}
+    }
+
+O valor pode ser só o caminho (prazo padrão: IDF_CONTRATO_TIMEOUT segundos).
+Com "fonte": "manifesto", a API não lê o disco: cada mês é o último manifesto
+enviado (PUT /sms/manifesto com o token IDF_MANIFESTO_TOKEN, gerado com
+gerar_manifesto.py) por uma máquina que enxerga o compartilhamento; a raiz só
+nomeia os caminhos.
+Sem IDF_CONTRATOS, há um único contrato "sede" com a raiz IDF_RAIZ (ou a
+pasta sincronizada do usuário atual). O primeiro contrato é o padrão dos
+endpoints chamados sem ?contrato=.
+"""
+import json
+from os import getenv, getlogin
+from pathlib import Path
+from typing import Dict, NamedTuple
+
+from scan_cache import ScanCache
+from sistema_arquivos import DISCO_LOCAL, ManifestosPorMes, SistemaArquivos
+
+CONTRATO_SEDE = "sede"
+
+FONTE_DISCO = "disco"
+FONTE_MANIFESTO = "manifesto"
+
+# Prazo (s) para o scan de um mês de um contrato no /sms/contratos
+TIMEOUT_PADRAO = float(getenv("IDF_CONTRATO_TIMEOUT", "30"))
+
+
+class ContratosInvalidos(ValueError):
+    """Arquivo de contratos malformado."""
+
+
+class Contrato(NamedTuple):
+    nome: str
+    raiz: Path
+    timeout: float
+    cache: ScanCache  # listagens só deste contrato: um compartilhamento não expulsa o cache de outro
+    fs: SistemaArquivos = DISCO_LOCAL  # de onde vêm as listagens (ver sistema_arquivos.py)
+
+    def pasta_mes(self, month: str) -> Path:
+        return self.raiz / month
+
+    @property
+    def por_manifesto(self) -> bool:
+        return isinstance(self.fs, ManifestosPorMes)
+
+
+def raiz_padrao() -> Path:
+    return Path(getenv("IDF_RAIZ") or fr"C:/Users/{getlogin()}/C3 ENGENHARIA/C3 Engenharia SEDE - 3.1.30 - IDF")
+
+
+def _montar(nome: str, config) -> Contrato:
+    if isinstance(config, str):
+        config = {"raiz": config}
+    if not isinstance(config, dict) or not isinstance(config.get("raiz"), str):
+        raise ContratosInvalidos(f"Contrato '{nome}': informe 'raiz' (caminho da pasta do IDF)")
+    try:
+        timeout = float(config.get("timeout", TIMEOUT_PADRAO))
+    except (TypeError, ValueError):
+        raise ContratosInvalidos(f"Contrato '{nome}': 'timeout' deve ser um número de segundos") from None
+    if timeout <= 0:
+        raise ContratosInvalidos(f"Contrato '{nome}': 'timeout' deve ser positivo")
+    fonte = config.get("fonte", FONTE_DISCO)
+    if fonte not in (FONTE_DISCO, FONTE_MANIFESTO):
+        raise ContratosInvalidos(f"Contrato '{nome}': 'fonte' deve ser '{FONTE_DISCO}' ou '{FONTE_MANIFESTO}'")
+    fs = ManifestosPorMes() if fonte == FONTE_MANIFESTO else DISCO_LOCAL
+    return Contrato(nome, Path(config["raiz"]), timeout, ScanCache(), fs)
+
+
+def carregar_contratos(caminho: str | Path | None = None) -> Dict[str, Contrato]:
+    """Contratos do arquivo JSON, na ordem do arquivo; sem arquivo, só o contrato "sede"."""
+    if not caminho:
+        return {CONTRATO_SEDE: _montar(CONTRATO_SEDE, {"raiz": str(raiz_padrao())})}
+
+    config = json.loads(Path(caminho).read_text(encoding="utf-8"))
+    if not isinstance(config, dict) or not config:
+        raise ContratosInvalidos(f"{caminho}: esperado um objeto JSON {{nome: raiz ou {{raiz, timeout}}}}")
+    return {nome: _montar(nome, valor) for nome, valor in config.items()}
@@ -1,19 +1,21 @@
-import re
+import fnmatch
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as PrazoEsgotado
+from functools import partial
 from pathlib import Path
-from typing import Dict, Any
+from typing import Callable, Dict, Any, NamedTuple, Tuple
 
-# --- HELPERS DE REGEX (sem alteração) ---
-def get_first_num(text: str) -> str | None:
-    match = re.search(r"(\d+)", text)
-    return match.group(1) if match else None
-
-def get_second_num(text: str) -> str | None:
-    match = re.search(r"\d+\.(\d+)", text)
-    return match.group(1) if match else None
-# ------------------------------------
+from gabarito import GabaritoCompilado, compilar_gabarito, norm_nome
+from metricas import observar_scan
+from scan_cache import JANELA_MTIME_INSTAVEL_NS, ScanCache, chave_diretorio
+from sistema_arquivos import DISCO_LOCAL, SistemaArquivos
 
 # --- NOME DO ARQUIVO ESPECIAL ---
 SPECIAL_FILENAME_STEM = "Não houveram registros no período"
+SPECIAL_FILENAME_PATTERN = f"{SPECIAL_FILENAME_STEM}*"
 # ------------------------------------
 
 # --- O "GABARITO" (Corrigido) ---
@@ -130,153 +132,12 @@ MASTER_TREE = {
 }
 # ------------------------------------
 
+# Gabarito padrão, compilado uma única vez no import
+GABARITO_PADRAO = compilar_gabarito(MASTER_TREE)
 
-def calculate_item_id(num_X_categoria, rel_path_parts):
-    # (Função sem alteração)
-    num_X_final, num_Y_final, num_Z_final = "0", "0", "0"
-    subLvl1 = rel_path_parts[0] if len(rel_path_parts) > 0 else ""
-    subLvl2 = rel_path_parts[1] if len(rel_path_parts) > 1 else ""
-
-    if num_X_categoria == "1" or num_X_categoria == "4":
-        num_X_final = num_X_categoria
-        num_Y_match = get_first_num(subLvl1)
-        num_Z_match = get_second_num(subLvl2)
-        if num_Y_match: num_Y_final = num_Y_match
-        if num_Z_match: 
-            num_Z_final = num_Z_match
-        else:
-            num_Z_fallback = get_first_num(subLvl2)
-            if num_Z_fallback: num_Z_final = num_Z_fallback
-    else: 
-        num_X_match = get_first_num(subLvl1)
-        num_Y_match = get_second_num(subLvl1)
-        num_Z_match = get_first_num(subLvl2)
-        if num_X_match: num_X_final = num_X_match
-        if num_Y_match: num_Y_final = num_Y_match
-        if num_Z_match: num_Z_final = num_Z_match
-    
-    return f"{num_X_final}.{num_Y_final}.{num_Z_final}"
-
-
-def process_master_tree(
-    base_path: Path, 
-    master_node: Dict, 
-    num_X_categoria: str, 
-    new_category_key: str, 
-    special_paths: set, 
-    intermediate_data: Dict, 
-    rel_path_parts: list = None,
-    inherited_flag: bool = False
-):
-    # (Função sem alteração)
-    if rel_path_parts is None:
-        rel_path_parts = []
-
-    if not master_node: 
-        rel_key = "/".join(rel_path_parts)
-        disk_path = base_path / rel_key
-        item_id = calculate_item_id(num_X_categoria, rel_path_parts)
-        
-        flag_concluido_especial = inherited_flag
-        final_qtd = 0
-        final_diretorio = rel_key
-        final_itens = [] # Inicializa a lista de itens
-
-        if disk_path.is_dir():
-            # Pasta existe
-            all_files = [f for f in disk_path.iterdir() if f.is_file()]
-            real_files = [f for f in all_files if f.stem != SPECIAL_FILENAME_STEM]
-            final_qtd = len(real_files)
-            
-            # --- AQUI: Preenche os itens com os nomes dos arquivos reais ---
-            final_itens = [f.name for f in real_files]
-            
-            if disk_path in special_paths:
-                flag_concluido_especial = True
-            
-            # Se foi justificado e não tem arquivos, conta como 1
-            if flag_concluido_especial and final_qtd == 0:
-                final_qtd = 1
-                final_diretorio = f"{rel_key}/{SPECIAL_FILENAME_STEM}"
-                # Adiciona a justificativa na lista de itens
-                final_itens = [SPECIAL_FILENAME_STEM] 
-        else:
-            # Pasta NÃO existe: Injeção
-            flag_concluido_especial = True
-            final_qtd = 1
-            final_diretorio = f"{rel_key}/{SPECIAL_FILENAME_STEM}"
-            # Adiciona a justificativa na lista de itens
-            final_itens = [SPECIAL_FILENAME_STEM]
-
-        # --- Monta o Payload com a lista de itens ---
-        dir_payload = {
-            "diretorio": final_diretorio, 
-            "qtd": final_qtd,
-            "itens": final_itens, # <--- NOVA VARIÁVEL
-            "flag_concluido": flag_concluido_especial 
-        }
-        
-        if item_id not in intermediate_data[new_category_key]:
-            intermediate_data[new_category_key][item_id] = []
-        intermediate_data[new_category_key][item_id].append(dir_payload)
-
-        return
-
-    # Recursão para subpastas
-    for dir_name, child_node in master_node.items():
-        current_rel_path = rel_path_parts + [dir_name]
-        current_disk_path = base_path / Path("/".join(current_rel_path))
-        
-        current_flag = inherited_flag
-        if current_disk_path.is_dir() and current_disk_path in special_paths:
-            current_flag = True
-        
-        process_master_tree(
-            base_path, 
-            child_node, 
-            num_X_categoria, 
-            new_category_key, 
-            special_paths, 
-            intermediate_data, 
-            current_rel_path,
-            current_flag
-        )
-
-
-def montar_relatorio_sms(base_path: Path) -> Dict[str, Any]:
-    # --- PRÉ-SCAN ---
-    special_paths = set()
-    for f in base_path.rglob(f"{SPECIAL_FILENAME_STEM}*"):
-        if f.is_file():
-            special_paths.add(f.parent)
-
-    # ETAPA 1: COLETAR DADOS
-    intermediate_data: Dict[str, Any] = {}
-
-    for category_name, category_node in MASTER_TREE.items():
-        num_X_categoria = get_first_num(category_name)
-        if not num_X_categoria: continue
-
-        top_name = re.sub(r"(\d+(?:\.\d+)?)\.?\s*", "", category_name).strip()
-        new_category_key = f'Item {top_name}'
-        
-        if new_category_key not in intermediate_data:
-            intermediate_data[new_category_key] = {}
-        
-        category_path = base_path / category_name
-        
-        process_master_tree(
-            category_path, 
-            category_node, 
-            num_X_categoria, 
-            new_category_key, 
-            special_paths, 
-            intermediate_data,
-            rel_path_parts=[],
-            inherited_flag=False
-        )
 
-    # --- ETAPA 2: PROCESSAR DADOS ---
+def agregar_relatorio(intermediate_data: Dict[str, Any], base_path: Path) -> Dict[str, Any]:
+    """Etapa 2: consolida os diretórios coletados em status/percentual por item (também no scan original, ver comparar_scan.py)."""
     final_report: Dict[str, Any] = {}
     
     for category_key, id_groups in intermediate_data.items():
@@ -288,8 +149,12 @@ def montar_relatorio_sms(base_path: Path) -> Dict[str, Any]:
             count_pastas_preenchidas = 0 
             count_total_pastas = len(diretorios_list)
 
+            pastas_desconhecidas = 0
+
             for dir_payload in diretorios_list:
                 soma_total += dir_payload["qtd"]
+                if dir_payload.get("desconhecido"):
+                    pastas_desconhecidas += 1
                 
                 if dir_payload["qtd"] > 0 or dir_payload["flag_concluido"]:
                     count_pastas_preenchidas += 1
@@ -315,9 +180,352 @@ def montar_relatorio_sms(base_path: Path) -> Dict[str, Any]:
                 "percentual_conclusao": round(percentual_conclusao, 2),
                 "diretorios": diretorios_list
             }
+            if pastas_desconhecidas:
+                # Status calculado com a última listagem conhecida dessas pastas
+                final_report[category_key][item_id]["pastas_desconhecidas"] = pastas_desconhecidas
 
     return {
         "status": "ok",
         "result": final_report,
         "path": str(base_path)
-    }
\ No newline at end of file
+    }
+
+
+# --- SCAN EM PASSADA ÚNICA (os.scandir) ---
+class DirListing(NamedTuple):
+    """Resultado de uma única listagem (os.scandir) de um diretório."""
+    subdirs: frozenset      # nomes dos subdiretórios, normalizados com norm_nome
+    arquivos: tuple         # nomes dos arquivos reais (sem o arquivo especial)
+    especial: bool          # contém algum "Não houveram registros no período*"
+
+
+def _stem(nome: str) -> str:
+    """Equivalente a Path(nome).stem, sem construir um Path."""
+    i = nome.rfind(".")
+    if 0 < i < len(nome) - 1:
+        return nome[:i]
+    return nome
+
+
+def _listar_diretorio(path: str, fs: SistemaArquivos = DISCO_LOCAL) -> DirListing | None:
+    """
+    Lista o diretório uma única vez (no disco, o tipo já vem cacheado no DirEntry).
+    Retorna None se o caminho não existir ou não for um diretório.
+    """
+    subdirs = set()
+    arquivos = []
+    especial = False
+    try:
+        for nome, is_dir in fs.entradas(path):
+            if is_dir:
+                subdirs.add(norm_nome(nome))
+            else:
+                if fnmatch.fnmatch(nome, SPECIAL_FILENAME_PATTERN):
+                    especial = True
+                if _stem(nome) != SPECIAL_FILENAME_STEM:
+                    arquivos.append(nome)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return DirListing(frozenset(subdirs), tuple(arquivos), especial)
+
+
+def _listar_com_cache(
+    cache: ScanCache, raiz: str, path: str, fs: SistemaArquivos = DISCO_LOCAL
+) -> DirListing | None:
+    """
+    Faz só um stat no diretório e reaproveita a listagem do cache se o mtime não mudou.
+    Apenas diretórios alterados desde o último scan voltam a ser listados.
+    """
+    mtime_ns = fs.estado(path)
+    if mtime_ns is None:
+        return None
+
+    chave = chave_diretorio(path)
+    listing = cache.obter(raiz, chave, mtime_ns)
+    if listing is None:
+        listing = _listar_diretorio(path, fs)
+        if listing is not None:
+            cache.guardar(raiz, chave, mtime_ns, listing)
+    return listing
+
+
+# --- ORÇAMENTO POR DIRETÓRIO ---
+# Listagens com prazo rodam num pool por raiz escaneada (fs, pasta do mês):
+# listagens travadas de um compartilhamento só ocupam os workers da própria
+# raiz, sem deixar "desconhecidas" as pastas de outro mês ou contrato. Uma
+# listagem que estoura o prazo continua rodando e, se terminar, alimenta o
+# cache para o próximo scan.
+LISTAGEM_WORKERS = int(os.getenv("IDF_LISTAGEM_WORKERS", "8"))
+
+# Pools sem nenhuma listagem rodando além deste número são encerrados (os mais antigos primeiro)
+MAX_POOLS_OCIOSOS = int(os.getenv("IDF_LISTAGEM_POOLS_OCIOSOS", "16"))
+
+
+class _PoolRaiz:
+    __slots__ = ("executor", "em_voo", "usado_em")
+
+    def __init__(self, nome: str):
+        self.executor = ThreadPoolExecutor(max_workers=LISTAGEM_WORKERS, thread_name_prefix=f"listagem-{nome}")
+        self.em_voo = 0
+        self.usado_em = time.monotonic()
+
+
+_pools_listagem: Dict[Tuple[Any, str], _PoolRaiz] = {}
+# (fs, path) -> listagem ainda rodando (de um scan anterior, inclusive)
+_em_andamento: Dict[Tuple[Any, str], Future] = {}
+_lock_listagem = threading.Lock()
+
+
+def _pool_da_raiz(fs: SistemaArquivos, raiz: str) -> _PoolRaiz:
+    """Pool da raiz (criado sob demanda); chamar com _lock_listagem."""
+    pool = _pools_listagem.get((fs, raiz))
+    if pool is None:
+        ociosos = sorted((p.usado_em, k) for k, p in _pools_listagem.items() if p.em_voo == 0)
+        for _, k in ociosos[: max(len(ociosos) - MAX_POOLS_OCIOSOS + 1, 0)]:
+            _pools_listagem.pop(k).executor.shutdown(wait=False)
+        pool = _pools_listagem[(fs, raiz)] = _PoolRaiz(os.path.basename(raiz))
+    pool.usado_em = time.monotonic()
+    return pool
+
+
+def _iniciar_listagem(
+    listar: Callable[[str], DirListing | None], path: str, fs: SistemaArquivos = DISCO_LOCAL, raiz: str | None = None
+) -> Future:
+    """
+    Começa a listar 'path' no pool da raiz do scan. Um diretório que ainda
+    está sendo listado não gera outra listagem: o scan seguinte espera a
+    mesma, de modo que pastas travadas não esgotam o pool.
+    """
+    with _lock_listagem:
+        chave = (fs, path)
+        futuro = _em_andamento.get(chave)
+        if futuro is not None:
+            return futuro
+        pool = _pool_da_raiz(fs, path if raiz is None else raiz)
+        pool.em_voo += 1
+        futuro = _em_andamento[chave] = pool.executor.submit(listar, path)
+    futuro.add_done_callback(lambda f: _descartar_listagem(chave, f, pool))
+    return futuro
+
+
+def _aguardar_listagem(futuro: Future, orcamento: float, anterior: Callable[[], Any]) -> Tuple[DirListing | None, bool]:
+    """
+    Espera a listagem por no máximo 'orcamento' segundos.
+    Retorna (listagem, False) ou, se o prazo estourar, (anterior(), True): a
+    última listagem conhecida do diretório (ou None) marcada como desconhecida.
+    """
+    try:
+        return futuro.result(timeout=orcamento), False
+    except PrazoEsgotado:
+        return anterior(), True
+
+
+def _descartar_listagem(chave: Tuple[Any, str], futuro: Future, pool: _PoolRaiz) -> None:
+    with _lock_listagem:
+        pool.em_voo -= 1
+        if _em_andamento.get(chave) is futuro:
+            del _em_andamento[chave]
+
+
+def _montar_payload_folha(
+    rel_key: str, listing: DirListing | None, flag_concluido: bool, desconhecido: bool = False
+) -> Dict[str, Any]:
+    """
+    Monta o payload de um diretório-folha (mesmas regras do scan original, ver comparar_scan.py).
+    Um diretório 'desconhecido' (listagem estourou o prazo) usa a última
+    listagem conhecida, se houver, e leva "desconhecido": True.
+    """
+    if desconhecido:
+        payload = _montar_payload_folha(rel_key, listing, flag_concluido) if listing is not None else {
+            "diretorio": rel_key,
+            "qtd": 0,
+            "itens": [],
+            "flag_concluido": flag_concluido,
+        }
+        payload["desconhecido"] = True
+        return payload
+
+    if listing is None:
+        # Pasta NÃO existe: Injeção
+        return {
+            "diretorio": f"{rel_key}/{SPECIAL_FILENAME_STEM}",
+            "qtd": 1,
+            "itens": [SPECIAL_FILENAME_STEM],
+            "flag_concluido": True,
+        }
+
+    final_qtd = len(listing.arquivos)
+    if flag_concluido and final_qtd == 0:
+        # Se foi justificado e não tem arquivos, conta como 1
+        return {
+            "diretorio": f"{rel_key}/{SPECIAL_FILENAME_STEM}",
+            "qtd": 1,
+            "itens": [SPECIAL_FILENAME_STEM],
+            "flag_concluido": True,
+        }
+
+    return {
+        "diretorio": rel_key,
+        "qtd": final_qtd,
+        "itens": list(listing.arquivos),
+        "flag_concluido": flag_concluido,
+    }
+
+
+def montar_relatorio_sms(
+    base_path: Path,
+    cache: ScanCache | None = None,
+    gabarito: GabaritoCompilado | None = None,
+    orcamento_diretorio: float | None = None,
+    fs: SistemaArquivos | None = None,
+    caminhos_desconhecidos: set | None = None,
+) -> Dict[str, Any]:
+    """
+    Monta o relatório percorrendo a árvore do mês uma única vez.
+    Cada diretório do gabarito é listado no máximo uma vez; os arquivos especiais
+    são detectados na mesma listagem (sem pré-scan com rglob).
+
+    Com 'cache', diretórios cujo mtime não mudou desde o último scan custam só
+    um stat: a listagem vem do cache.
+    'gabarito' é a árvore esperada já compilada (padrão: MASTER_TREE).
+
+    Com 'orcamento_diretorio' (segundos), cada listagem tem esse prazo (pasta
+    lenta no compartilhamento, ou ainda sendo baixada pelo OneDrive). A pasta
+    que estoura o prazo entra com a última listagem conhecida (do cache) e a
+    marca "desconhecido"; o item recebe 'pastas_desconhecidas' e o relatório,
+    'diretorios_desconhecidos'. As subpastas de uma pasta sem listagem
+    conhecida também ficam desconhecidas. Sem orçamento, nada disso acontece.
+    'caminhos_desconhecidos', se informado, recebe o caminho (chave_diretorio)
+    de cada diretório desconhecido, para o chamador listá-los de novo.
+
+    'fs' é de onde vêm as listagens (padrão: o disco; ver sistema_arquivos.py
+    para a árvore em memória e o manifesto).
+
+    Os tempos de cada etapa e de cada categoria vão para as métricas (ver metricas.py).
+    """
+    if gabarito is None:
+        gabarito = GABARITO_PADRAO
+    if fs is None:
+        fs = DISCO_LOCAL
+
+    relogio = time.perf_counter
+    inicio = relogio()
+    root = os.fspath(base_path)
+    listar = partial(_listar_com_cache, cache, root, fs=fs) if cache is not None else partial(_listar_diretorio, fs=fs)
+    n_dirs = len(gabarito.dir_path)
+
+    def caminho(i: int) -> str:
+        return root if i < 0 else os.path.join(root, gabarito.dir_path[i])
+
+    if orcamento_diretorio is None:
+        def obter(i: int) -> Tuple[DirListing | None, bool]:
+            return listar(caminho(i)), False
+    else:
+        filhos: list = [[] for _ in range(n_dirs + 1)]  # índice pai + 1 (raiz = -1)
+        for i, pai in enumerate(gabarito.dir_pai):
+            filhos[pai + 1].append(i)
+        pendentes = {-1: _iniciar_listagem(listar, root, fs, root)}
+
+        def obter(i: int) -> Tuple[DirListing | None, bool]:
+            path = caminho(i)
+            anterior = (lambda: cache.ultima(root, chave_diretorio(path))) if cache is not None else (lambda: None)
+            listing, desconhecido = _aguardar_listagem(pendentes.pop(i), orcamento_diretorio, anterior)
+            # Já dispara as subpastas: listagens irmãs rodam em paralelo no pool
+            if listing is not None:
+                for f in filhos[i + 1]:
+                    if gabarito.dir_nome[f] in listing.subdirs:
+                        pendentes[f] = _iniciar_listagem(listar, caminho(f), fs, root)
+            return listing, desconhecido
+
+    root_listing, root_desconhecido = obter(-1)
+
+    # ETAPA 1: LISTAR OS DIRETÓRIOS (pai sempre antes do filho)
+    listings: list = [None] * n_dirs
+    flags = [False] * n_dirs
+    desconhecidos = [False] * n_dirs
+    tempo_categoria = [0.0] * len(gabarito.categorias)
+    visitados, arquivos_vistos = 1, len(root_listing.arquivos) if root_listing is not None else 0
+    for i in range(n_dirs):
+        pai = gabarito.dir_pai[i]
+        listing_pai = root_listing if pai < 0 else listings[pai]
+        if listing_pai is not None and gabarito.dir_nome[i] in listing_pai.subdirs:
+            t0 = relogio()
+            listing, desconhecidos[i] = obter(i)
+            listings[i] = listing
+            tempo_categoria[gabarito.dir_categoria[i]] += relogio() - t0
+            visitados += 1
+            if listing is not None:
+                arquivos_vistos += len(listing.arquivos)
+        elif listing_pai is None and (root_desconhecido if pai < 0 else desconhecidos[pai]):
+            # Pai sem listagem conhecida: não dá para saber se a pasta existe
+            desconhecidos[i] = True
+        flags[i] = (pai >= 0 and flags[pai]) or (
+            gabarito.dir_marca[i] and listings[i] is not None and listings[i].especial
+        )
+
+    fim_listagem = relogio()
+
+    # ETAPA 2: COLETAR AS FOLHAS POR ITEM
+    intermediate_data: Dict[str, Any] = {categoria: {} for categoria in gabarito.categorias}
+    diretorios_por_item = []
+    for cat_idx, item_id in gabarito.itens:
+        diretorios_list: list = []
+        intermediate_data[gabarito.categorias[cat_idx]][item_id] = diretorios_list
+        diretorios_por_item.append(diretorios_list)
+
+    for j, dir_idx in enumerate(gabarito.folha_dir):
+        diretorios_por_item[gabarito.folha_item[j]].append(
+            _montar_payload_folha(gabarito.folha_rel[j], listings[dir_idx], flags[dir_idx], desconhecidos[dir_idx])
+        )
+
+    # --- ETAPA 3: PROCESSAR DADOS ---
+    fim_coleta = relogio()
+    relatorio = agregar_relatorio(intermediate_data, base_path)
+    n_desconhecidos = sum(desconhecidos) + root_desconhecido
+    if n_desconhecidos:
+        relatorio["diretorios_desconhecidos"] = n_desconhecidos
+        if caminhos_desconhecidos is not None:
+            if root_desconhecido:
+                caminhos_desconhecidos.add(chave_diretorio(root))
+            caminhos_desconhecidos.update(chave_diretorio(caminho(i)) for i in range(n_dirs) if desconhecidos[i])
+    fim = relogio()
+
+    observar_scan(
+        fases={"listagem": fim_listagem - inicio, "coleta": fim_coleta - fim_listagem, "agregacao": fim - fim_coleta},
+        categorias=dict(zip(gabarito.categorias, tempo_categoria)),
+        diretorios=visitados,
+        arquivos=arquivos_vistos,
+        desconhecidos=n_desconhecidos,
+    )
+    return relatorio
+
+
+def assinatura_mes(
+    base_path: Path, gabarito: GabaritoCompilado | None = None, fs: SistemaArquivos | None = None
+) -> str | None:
+    """
+    Hash dos mtimes dos diretórios de que o scan do mês depende (a pasta do mês
+    e cada diretório do gabarito) e do próprio gabarito. Criar, remover ou
+    renomear algo que o scan enxerga muda o mtime de um desses diretórios:
+    mesma assinatura, mesmo relatório. Custa um stat por diretório, sem listar.
+
+    Retorna None se a pasta do mês não existir ou se algum diretório mudou há
+    menos de JANELA_MTIME_INSTAVEL_NS (o mtime ainda pode mudar sem que o valor mude).
+    """
+    if gabarito is None:
+        gabarito = GABARITO_PADRAO
+    if fs is None:
+        fs = DISCO_LOCAL
+
+    root = os.fspath(base_path)
+    mtimes = [fs.estado(root)]  # índice i + 1 = diretório i do gabarito
+    if mtimes[0] is None:
+        return None
+    for i, pai in enumerate(gabarito.dir_pai):
+        existe_pai = mtimes[pai + 1] is not None
+        mtimes.append(fs.estado(os.path.join(root, gabarito.dir_path[i])) if existe_pai else None)
+
+    limite = time.time_ns() - JANELA_MTIME_INSTAVEL_NS
+    if any(m is not None and m > limite for m in mtimes):
+        return None
+    return hashlib.blake2b(repr((tuple(gabarito), mtimes)).encode("utf-8"), digest_size=16).hexdigest()
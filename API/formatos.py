@@ -0,0 +1,114 @@
+"""
+Negociação de formato das respostas grandes (/sms).
+
+- Mídia: JSON (orjson quando instalado) ou msgpack (Accept: application/x-msgpack),
+  se o pacote msgpack estiver instalado.
+- Compressão: brotli (se instalado) ou gzip, conforme o Accept-Encoding.
+- Esquema "compacto": os segmentos dos caminhos dos diretórios ficam numa
+  tabela única ('segmentos') e cada diretório vira [índices dos segmentos, qtd, itens],
+  com um quarto elemento true se o diretório estiver "desconhecido" (ver folder_analyzer.py).
+
+orjson, msgpack e brotli são opcionais: sem eles, cai para json/gzip.
+"""
+import gzip
+import json
+from typing import Any, Dict, List
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+JSON = "application/json"
+MSGPACK = "application/x-msgpack"
+ESQUEMA_COMPACTO = "compacto-1"
+
+# Abaixo disso, comprimir não compensa
+TAMANHO_MINIMO_COMPRESSAO = 1024
+
+
+def _aceitos(header: str | None) -> Dict[str, float]:
+    """'br;q=0.9, gzip' -> {'br': 0.9, 'gzip': 1.0} (só valores com q > 0)."""
+    aceitos = {}
+    for parte in (header or "").split(","):
+        token, _, params = parte.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if token and q > 0:
+            aceitos[token.strip().lower()] = q
+    return aceitos
+
+
+def escolher_midia(accept: str | None) -> str:
+    aceitos = _aceitos(accept)
+    if msgpack is not None and (MSGPACK in aceitos or "application/msgpack" in aceitos):
+        return MSGPACK
+    return JSON
+
+
+def escolher_codificacao(accept_encoding: str | None) -> str | None:
+    aceitos = _aceitos(accept_encoding)
+    candidatos = [c for c in (("br",) if brotli is not None else ()) + ("gzip",) if c in aceitos]
+    if not candidatos:
+        return None
+    return max(candidatos, key=lambda c: aceitos[c])  # empate: br, na ordem acima
+
+
+def serializar(conteudo: Any, midia: str) -> bytes:
+    if midia == MSGPACK:
+        return msgpack.packb(conteudo, use_bin_type=True)
+    if orjson is not None:
+        return orjson.dumps(conteudo)
+    return json.dumps(conteudo, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def comprimir(dados: bytes, codificacao: str | None) -> bytes:
+    if codificacao == "br":
+        return brotli.compress(dados, quality=5)
+    if codificacao == "gzip":
+        return gzip.compress(dados, compresslevel=6)
+    return dados
+
+
+def compactar_relatorio(relatorio: Dict[str, Any]) -> Dict[str, Any]:
+    """Relatório no esquema compacto (ver src/formatos.py para o caminho inverso)."""
+    segmentos: List[str] = []
+    indice: Dict[str, int] = {}
+
+    def _caminho(diretorio: str) -> List[int]:
+        ids = []
+        for segmento in diretorio.split("/"):
+            if segmento not in indice:
+                indice[segmento] = len(segmentos)
+                segmentos.append(segmento)
+            ids.append(indice[segmento])
+        return ids
+
+    resultado = {}
+    for categoria, itens in relatorio.get("result", {}).items():
+        resultado[categoria] = {}
+        for item_id, item in itens.items():
+            novo = {k: v for k, v in item.items() if k != "diretorios"}
+            if "diretorios" in item:
+                novo["diretorios"] = [
+                    [_caminho(d["diretorio"]), d["qtd"], d["itens"]] + ([True] if d.get("desconhecido") else [])
+                    for d in item["diretorios"]
+                ]
+            resultado[categoria][item_id] = novo
+
+    return {**relatorio, "esquema": ESQUEMA_COMPACTO, "segmentos": segmentos, "result": resultado}
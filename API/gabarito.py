@@ -0,0 +1,221 @@
+"""
+Gabarito (árvore de pastas esperada) compilado numa tabela plana.
+
+A árvore aninhada (como o MASTER_TREE) é validada e compilada uma única vez,
+quando é carregada. O scan então só percorre arrays: a lista de diretórios a
+listar, em ordem (pai antes do filho), e a lista de folhas com o caminho
+relativo, o item e a categoria já calculados. Nada de recursão, montagem de
+caminhos ou regex por requisição.
+
+O gabarito também pode vir de um arquivo JSON ou YAML com a mesma estrutura
+do MASTER_TREE (pastas-folha como {} ou vazias), para monitorar outros
+contratos sem editar o código.
+"""
+import json
+import os
+import re
+import unicodedata
+from array import array
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Tuple
+
+try:
+    import yaml
+except ImportError:  # PyYAML é opcional: só necessário para gabaritos .yaml/.yml
+    yaml = None
+
+# --- HELPERS DE REGEX (pré-compilados) ---
+_RE_PRIMEIRO_NUM = re.compile(r"(\d+)")
+_RE_SEGUNDO_NUM = re.compile(r"\d+\.(\d+)")
+_RE_PREFIXO_NUMERICO = re.compile(r"(\d+(?:\.\d+)?)\.?\s*")
+
+
+def get_first_num(text: str) -> str | None:
+    match = _RE_PRIMEIRO_NUM.search(text)
+    return match.group(1) if match else None
+
+def get_second_num(text: str) -> str | None:
+    match = _RE_SEGUNDO_NUM.search(text)
+    return match.group(1) if match else None
+# ------------------------------------
+
+
+def calculate_item_id(num_X_categoria, rel_path_parts):
+    num_X_final, num_Y_final, num_Z_final = "0", "0", "0"
+    subLvl1 = rel_path_parts[0] if len(rel_path_parts) > 0 else ""
+    subLvl2 = rel_path_parts[1] if len(rel_path_parts) > 1 else ""
+
+    if num_X_categoria == "1" or num_X_categoria == "4":
+        num_X_final = num_X_categoria
+        num_Y_match = get_first_num(subLvl1)
+        num_Z_match = get_second_num(subLvl2)
+        if num_Y_match: num_Y_final = num_Y_match
+        if num_Z_match:
+            num_Z_final = num_Z_match
+        else:
+            num_Z_fallback = get_first_num(subLvl2)
+            if num_Z_fallback: num_Z_final = num_Z_fallback
+    else:
+        num_X_match = get_first_num(subLvl1)
+        num_Y_match = get_second_num(subLvl1)
+        num_Z_match = get_first_num(subLvl2)
+        if num_X_match: num_X_final = num_X_match
+        if num_Y_match: num_Y_final = num_Y_match
+        if num_Z_match: num_Z_final = num_Z_match
+
+    return f"{num_X_final}.{num_Y_final}.{num_Z_final}"
+
+
+def chave_categoria(category_name: str) -> str:
+    """'1. SMS' -> 'Item SMS'"""
+    top_name = _RE_PREFIXO_NUMERICO.sub("", category_name).strip()
+    return f'Item {top_name}'
+
+
+def norm_nome(nome: str) -> str:
+    """Normaliza um nome para comparação como o sistema de arquivos faria."""
+    return unicodedata.normalize("NFC", os.path.normcase(nome))
+
+
+class GabaritoInvalido(ValueError):
+    pass
+
+
+class GabaritoCompilado(NamedTuple):
+    """
+    Tabelas paralelas (índice i = mesmo diretório/folha em todas).
+
+    Diretórios, em ordem de percurso (o pai sempre vem antes do filho):
+        dir_path:     caminho relativo à pasta do mês
+        dir_pai:      índice do diretório pai (-1 = a própria pasta do mês)
+        dir_nome:     primeiro segmento do nome, normalizado, para procurar na listagem do pai
+        dir_marca:    se o arquivo especial neste diretório marca a subárvore como concluída
+                      (falso nas pastas de categoria, como no scan original)
+        dir_categoria: índice em 'categorias' (para métricas por categoria)
+    Folhas:
+        folha_dir:    índice do diretório da folha
+        folha_rel:    caminho relativo à categoria (vai no campo "diretorio" do relatório)
+        folha_item:   índice em 'itens'
+    Itens, na ordem em que aparecem no relatório:
+        itens:        (índice em 'categorias', item_id)
+        categorias:   chaves das categorias ("Item SMS", ...)
+    """
+    dir_path: Tuple[str, ...]
+    dir_pai: array
+    dir_nome: Tuple[str, ...]
+    dir_marca: Tuple[bool, ...]
+    dir_categoria: array
+    folha_dir: array
+    folha_rel: Tuple[str, ...]
+    folha_item: array
+    itens: Tuple[Tuple[int, str], ...]
+    categorias: Tuple[str, ...]
+
+
+def validar_arvore(arvore: Any) -> Dict[str, Any]:
+    """Confere a estrutura e normaliza folhas vazias (None -> {}). Retorna uma cópia."""
+
+    def _validar(no: Any, caminho: str) -> Dict[str, Any]:
+        if no is None:
+            return {}
+        if not isinstance(no, dict):
+            raise GabaritoInvalido(f"'{caminho}': esperado um objeto com as subpastas, recebido {type(no).__name__}")
+        normalizado = {}
+        for nome, filho in no.items():
+            if not isinstance(nome, str) or not nome.strip():
+                raise GabaritoInvalido(f"'{caminho}': nome de pasta inválido: {nome!r}")
+            partes = nome.replace("\\", "/").split("/")
+            if nome.startswith("/") or any(p in ("", ".", "..") for p in partes):
+                raise GabaritoInvalido(f"'{caminho}': o nome '{nome}' precisa ser um caminho relativo simples")
+            normalizado[nome] = _validar(filho, f"{caminho}/{nome}" if caminho else nome)
+        return normalizado
+
+    arvore = _validar(arvore, "")
+    if not arvore:
+        raise GabaritoInvalido("O gabarito não tem nenhuma categoria")
+    for categoria, no in arvore.items():
+        if not get_first_num(categoria):
+            raise GabaritoInvalido(f"A categoria '{categoria}' precisa começar com um número (ex.: '1. SMS')")
+        if not no:
+            raise GabaritoInvalido(f"A categoria '{categoria}' não tem nenhuma pasta")
+    return arvore
+
+
+def compilar_gabarito(arvore: Dict[str, Any]) -> GabaritoCompilado:
+    """Valida a árvore e gera as tabelas planas usadas pelo scan."""
+    arvore = validar_arvore(arvore)
+
+    dir_path, dir_nome, dir_marca = [], [], []
+    dir_pai, dir_categoria = array("i"), array("i")
+    indice_dir: Dict[str, int] = {}
+    folha_dir, folha_item = array("i"), array("i")
+    folha_rel = []
+    categorias = []
+    itens = []
+    indice_item: Dict[Tuple[int, str], int] = {}
+
+    def _diretorio(pai: int, nome: str, marca: bool, cat_idx: int) -> int:
+        path = nome if pai < 0 else f"{dir_path[pai]}/{nome}"
+        chave = norm_nome(path)
+        if chave not in indice_dir:
+            indice_dir[chave] = len(dir_path)
+            dir_path.append(path)
+            dir_pai.append(pai)
+            dir_nome.append(norm_nome(nome.split("/", 1)[0]))
+            dir_marca.append(marca)
+            dir_categoria.append(cat_idx)
+        return indice_dir[chave]
+
+    def _percorrer(no: Dict, pai: int, num_X: str, cat_idx: int, rel_parts: list):
+        for nome, filho in no.items():
+            atual = _diretorio(pai, nome, marca=True, cat_idx=cat_idx)
+            partes = rel_parts + [nome]
+            if filho:
+                _percorrer(filho, atual, num_X, cat_idx, partes)
+                continue
+            chave_item = (cat_idx, calculate_item_id(num_X, partes))
+            if chave_item not in indice_item:
+                indice_item[chave_item] = len(itens)
+                itens.append(chave_item)
+            folha_dir.append(atual)
+            folha_rel.append("/".join(partes))
+            folha_item.append(indice_item[chave_item])
+
+    for category_name, category_node in arvore.items():
+        chave = chave_categoria(category_name)
+        if chave not in categorias:
+            categorias.append(chave)
+        cat_idx = categorias.index(chave)
+        cat_dir = _diretorio(-1, category_name, marca=False, cat_idx=cat_idx)
+        _percorrer(category_node, cat_dir, get_first_num(category_name), cat_idx, [])
+
+    return GabaritoCompilado(
+        dir_path=tuple(dir_path),
+        dir_pai=dir_pai,
+        dir_nome=tuple(dir_nome),
+        dir_marca=tuple(dir_marca),
+        dir_categoria=dir_categoria,
+        folha_dir=folha_dir,
+        folha_rel=tuple(folha_rel),
+        folha_item=folha_item,
+        itens=tuple(itens),
+        categorias=tuple(categorias),
+    )
+
+
+def carregar_gabarito(caminho: str | Path) -> GabaritoCompilado:
+    """Lê um gabarito em JSON (.json) ou YAML (.yaml/.yml) e já o compila."""
+    caminho = Path(caminho)
+    texto = caminho.read_text(encoding="utf-8")
+
+    if caminho.suffix.lower() in (".yaml", ".yml"):
+        if yaml is None:
+            raise GabaritoInvalido(f"PyYAML não está instalado; não é possível ler {caminho}")
+        arvore = yaml.safe_load(texto)
+    else:
+        arvore = json.loads(texto)
+
+    try:
+        return compilar_gabarito(arvore)
+    except GabaritoInvalido as e:
+        raise GabaritoInvalido(f"{caminho}: {e}") from None
@@ -0,0 +1,42 @@
+"""
+Gera o manifesto (NDJSON: uma entrada por linha, com caminho, tipo, tamanho e
+mtime) da pasta de um mês, para reproduzir o scan offline ou enviá-lo à API
+(PUT /sms/manifesto) a partir de uma máquina que enxerga o compartilhamento.
+
+Uso:
+    python gerar_manifesto.py "C:/Users/<usuario>/C3 ENGENHARIA/C3 Engenharia SEDE - 3.1.30 - IDF/11. Novembro" [saida.ndjson]
+
+Sem arquivo de saída, o manifesto vai para a saída padrão.
+"""
+import json
+import sys
+from pathlib import Path
+
+from sistema_arquivos import listar_manifesto
+
+
+def main(argv):
+    if len(argv) not in (2, 3):
+        print(__doc__)
+        return 2
+
+    pasta = Path(argv[1])
+    if not pasta.is_dir():
+        print(f"ERRO: pasta não encontrada: {pasta}", file=sys.stderr)
+        return 1
+
+    saida = open(argv[2], "w", encoding="utf-8", newline="\n") if len(argv) == 3 else sys.stdout
+    try:
+        n = 0
+        for entrada in listar_manifesto(pasta):
+            saida.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+            n += 1
+    finally:
+        if saida is not sys.stdout:
+            saida.close()
+    print(f"{n} entradas.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,229 @@
+"""
+Gera, sem o servidor, os relatórios de vários meses e contratos de uma vez
+(fechamento do mês, tarefa agendada). Cada mês é um scan (montar_relatorio_sms)
+num processo separado.
+
+Uso:
+    python gerar_relatorios.py --saida relatorios.jsonl
+        [--meses "10. Outubro,11. Novembro"] [--contratos sede,obra-norte]
+        [--raiz "//servidor/IDF Obra Sul"] [--processos 4]
+        [--incremental] [--estado relatorios.estado.json]
+
+Contratos: os do IDF_CONTRATOS (ver contratos.py), ou só os filtrados em
+--contratos. Com --raiz, as pastas avulsas (nome = nome da pasta) no lugar do
+IDF_CONTRATOS, ou junto dos filtrados em --contratos. Contratos por manifesto
+ficam de fora (não há disco para ler). Sem --meses, todas as subpastas de
+cada raiz. IDF_GABARITO vale como na API.
+
+Saída pela extensão:
+- .jsonl: uma linha por mês e contrato, com o relatório completo;
+- .parquet: uma linha por item (contrato, mês, categoria, item_id, status e
+  contagens, sem a lista de diretórios), para planilha/BI. Requer pyarrow.
+
+Com --incremental, cada mês guarda no arquivo de estado a assinatura da sua
+árvore (folder_analyzer.assinatura_mes: só um stat por diretório). Na execução
+seguinte, o mês com a mesma assinatura não é escaneado de novo: o resultado
+anterior vai para a saída com "origem": "anterior".
+
+Código de saída 1 se algum mês falhou.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pyarrow é opcional: sem ele, só .jsonl
+    pyarrow = None
+
+from contratos import carregar_contratos
+from folder_analyzer import assinatura_mes, montar_relatorio_sms
+from gabarito import carregar_gabarito
+from report_store import calcular_etag
+from visoes import item_enxuto
+
+# Gabarito de cada processo do pool, carregado uma vez no inicializador
+_gabarito = None
+
+
+def _iniciar_processo(caminho_gabarito: str | None) -> None:
+    global _gabarito
+    _gabarito = carregar_gabarito(caminho_gabarito) if caminho_gabarito else None
+
+
+def _gerar_mes(contrato: str, month: str, pasta: str, assinatura_anterior: str | None) -> Dict[str, Any]:
+    """Scan de um mês (roda no pool); erros ficam na própria linha."""
+    inicio = time.perf_counter()
+    linha: Dict[str, Any] = {"contrato": contrato, "month": month, "path": pasta}
+    try:
+        assinatura = assinatura_mes(Path(pasta), _gabarito)
+        if assinatura is not None and assinatura == assinatura_anterior:
+            return {**linha, "status": "igual", "assinatura": assinatura}
+        if not os.path.isdir(pasta):
+            return {**linha, "status": "erro", "messagem": f"O mês '{month}' não foi encontrado em {pasta}"}
+        relatorio = montar_relatorio_sms(Path(pasta), gabarito=_gabarito)
+        linha.update(
+            status="ok",
+            origem="scan",
+            gerado_em=datetime.now().isoformat(timespec="seconds"),
+            assinatura=assinatura,
+            etag=calcular_etag(relatorio),
+            result=relatorio,
+        )
+    except Exception as e:
+        linha.update(status="erro", messagem=f"Falha ao analisar o mês '{month}': {e}")
+    linha["duracao_s"] = round(time.perf_counter() - inicio, 4)
+    return linha
+
+
+def _tarefas(args) -> List[Tuple[str, str, str]]:
+    """(contrato, mês, pasta do mês) de cada scan, na ordem da saída."""
+    contratos: Dict[str, Path] = {}
+    if args.contratos or not args.raiz:
+        configurados = carregar_contratos(os.getenv("IDF_CONTRATOS"))
+        contratos = {nome: c.raiz for nome, c in configurados.items() if not c.por_manifesto}
+    if args.contratos:
+        filtro = [nome.strip() for nome in args.contratos.split(",") if nome.strip()]
+        desconhecidos = [nome for nome in filtro if nome not in contratos]
+        if desconhecidos:
+            raise SystemExit(f"Contratos inexistentes (ou por manifesto): {', '.join(desconhecidos)}")
+        contratos = {nome: contratos[nome] for nome in filtro}
+    for raiz in args.raiz:
+        contratos[Path(raiz).name] = Path(raiz)
+
+    meses = [m.strip() for m in args.meses.split(",") if m.strip()] if args.meses else None
+    tarefas = []
+    for nome, raiz in contratos.items():
+        if meses is not None:
+            tarefas.extend((nome, mes, str(raiz / mes)) for mes in meses)
+        elif raiz.is_dir():
+            tarefas.extend((nome, p.name, str(p)) for p in sorted(raiz.iterdir(), key=lambda p: p.name) if p.is_dir())
+        else:
+            print(f"AVISO: raiz do contrato '{nome}' não encontrada: {raiz}", file=sys.stderr)
+    return tarefas
+
+
+def _linhas_por_item(linhas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Uma linha por item, só com os campos escalares (formato do .parquet)."""
+    saida = []
+    for linha in linhas:
+        if linha["status"] != "ok":
+            continue
+        for categoria, itens in linha["result"].get("result", {}).items():
+            for item_id, item in itens.items():
+                enxuto = item_enxuto(item)
+                saida.append({
+                    "contrato": linha["contrato"],
+                    "month": linha["month"],
+                    "categoria": categoria,
+                    "item_id": item_id,
+                    "status": enxuto.get("status"),
+                    "soma_total": enxuto.get("soma_total"),
+                    "previsao_pastas": enxuto.get("previsao_pastas"),
+                    "percentual_conclusao": enxuto.get("percentual_conclusao"),
+                    "pastas_pendentes": enxuto.get("pastas_pendentes"),
+                    "pastas_desconhecidas": enxuto.get("pastas_desconhecidas", 0),
+                    "gerado_em": linha["gerado_em"],
+                })
+    return saida
+
+
+def _escrever(saida: Path, linhas: List[Dict[str, Any]]) -> None:
+    """Grava num arquivo temporário e troca no fim: uma execução interrompida não deixa saída pela metade."""
+    temporario = saida.with_name(saida.name + ".tmp")
+    if saida.suffix.lower() == ".parquet":
+        pyarrow.parquet.write_table(pyarrow.Table.from_pylist(_linhas_por_item(linhas)), temporario)
+    else:
+        with open(temporario, "w", encoding="utf-8", newline="\n") as f:
+            for linha in linhas:
+                f.write(json.dumps(linha, ensure_ascii=False) + "\n")
+    os.replace(temporario, saida)
+
+
+def _carregar_estado(caminho: Path) -> Dict[str, Any]:
+    try:
+        return json.loads(caminho.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+    except ValueError:
+        print(f"AVISO: estado ilegível em {caminho}; todos os meses serão escaneados", file=sys.stderr)
+        return {}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Relatórios de vários meses/contratos, sem o servidor.")
+    parser.add_argument("--saida", required=True, help="Arquivo .jsonl ou .parquet")
+    parser.add_argument("--meses", help="Meses separados por vírgula (padrão: todas as subpastas de cada raiz)")
+    parser.add_argument("--contratos", help="Só estes contratos do IDF_CONTRATOS, separados por vírgula")
+    parser.add_argument("--raiz", action="append", default=[], help="Pasta raiz avulsa (pode repetir)")
+    parser.add_argument("--processos", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--incremental", action="store_true", help="Não escaneia de novo os meses sem mudança")
+    parser.add_argument("--estado", help="Arquivo de estado do --incremental (padrão: <saida>.estado.json)")
+    args = parser.parse_args(argv)
+
+    saida = Path(args.saida)
+    if saida.suffix.lower() not in (".jsonl", ".parquet"):
+        parser.error("--saida deve terminar em .jsonl ou .parquet")
+    if saida.suffix.lower() == ".parquet" and pyarrow is None:
+        parser.error("pyarrow não está instalado; use .jsonl")
+    caminho_estado = Path(args.estado) if args.estado else saida.with_name(saida.name + ".estado.json")
+    anteriores = _carregar_estado(caminho_estado) if args.incremental else {}
+
+    tarefas = _tarefas(args)
+    if not tarefas:
+        print("Nenhum mês para gerar.", file=sys.stderr)
+        return 0
+
+    inicio = time.perf_counter()
+    linhas: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    with ProcessPoolExecutor(
+        max_workers=max(1, min(args.processos, len(tarefas))),
+        initializer=_iniciar_processo,
+        initargs=(os.getenv("IDF_GABARITO"),),
+    ) as pool:
+        futuros = {}
+        for contrato, month, pasta in tarefas:
+            anterior = anteriores.get(f"{contrato}/{month}", {})
+            futuros[pool.submit(_gerar_mes, contrato, month, pasta, anterior.get("assinatura"))] = (contrato, month)
+        for futuro in as_completed(futuros):
+            contrato, month = futuros[futuro]
+            linha = futuro.result()
+            if linha["status"] == "igual":
+                linha = {**anteriores[f"{contrato}/{month}"]["linha"], "origem": "anterior"}
+            linhas[contrato, month] = linha
+            print(f"  {contrato:<16}{month:<20}{linha['status']:<6}{linha.get('origem', '')}", file=sys.stderr)
+
+    ordenadas = [linhas[contrato, month] for contrato, month, _ in tarefas]
+    _escrever(saida, ordenadas)
+
+    if args.incremental:
+        # Só meses com assinatura estável entram no estado; os demais são escaneados de novo
+        estado = {
+            f"{linha['contrato']}/{linha['month']}": {
+                "assinatura": linha["assinatura"],
+                "linha": {**linha, "origem": "scan"},
+            }
+            for linha in ordenadas
+            if linha["status"] == "ok" and linha.get("assinatura")
+        }
+        caminho_estado.write_text(json.dumps(estado, ensure_ascii=False), encoding="utf-8")
+
+    falhas = sum(1 for linha in ordenadas if linha["status"] != "ok")
+    reaproveitados = sum(1 for linha in ordenadas if linha.get("origem") == "anterior")
+    print(
+        f"{len(ordenadas)} meses ({reaproveitados} sem mudança, {falhas} com erro) "
+        f"em {time.perf_counter() - inicio:.2f}s -> {saida}",
+        file=sys.stderr,
+    )
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
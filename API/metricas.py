@@ -0,0 +1,149 @@
+"""
+Métricas no formato do Prometheus, expostas em /metrics.
+
+Usa o prometheus_client quando instalado; sem ele, as funções de registro
+viram no-op e o /metrics responde 503. O custo por scan é de algumas
+observações em histogramas (microssegundos), então pode ficar ligado em
+produção. Os rótulos são de cardinalidade fixa: fases, categorias do
+gabarito, contratos configurados e meses existentes.
+"""
+import time
+from typing import Any, Dict
+from urllib.parse import parse_qs
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+    from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+except ImportError:  # prometheus_client é opcional: sem ele não há /metrics
+    REGISTRY = None
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+HABILITADO = REGISTRY is not None
+
+# Scans levam de milissegundos (cache quente) a dezenas de segundos (compartilhamento frio)
+BUCKETS_SCAN = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+if HABILITADO:
+    SCAN_FASE = Histogram(
+        "idf_scan_fase_segundos",
+        "Duração de cada fase do montar_relatorio_sms",
+        ["fase"],
+        buckets=BUCKETS_SCAN,
+    )
+    SCAN_CATEGORIA = Histogram(
+        "idf_scan_categoria_segundos",
+        "Tempo de listagem dos diretórios de cada categoria num scan",
+        ["categoria"],
+        buckets=BUCKETS_SCAN,
+    )
+    SCAN_DIRETORIOS = Counter("idf_scan_diretorios_visitados", "Diretórios do gabarito listados (ou lidos do cache)")
+    SCAN_ARQUIVOS = Counter("idf_scan_arquivos_vistos", "Arquivos reais encontrados nas listagens")
+    SCAN_DESCONHECIDOS = Counter(
+        "idf_scan_diretorios_desconhecidos", "Diretórios cuja listagem estourou o orçamento (entraram como desconhecidos)"
+    )
+    RELATORIOS_ORIGEM = Counter(
+        "idf_relatorio_obtido",
+        "Relatórios entregues, por origem (HIT, MISS, COALESCED, WATCHER)",
+        ["origem"],
+    )
+    REQUISICAO = Histogram(
+        "idf_requisicao_segundos",
+        "Latência das requisições por endpoint e mês",
+        ["endpoint", "mes"],
+        buckets=BUCKETS_SCAN,
+    )
+
+
+def observar_scan(
+    fases: Dict[str, float], categorias: Dict[str, float], diretorios: int, arquivos: int, desconhecidos: int = 0
+) -> None:
+    """Registra um scan: duração por fase e por categoria, diretórios e arquivos vistos e os que estouraram o prazo."""
+    if not HABILITADO:
+        return
+    for fase, segundos in fases.items():
+        SCAN_FASE.labels(fase).observe(segundos)
+    for categoria, segundos in categorias.items():
+        SCAN_CATEGORIA.labels(categoria).observe(segundos)
+    SCAN_DIRETORIOS.inc(diretorios)
+    SCAN_ARQUIVOS.inc(arquivos)
+    SCAN_DESCONHECIDOS.inc(desconhecidos)
+
+
+def observar_origem(origem: str) -> None:
+    if HABILITADO:
+        RELATORIOS_ORIGEM.labels(origem).inc()
+
+
+def observar_requisicao(endpoint: str, mes: str, segundos: float) -> None:
+    if HABILITADO:
+        REQUISICAO.labels(endpoint, mes).observe(segundos)
+
+
+class _ColetorScanCache:
+    """Lê os contadores dos ScanCache (um por contrato) só na hora da coleta (nada no caminho do scan)."""
+
+    def __init__(self, caches: Dict[str, Any]):
+        self.caches = caches
+
+    def collect(self):
+        consultas = CounterMetricFamily(
+            "idf_scan_cache_consultas", "Consultas ao ScanCache por resultado", labels=["contrato", "resultado"]
+        )
+        taxa = GaugeMetricFamily(
+            "idf_scan_cache_taxa_acerto", "Fração das consultas ao ScanCache atendidas pelo cache", labels=["contrato"]
+        )
+        entradas = GaugeMetricFamily("idf_scan_cache_entradas", "Listagens guardadas no ScanCache", labels=["contrato"])
+        for contrato, cache in self.caches.items():
+            stats = cache.estatisticas()
+            consultas.add_metric([contrato, "hit"], stats["hits"])
+            consultas.add_metric([contrato, "miss"], stats["misses"])
+            total = stats["hits"] + stats["misses"]
+            taxa.add_metric([contrato], stats["hits"] / total if total else 0.0)
+            entradas.add_metric([contrato], stats["entradas"])
+        yield consultas
+        yield taxa
+        yield entradas
+
+
+def registrar_scan_caches(caches: Dict[str, Any]) -> None:
+    """Expõe os ScanCache por contrato (nome -> cache)."""
+    if HABILITADO:
+        REGISTRY.register(_ColetorScanCache(caches))
+
+
+def exportar() -> bytes:
+    """Texto de exposição do Prometheus com todas as métricas registradas."""
+    return generate_latest(REGISTRY)
+
+
+class MiddlewareLatencia:
+    """
+    Middleware ASGI que mede cada requisição HTTP por endpoint (rota do FastAPI)
+    e mês. 'rotulo_mes' recebe o parâmetro month e devolve o rótulo a usar,
+    para que valores arbitrários não criem séries novas. Caminhos em 'ignorar'
+    (ex.: o próprio /metrics e o stream SSE, que fica aberto) não são medidos.
+    """
+
+    def __init__(self, app, rotulo_mes, ignorar=("/metrics",)):
+        self.app = app
+        self.rotulo_mes = rotulo_mes
+        self.ignorar = frozenset(ignorar)
+
+    async def __call__(self, scope, receive, send):
+        if not HABILITADO or scope["type"] != "http" or scope["path"] in self.ignorar:
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            rota = scope.get("route")
+            endpoint = getattr(rota, "path", "desconhecido")
+            mes = self.rotulo_mes(_parametro(scope, "month")) if endpoint != "desconhecido" else "-"
+            REQUISICAO.labels(endpoint, mes).observe(time.perf_counter() - inicio)
+
+
+def _parametro(scope, nome: str) -> str | None:
+    valores = parse_qs(scope.get("query_string", b"").decode("latin-1")).get(nome)
+    return valores[0] if valores else None
@@ -0,0 +1,54 @@
+"""
+Publicação de "o relatório do mês mudou" para os clientes inscritos no /sms/stream.
+
+As mudanças são detectadas em threads (watcher, scans do threadpool) e os
+inscritos são geradores assíncronos do event loop do servidor; a ponte entre
+os dois é feita com loop.call_soon_threadsafe. Cada inscrito guarda só o
+evento mais recente: um cliente lento recebe a última versão, não a fila toda.
+"""
+import asyncio
+import threading
+from typing import Any, Dict, Set, Tuple
+
+
+class Notificador:
+    def __init__(self):
+        # chave (pasta do mês) -> {(loop, fila)}
+        self._inscritos: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self._lock = threading.Lock()
+
+    def assinar(self, chave: str) -> asyncio.Queue:
+        """Deve ser chamado de dentro do event loop que vai consumir a fila."""
+        fila: asyncio.Queue = asyncio.Queue(maxsize=1)
+        with self._lock:
+            self._inscritos.setdefault(chave, set()).add((asyncio.get_running_loop(), fila))
+        return fila
+
+    def cancelar(self, chave: str, fila: asyncio.Queue) -> None:
+        with self._lock:
+            inscritos = self._inscritos.get(chave, set())
+            for par in [p for p in inscritos if p[1] is fila]:
+                inscritos.discard(par)
+            if not inscritos:
+                self._inscritos.pop(chave, None)
+
+    def inscritos(self, chave: str) -> int:
+        with self._lock:
+            return len(self._inscritos.get(chave, ()))
+
+    def publicar(self, chave: str, evento: Any) -> None:
+        """Pode ser chamado de qualquer thread."""
+        with self._lock:
+            destinos = list(self._inscritos.get(chave, ()))
+        for loop, fila in destinos:
+            try:
+                loop.call_soon_threadsafe(_substituir, fila, evento)
+            except RuntimeError:  # loop já encerrado
+                self.cancelar(chave, fila)
+
+
+def _substituir(fila: asyncio.Queue, evento: Any) -> None:
+    """Mantém só o evento mais recente na fila."""
+    while not fila.empty():
+        fila.get_nowait()
+    fila.put_nowait(evento)
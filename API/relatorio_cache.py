@@ -0,0 +1,83 @@
+"""
+Cache com TTL + coalescência ("single-flight") dos scans por mês.
+
+Requisições simultâneas para o mesmo mês compartilham um único scan em
+andamento em vez de cada uma disparar o seu; o resultado fica valendo por
+'ttl' segundos para as requisições seguintes.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, NamedTuple
+
+# Origem do valor devolvido por CacheRelatorios.obter
+HIT = "HIT"              # veio do cache, dentro do TTL
+MISS = "MISS"            # esta requisição fez o scan
+COALESCED = "COALESCED"  # esperou o scan que outra requisição já estava fazendo
+
+
+class Resultado(NamedTuple):
+    valor: Any
+    origem: str
+    idade: float  # segundos desde que o valor foi produzido
+
+
+class _Voo:
+    """Um scan em andamento, aguardado por todas as requisições do mesmo mês."""
+
+    def __init__(self):
+        self.pronto = threading.Event()
+        self.valor: Any = None
+        self.erro: BaseException | None = None
+        self.produzido_em = 0.0
+
+
+class CacheRelatorios:
+    def __init__(self, ttl: float = 15.0):
+        self.ttl = ttl
+        self._valores: Dict[str, tuple] = {}  # chave -> (valor, produzido_em)
+        self._voos: Dict[str, _Voo] = {}
+        self._lock = threading.Lock()
+
+    def obter(self, chave: str, produzir: Callable[[], Any]) -> Resultado:
+        with self._lock:
+            agora = time.monotonic()
+            guardado = self._valores.get(chave)
+            if guardado is not None and agora - guardado[1] < self.ttl:
+                return Resultado(guardado[0], HIT, agora - guardado[1])
+
+            voo = self._voos.get(chave)
+            lider = voo is None
+            if lider:
+                voo = _Voo()
+                self._voos[chave] = voo
+
+        if not lider:
+            voo.pronto.wait()
+            if voo.erro is not None:
+                raise voo.erro
+            return Resultado(voo.valor, COALESCED, time.monotonic() - voo.produzido_em)
+
+        try:
+            voo.valor = produzir()
+        except BaseException as e:
+            voo.erro = e
+            raise
+        finally:
+            voo.produzido_em = time.monotonic()
+            with self._lock:
+                del self._voos[chave]
+                # Descarta os meses já expirados para o dicionário não crescer à toa
+                for expirada in [c for c, (_, t) in self._valores.items() if voo.produzido_em - t >= self.ttl]:
+                    del self._valores[expirada]
+                if voo.erro is None and self.ttl > 0:
+                    self._valores[chave] = (voo.valor, voo.produzido_em)
+            voo.pronto.set()
+
+        return Resultado(voo.valor, MISS, 0.0)
+
+    def invalidar(self, chave: str | None = None) -> None:
+        with self._lock:
+            if chave is None:
+                self._valores.clear()
+            else:
+                self._valores.pop(chave, None)
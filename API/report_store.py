@@ -0,0 +1,174 @@
+"""
+Último relatório publicado de cada mês, com o ETag, o número de versão e um
+histórico curto das mudanças entre versões.
+
+O ETag é um hash do conteúdo do relatório: igual entre reinícios da API e
+igual para o mesmo conteúdo vindo do scan sob demanda ou do watcher.
+A versão é um contador por mês que só avança quando o conteúdo muda; o token
+de versão enviado aos clientes inclui a "época" do processo para que um
+token anterior a um reinício da API nunca seja confundido com um atual.
+"""
+import hashlib
+import json
+import threading
+import uuid
+from collections import deque
+from typing import Any, Callable, Dict, NamedTuple, Tuple
+
+# Quantas versões anteriores de cada mês ficam disponíveis para /sms/changes
+MAX_HISTORICO = 50
+
+# Chave de um item no relatório: (categoria, item_id), ex.: ("Item SMS", "1.1.1")
+ChaveItem = Tuple[str, str]
+
+# Chave das mudanças nos campos do próprio relatório (tudo fora de "result",
+# ex.: diretorios_desconhecidos); o valor é o conjunto atual desses campos
+CHAVE_CABECALHO: ChaveItem = ("", "")
+
+
+def cabecalho(relatorio: Dict[str, Any]) -> Dict[str, Any]:
+    """Campos do relatório fora de "result"."""
+    return {k: v for k, v in relatorio.items() if k != "result"}
+
+
+class EstadoRelatorio(NamedTuple):
+    relatorio: Dict[str, Any]
+    etag: str
+    versao: int
+    token: str
+
+
+def calcular_etag(relatorio: Dict[str, Any]) -> str:
+    """ETag forte (entre aspas, como no header HTTP) do conteúdo do relatório."""
+    conteudo = json.dumps(relatorio, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return '"' + hashlib.blake2b(conteudo, digest_size=16).hexdigest() + '"'
+
+
+def etag_confere(if_none_match: str | None, etag: str) -> bool:
+    """Interpreta o header If-None-Match (lista, '*' ou ETags fracos W/"...")."""
+    if not if_none_match:
+        return False
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato == "*":
+            return True
+        if candidato.startswith("W/"):
+            candidato = candidato[2:]
+        if candidato == etag:
+            return True
+    return False
+
+
+def diferenca_itens(anterior: Dict[str, Any], atual: Dict[str, Any]) -> Dict[ChaveItem, Any]:
+    """
+    Itens de 'atual' que diferem de 'anterior' (status, soma_total, percentual,
+    diretórios...). Itens que deixaram de existir aparecem com valor None.
+    Se os campos fora de "result" mudaram, vêm em CHAVE_CABECALHO.
+    """
+    antigo = anterior.get("result", {})
+    novo = atual.get("result", {})
+    mudancas: Dict[ChaveItem, Any] = {}
+
+    for categoria, itens in novo.items():
+        itens_antigos = antigo.get(categoria, {})
+        for item_id, item in itens.items():
+            if itens_antigos.get(item_id) != item:
+                mudancas[(categoria, item_id)] = item
+
+    for categoria, itens_antigos in antigo.items():
+        itens = novo.get(categoria, {})
+        for item_id in itens_antigos:
+            if item_id not in itens:
+                mudancas[(categoria, item_id)] = None
+
+    if cabecalho(anterior) != cabecalho(atual):
+        mudancas[CHAVE_CABECALHO] = cabecalho(atual)
+    return mudancas
+
+
+class ReportStore:
+    """
+    Guarda o estado mais recente de cada mês (chave = caminho da pasta do mês).
+    'ao_mudar(chave, estado)' é chamado sempre que um mês ganha uma versão nova.
+    """
+
+    def __init__(
+        self,
+        max_historico: int = MAX_HISTORICO,
+        ao_mudar: Callable[[str, "EstadoRelatorio"], None] | None = None,
+    ):
+        self.max_historico = max_historico
+        self.ao_mudar = ao_mudar
+        self.epoca = uuid.uuid4().hex[:8]
+        self._estados: Dict[str, EstadoRelatorio] = {}
+        # chave -> deque[(versao, mudancas em relação à versão anterior)]
+        self._historico: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def publicar(self, chave: str, relatorio: Dict[str, Any]) -> EstadoRelatorio:
+        """
+        Registra o relatório do mês e retorna o estado atual.
+        Se é o mesmo objeto já publicado (caso do watcher), não recalcula o hash.
+        """
+        atual = self._estados.get(chave)
+        if atual is not None and atual.relatorio is relatorio:
+            return atual
+
+        etag = calcular_etag(relatorio)
+        with self._lock:
+            atual = self._estados.get(chave)
+            if atual is not None and atual.etag == etag:
+                return atual
+            versao = (atual.versao if atual else 0) + 1
+            estado = EstadoRelatorio(relatorio, etag, versao, f"{self.epoca}:{versao}")
+            historico = self._historico.setdefault(chave, deque(maxlen=self.max_historico))
+            if atual is not None:
+                historico.append((versao, diferenca_itens(atual.relatorio, relatorio)))
+            self._estados[chave] = estado
+
+        if self.ao_mudar is not None:
+            self.ao_mudar(chave, estado)
+        return estado
+
+    def atual(self, chave: str) -> EstadoRelatorio | None:
+        return self._estados.get(chave)
+
+    def mudancas_desde(self, chave: str, token: str) -> Dict[ChaveItem, Any] | None:
+        """
+        Itens alterados desde a versão identificada por 'token', com o valor atual.
+        Retorna None quando não dá para montar o delta (token de outra época,
+        versão desconhecida ou mais antiga que o histórico): o cliente deve
+        receber o relatório completo.
+        """
+        epoca, _, versao_txt = token.partition(":")
+        if epoca != self.epoca or not versao_txt.isdigit():
+            return None
+        versao = int(versao_txt)
+
+        with self._lock:
+            estado = self._estados.get(chave)
+            if estado is None or versao > estado.versao:
+                return None
+            if versao == estado.versao:
+                return {}
+
+            historico = list(self._historico.get(chave, ()))
+            passos = [m for v, m in historico if v > versao]
+            # O histórico precisa cobrir todas as versões de (versao + 1) até a atual
+            if len(passos) != estado.versao - versao:
+                return None
+
+            mudancas: Dict[ChaveItem, Any] = {}
+            for passo in passos:
+                mudancas.update(passo)
+
+        # Sempre o valor da versão atual (uma mudança pode ter sido desfeita depois)
+        resultado = estado.relatorio.get("result", {})
+        return {
+            (categoria, item_id): (
+                cabecalho(estado.relatorio)
+                if (categoria, item_id) == CHAVE_CABECALHO
+                else resultado.get(categoria, {}).get(item_id)
+            )
+            for categoria, item_id in mudancas
+        }
@@ -0,0 +1,137 @@
+"""
+Agregados do dashboard calculados na API (/sms/summary).
+
+O relatório do mês é cruzado com o catálogo (static/data.json) uma vez por
+versão do relatório; cada requisição só aplica os filtros e conta. A
+resposta tem poucos números (contagens por status, taxa de conclusão,
+pendências por setor e por responsável), sem a lista de 'diretorios'.
+
+As regras são as mesmas do dashboard: item sem status na API conta como
+"Não Iniciado", e pendente é tudo que não está "Concluído". A normalização do
+catálogo e os padrões de status vêm de src/utils.py, compartilhado com o
+dashboard (a raiz do projeto entra no sys.path pelo app.py).
+"""
+import json
+import os
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, NamedTuple, Tuple
+
+from src.utils import PADRAO_ANDAMENTO, PADRAO_CONCLUIDO, PADRAO_NAO_INICIADO, limpar_id_item, normalizar_responsavel
+
+CATALOGO_PADRAO = Path(__file__).resolve().parent.parent / "static" / "data.json"
+
+_RE_CONCLUIDO = re.compile(PADRAO_CONCLUIDO)
+_RE_ANDAMENTO = re.compile(PADRAO_ANDAMENTO)
+_RE_NAO_INICIADO = re.compile(PADRAO_NAO_INICIADO)
+
+
+# --- CATÁLOGO (normalização de src/utils.py, a mesma do dashboard) ---
+class LinhaCatalogo(NamedTuple):
+    item: str
+    setor: str
+    responsaveis: Tuple[str, ...]
+
+
+class Catalogo:
+    """Catálogo lido do data.json e relido só quando o arquivo muda (mtime + tamanho)."""
+
+    def __init__(self, caminho: str | Path = CATALOGO_PADRAO):
+        self.caminho = Path(caminho)
+        self._atual: Tuple[str | None, Tuple[LinhaCatalogo, ...]] = (None, ())
+        self._lock = threading.Lock()
+
+    def atual(self) -> Tuple[str, Tuple[LinhaCatalogo, ...]]:
+        """(versão, linhas) do catálogo; custa um stat quando o arquivo não mudou."""
+        st = os.stat(self.caminho)
+        versao = f"{st.st_mtime_ns}-{st.st_size}"
+        if versao != self._atual[0]:
+            with self._lock:
+                if versao != self._atual[0]:
+                    with open(self.caminho, encoding="utf-8") as f:
+                        item_map = json.load(f)
+                    linhas = tuple(
+                        LinhaCatalogo(
+                            limpar_id_item(item.get("ITEM")),
+                            item.get("SETOR"),
+                            tuple(normalizar_responsavel(item.get("RESPONSAVEL"))),
+                        )
+                        for item in item_map.values()
+                    )
+                    self._atual = (versao, linhas)
+        return self._atual
+
+
+# --- CRUZAMENTO RELATÓRIO x CATÁLOGO ---
+def _classificar(status: str | None) -> str:
+    """'concluido', 'andamento', 'nao_iniciado' ou 'outro' (mesmos padrões do dashboard)."""
+    texto = (status or "Não Iniciado").lower()
+    if _RE_CONCLUIDO.search(texto):
+        return "concluido"
+    if _RE_ANDAMENTO.search(texto):
+        return "andamento"
+    if _RE_NAO_INICIADO.search(texto):
+        return "nao_iniciado"
+    return "outro"
+
+
+def cruzar(relatorio: Dict, linhas: Iterable[LinhaCatalogo]) -> Tuple[Tuple[LinhaCatalogo, str], ...]:
+    """(linha do catálogo, classe do status) para cada item do catálogo."""
+    status_por_item: Dict[str, str] = {}
+    for itens in relatorio.get("result", {}).values():
+        for item_id, detalhes in itens.items():
+            status_por_item.setdefault(item_id, detalhes.get("status"))
+    return tuple((linha, _classificar(status_por_item.get(linha.item))) for linha in linhas)
+
+
+def resumir(cruzado, setores: Iterable[str] = (), responsaveis: Iterable[str] = ()) -> Dict:
+    """Agregados do dashboard, opcionalmente filtrados por setores e/ou responsáveis."""
+    setores, responsaveis = set(setores), set(responsaveis)
+    status = Counter()
+    pendentes_setor = Counter()
+    pendentes_resp = Counter()
+
+    for linha, classe in cruzado:
+        if setores and linha.setor not in setores:
+            continue
+        if responsaveis and responsaveis.isdisjoint(linha.responsaveis):
+            continue
+        status[classe] += 1
+        if classe != "concluido":
+            pendentes_setor[linha.setor] += 1
+            pendentes_resp.update(linha.responsaveis)
+
+    total = sum(status.values())
+    return {
+        "total_itens": total,
+        "concluidos": status["concluido"],
+        "em_andamento": status["andamento"],
+        "nao_iniciados": status["nao_iniciado"],
+        "taxa_conclusao": round(status["concluido"] / total * 100, 2) if total else 0.0,
+        "pendentes_por_setor": [{"setor": s, "itens": n} for s, n in pendentes_setor.most_common()],
+        "pendentes_por_responsavel": [{"nome": r, "pendentes": n} for r, n in pendentes_resp.most_common()],
+    }
+
+
+class CacheCruzamentos:
+    """Último cruzamento de cada mês, refeito só quando muda o ETag do relatório ou a versão do catálogo."""
+
+    def __init__(self, catalogo: Catalogo):
+        self.catalogo = catalogo
+        self._cruzados: Dict[str, tuple] = {}  # chave do mês -> ((etag, versao_catalogo), cruzado)
+        self._lock = threading.Lock()
+
+    def obter(self, chave: str, etag: str, relatorio: Dict):
+        versao_catalogo, linhas = self.catalogo.atual()
+        versao = (etag, versao_catalogo)
+        with self._lock:
+            guardado = self._cruzados.get(chave)
+        if guardado is not None and guardado[0] == versao:
+            return guardado[1]
+
+        cruzado = cruzar(relatorio, linhas)
+        with self._lock:
+            self._cruzados[chave] = (versao, cruzado)
+        return cruzado
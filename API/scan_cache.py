@@ -0,0 +1,145 @@
+"""
+Cache das listagens de diretório do scan, chaveado por caminho + mtime.
+
+Uma listagem só é reaproveitada se o mtime do diretório não mudou desde que
+ela foi feita (criar, apagar ou renomear um arquivo altera o mtime da pasta).
+As entradas são agrupadas por raiz (pasta do mês) para que meses que ninguém
+consulta há algum tempo sejam descartados inteiros.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+# Listagens de diretórios alterados há menos que isso não são guardadas:
+# o mtime pode ter resolução de 2s (SMB/FAT) e outra escrita no mesmo
+# intervalo não mudaria o valor.
+JANELA_MTIME_INSTAVEL_NS = 2_000_000_000
+
+
+def chave_diretorio(path: str) -> str:
+    """Forma canônica do caminho usada como chave (mesma grafia vinda do scan ou do watcher)."""
+    return os.path.normcase(os.path.normpath(path))
+
+
+class ScanCache:
+    """
+    Cache LRU de listagens, limitado em número total de entradas e em número de raízes.
+
+    Args:
+        max_entradas: total de diretórios guardados (somando todas as raízes).
+        max_raizes: quantidade máxima de meses mantidos ao mesmo tempo.
+        ttl_ociosa: segundos sem consulta após os quais uma raiz é descartada.
+    """
+
+    def __init__(self, max_entradas: int = 20_000, max_raizes: int = 12, ttl_ociosa: float = 6 * 3600):
+        self.max_entradas = max_entradas
+        self.max_raizes = max_raizes
+        self.ttl_ociosa = ttl_ociosa
+
+        # raiz -> {"acesso": timestamp, "entradas": {path: (mtime_ns, listing)}}
+        self._raizes: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    # --- Consulta / gravação ---
+    def obter(self, raiz: str, path: str, mtime_ns: int):
+        """Retorna a listagem guardada para 'path' se o mtime ainda for o mesmo."""
+        with self._lock:
+            bucket = self._tocar(raiz)
+            entrada: Tuple[int, Any] | None = bucket["entradas"].get(path)
+            if entrada is not None and entrada[0] == mtime_ns:
+                self.hits += 1
+                return entrada[1]
+            self.misses += 1
+            return None
+
+    def ultima(self, raiz: str, path: str):
+        """Última listagem conhecida de 'path', qualquer que seja o mtime (None se não houver)."""
+        with self._lock:
+            bucket = self._raizes.get(raiz)
+            entrada = bucket["entradas"].get(path) if bucket is not None else None
+            return entrada[1] if entrada is not None else None
+
+    def guardar(self, raiz: str, path: str, mtime_ns: int, listing) -> None:
+        """Guarda a listagem, a menos que o diretório tenha sido alterado há pouquíssimo tempo."""
+        if time.time_ns() - mtime_ns < JANELA_MTIME_INSTAVEL_NS:
+            return
+        with self._lock:
+            entradas = self._tocar(raiz)["entradas"]
+            if path not in entradas:
+                self._total += 1
+            entradas[path] = (mtime_ns, listing)
+            self._aplicar_limites(preservar=raiz)
+
+    def invalidar(self, raiz: str, paths=None) -> None:
+        """Descarta os 'paths' informados da raiz, ou a raiz inteira se 'paths' for None."""
+        with self._lock:
+            bucket = self._raizes.get(raiz)
+            if bucket is None:
+                return
+            if paths is None:
+                self._total -= len(bucket["entradas"])
+                del self._raizes[raiz]
+                return
+            for path in paths:
+                if bucket["entradas"].pop(path, None) is not None:
+                    self._total -= 1
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._raizes.clear()
+            self._total = 0
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "raizes": len(self._raizes),
+                "entradas": self._total,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    # --- Internos (chamados com o lock adquirido) ---
+    def _tocar(self, raiz: str) -> Dict[str, Any]:
+        agora = time.monotonic()
+        self._expirar_ociosas(agora)
+        bucket = self._raizes.get(raiz)
+        if bucket is None:
+            bucket = {"acesso": agora, "entradas": {}}
+            self._raizes[raiz] = bucket
+        else:
+            bucket["acesso"] = agora
+            self._raizes.move_to_end(raiz)
+        self._aplicar_limites(preservar=raiz)
+        return bucket
+
+    def _expirar_ociosas(self, agora: float) -> None:
+        while self._raizes:
+            raiz, bucket = next(iter(self._raizes.items()))
+            if agora - bucket["acesso"] <= self.ttl_ociosa:
+                break
+            self._total -= len(bucket["entradas"])
+            del self._raizes[raiz]
+
+    def _aplicar_limites(self, preservar: str) -> None:
+        # Remove os meses menos usados recentemente (nunca o que está em uso agora)
+        while len(self._raizes) > 1 and (
+            len(self._raizes) > self.max_raizes or self._total > self.max_entradas
+        ):
+            raiz = next(iter(self._raizes))
+            if raiz == preservar:
+                break
+            self._total -= len(self._raizes.pop(raiz)["entradas"])
+
+        # Um único mês maior que o limite: descarta as entradas mais antigas dele
+        bucket = self._raizes.get(preservar)
+        if bucket is not None:
+            entradas = bucket["entradas"]
+            while self._total > self.max_entradas and entradas:
+                del entradas[next(iter(entradas))]
+                self._total -= 1
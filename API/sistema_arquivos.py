@@ -0,0 +1,280 @@
+"""
+Acesso ao sistema de arquivos usado pelo scan (folder_analyzer.py).
+
+O scan só precisa de duas operações por diretório:
+- estado(path): mtime_ns do diretório, ou None se ele não existir (ou não for diretório);
+- entradas(path): (nome, é_diretório) de cada subdiretório e arquivo; levanta
+  FileNotFoundError/NotADirectoryError se o diretório não existir.
+
+Backends:
+- DiscoLocal: os.stat/os.scandir no disco ou compartilhamento montado (padrão).
+- ArvoreMemoria: árvore de diretórios em dicionários, sem nenhum acesso a disco.
+- Manifesto: ArvoreMemoria carregada de uma listagem salva (JSON ou NDJSON com
+  caminho, tipo, tamanho e mtime de cada entrada; ver gerar_manifesto.py).
+  Reproduz um relatório de produção offline ou recebe a listagem enviada por
+  um agente remoto, sem expor o compartilhamento.
+- ManifestosPorMes: um Manifesto por pasta de mês, trocado a cada envio
+  (contratos com "fonte": "manifesto", ver contratos.py).
+
+Formato de cada entrada do manifesto (caminhos relativos à pasta listada, com '/'):
+    {"caminho": "1. SMS/1. Incidentes/relatorio.pdf", "tipo": "f", "tamanho": 1234, "mtime_ns": 1700000000000000000}
+'tipo' é "d" (diretório) ou "f" (arquivo); 'mtime' em segundos também é aceito.
+Um JSON pode ser a lista de entradas ou {"entradas": [...]}; o NDJSON tem uma entrada por linha.
+"""
+import itertools
+import json
+import os
+import posixpath
+import stat
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Protocol, Tuple
+
+from gabarito import norm_nome
+
+
+class SistemaArquivos(Protocol):
+    def estado(self, path: str) -> int | None: ...
+
+    def entradas(self, path: str) -> Iterable[Tuple[str, bool]]: ...
+
+
+class ManifestoInvalido(ValueError):
+    """Listagem malformada."""
+
+
+# --- DISCO LOCAL ---
+class DiscoLocal:
+    """os.stat/os.scandir direto no disco (o tipo de cada entrada vem cacheado no DirEntry)."""
+
+    def estado(self, path: str) -> int | None:
+        try:
+            st = os.stat(path)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        return st.st_mtime_ns if stat.S_ISDIR(st.st_mode) else None
+
+    def entradas(self, path: str) -> Iterator[Tuple[str, bool]]:
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_dir():
+                    yield entry.name, True
+                elif entry.is_file():
+                    yield entry.name, False
+
+
+DISCO_LOCAL = DiscoLocal()
+
+
+# --- ÁRVORE EM MEMÓRIA ---
+# mtime dos diretórios sem mtime informado: um contador único no processo, para
+# que duas árvores (ex.: dois envios do mesmo mês) nunca repitam um mtime e o
+# ScanCache não devolva a listagem da árvore anterior
+_relogio = itertools.count(1)
+
+
+def _posix(path) -> str:
+    """Caminho com '/' como separador, sem '.', '..' nem barra inicial (nomes como vieram)."""
+    normal = posixpath.normpath(os.fspath(path).replace("\\", "/"))
+    return "" if normal == "." else normal.lstrip("/")
+
+
+def _chave(path) -> str:
+    """
+    Chave de busca do caminho: cada segmento passa por norm_nome, como o scan
+    compara os nomes (no Windows, maiúsculas/minúsculas e a forma Unicode não
+    distinguem pastas).
+    """
+    posix = _posix(path)
+    return "/".join(norm_nome(parte) for parte in posix.split("/")) if posix else ""
+
+
+class _Diretorio:
+    __slots__ = ("mtime_ns", "subdirs", "arquivos")
+
+    def __init__(self, mtime_ns: int):
+        self.mtime_ns = mtime_ns
+        self.subdirs: Dict[str, str] = {}  # norm_nome -> nome original
+        self.arquivos: Dict[str, Tuple[str, int, int]] = {}  # norm_nome -> (nome, tamanho, mtime_ns)
+
+
+class ArvoreMemoria:
+    """
+    Diretórios e arquivos em memória. Criar um arquivo ou subdiretório muda o
+    mtime do diretório pai, como no disco, para que o ScanCache perceba a mudança.
+    """
+
+    def __init__(self):
+        self._dirs: Dict[str, _Diretorio] = {"": _Diretorio(next(_relogio))}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _tique() -> int:
+        return next(_relogio)
+
+    def _garantir_diretorio(self, posix: str, mtime_ns: int | None) -> _Diretorio:
+        chave = _chave(posix)
+        diretorio = self._dirs.get(chave)
+        if diretorio is None:
+            pai, _, nome = posix.rpartition("/")
+            pai_dir = self._garantir_diretorio(pai, None)
+            pai_dir.subdirs[norm_nome(nome)] = nome
+            pai_dir.mtime_ns = self._tique()
+            diretorio = self._dirs[chave] = _Diretorio(self._tique() if mtime_ns is None else mtime_ns)
+        elif mtime_ns is not None:
+            diretorio.mtime_ns = mtime_ns
+        return diretorio
+
+    def adicionar_diretorio(self, caminho, mtime_ns: int | None = None) -> None:
+        """Cria o diretório (e os pais que faltarem)."""
+        with self._lock:
+            self._garantir_diretorio(_posix(caminho), mtime_ns)
+
+    def adicionar_arquivo(self, caminho, tamanho: int = 0, mtime_ns: int | None = None) -> None:
+        """Cria (ou substitui) o arquivo, criando os diretórios que faltarem."""
+        pai, _, nome = _posix(caminho).rpartition("/")
+        with self._lock:
+            diretorio = self._garantir_diretorio(pai, None)
+            diretorio.arquivos[norm_nome(nome)] = (nome, tamanho, self._tique() if mtime_ns is None else mtime_ns)
+            diretorio.mtime_ns = self._tique()
+
+    def estado(self, path: str) -> int | None:
+        diretorio = self._dirs.get(_chave(path))
+        return diretorio.mtime_ns if diretorio is not None else None
+
+    def entradas(self, path: str) -> Iterator[Tuple[str, bool]]:
+        diretorio = self._dirs.get(_chave(path))
+        if diretorio is None:
+            raise FileNotFoundError(path)
+        for nome in list(diretorio.subdirs.values()):
+            yield nome, True
+        for nome, _, _ in list(diretorio.arquivos.values()):
+            yield nome, False
+
+
+# --- MANIFESTO ---
+class Manifesto(ArvoreMemoria):
+    """ArvoreMemoria montada a partir de uma listagem salva, montada em 'raiz'."""
+
+    @classmethod
+    def de_entradas(cls, entradas: Iterable[Dict[str, Any]], raiz: str | Path = "") -> "Manifesto":
+        arvore = cls()
+        base = _posix(raiz)
+        arvore.adicionar_diretorio(base)
+        mtimes_dirs: Dict[str, int] = {}
+        for n, entrada in enumerate(entradas, 1):
+            if not isinstance(entrada, dict) or not isinstance(entrada.get("caminho"), str):
+                raise ManifestoInvalido(f"Entrada {n}: esperado um objeto com 'caminho'")
+            caminho = posixpath.join(base, _posix(entrada["caminho"])) if base else _posix(entrada["caminho"])
+            mtime_ns = _mtime_ns(entrada, n)
+            tipo = entrada.get("tipo", "f")
+            if tipo == "d":
+                arvore.adicionar_diretorio(caminho, mtime_ns)
+                if mtime_ns is not None:
+                    mtimes_dirs[_chave(caminho)] = mtime_ns
+            elif tipo == "f":
+                arvore.adicionar_arquivo(caminho, _tamanho(entrada, n), mtime_ns or 0)
+            else:
+                raise ManifestoInvalido(f"Entrada {n}: 'tipo' deve ser 'd' ou 'f'")
+
+        # O mtime informado de cada diretório vale sobre o calculado na carga
+        for chave, mtime_ns in mtimes_dirs.items():
+            arvore._dirs[chave].mtime_ns = mtime_ns
+        return arvore
+
+    @classmethod
+    def de_texto(cls, texto: str, raiz: str | Path = "") -> "Manifesto":
+        """JSON (lista ou {"entradas": [...]}) ou NDJSON, detectado pelo conteúdo."""
+        try:
+            documento = json.loads(texto)
+        except json.JSONDecodeError:
+            documento = None  # várias linhas: NDJSON
+        if isinstance(documento, dict):
+            documento = documento.get("entradas", [documento])
+        if isinstance(documento, list):
+            return cls.de_entradas(documento, raiz)
+
+        try:
+            return cls.de_entradas((json.loads(linha) for linha in texto.splitlines() if linha.strip()), raiz)
+        except json.JSONDecodeError as e:
+            raise ManifestoInvalido(f"Manifesto não é JSON/NDJSON válido: {e}") from None
+
+    @classmethod
+    def carregar(cls, arquivo: str | Path, raiz: str | Path = "") -> "Manifesto":
+        return cls.de_texto(Path(arquivo).read_text(encoding="utf-8"), raiz)
+
+
+def _tamanho(entrada: Dict[str, Any], n: int) -> int:
+    try:
+        return int(entrada.get("tamanho", 0))
+    except (TypeError, ValueError):
+        raise ManifestoInvalido(f"Entrada {n}: tamanho inválido") from None
+
+
+def _mtime_ns(entrada: Dict[str, Any], n: int) -> int | None:
+    try:
+        if "mtime_ns" in entrada:
+            return int(entrada["mtime_ns"])
+        if "mtime" in entrada:
+            return int(float(entrada["mtime"]) * 1_000_000_000)
+    except (TypeError, ValueError):
+        raise ManifestoInvalido(f"Entrada {n}: mtime inválido") from None
+    return None
+
+
+class ManifestosPorMes:
+    """
+    Um Manifesto por pasta de mês; um mês que ainda não recebeu manifesto não
+    existe. Cada envio ganha uma geração nova (contador único no processo).
+    """
+
+    def __init__(self):
+        self._meses: Dict[str, Tuple[int, Manifesto]] = {}
+
+    def substituir(self, pasta_mes, manifesto: Manifesto) -> int:
+        geracao = next(_relogio)
+        self._meses[_chave(pasta_mes)] = (geracao, manifesto)
+        return geracao
+
+    def atual(self, path) -> Tuple[int, Manifesto] | None:
+        """(geração, manifesto) do mês que contém 'path'; o manifesto serve de fs só para esse mês."""
+        chave = _chave(path)
+        for mes, atual in list(self._meses.items()):
+            if chave == mes or chave.startswith(mes + "/"):
+                return atual
+        return None
+
+    def _manifesto(self, path) -> Manifesto | None:
+        atual = self.atual(path)
+        return atual[1] if atual is not None else None
+
+    def estado(self, path: str) -> int | None:
+        manifesto = self._manifesto(path)
+        return manifesto.estado(path) if manifesto is not None else None
+
+    def entradas(self, path: str) -> Iterable[Tuple[str, bool]]:
+        manifesto = self._manifesto(path)
+        if manifesto is None:
+            raise FileNotFoundError(path)
+        return manifesto.entradas(path)
+
+
+def listar_manifesto(pasta: str | Path) -> Iterator[Dict[str, Any]]:
+    """
+    Entradas do manifesto de 'pasta' (diretórios e arquivos, recursivo), com
+    caminhos relativos a ela. A primeira é a própria pasta (caminho ".").
+    """
+    raiz = os.fspath(pasta)
+    yield {"caminho": ".", "tipo": "d", "mtime_ns": os.stat(raiz).st_mtime_ns}
+    pendentes = [""]
+    while pendentes:
+        relativo = pendentes.pop()
+        with os.scandir(os.path.join(raiz, relativo) if relativo else raiz) as it:
+            for entry in it:
+                caminho = f"{relativo}/{entry.name}" if relativo else entry.name
+                if entry.is_dir():
+                    yield {"caminho": caminho, "tipo": "d", "mtime_ns": entry.stat().st_mtime_ns}
+                    pendentes.append(caminho)
+                elif entry.is_file():
+                    st = entry.stat()
+                    yield {"caminho": caminho, "tipo": "f", "tamanho": st.st_size, "mtime_ns": st.st_mtime_ns}
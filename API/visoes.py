@@ -0,0 +1,67 @@
+"""
+Visões derivadas do relatório de um mês: a versão enxuta (sem a lista de
+diretórios e arquivos) e o índice por item usado no /sms/item/{item_id}.
+
+Cada visão é calculada uma vez por versão do relatório (ETag) e guardada
+num cache pequeno; requisições seguintes da mesma versão só consultam.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+
+
+def item_enxuto(item: Dict[str, Any] | None) -> Dict[str, Any] | None:
+    """
+    Item sem 'diretorios': status, contagens e percentual, mais as pastas vazias
+    (qtd 0), por nome em 'diretorios_pendentes' e contadas em 'pastas_pendentes'.
+    """
+    if item is None:
+        return None
+    enxuto = {k: v for k, v in item.items() if k != "diretorios"}
+    vazias = [d["diretorio"] for d in item.get("diretorios", ()) if d.get("qtd", 0) == 0]
+    enxuto["diretorios_pendentes"] = vazias
+    enxuto["pastas_pendentes"] = len(vazias)
+    return enxuto
+
+
+def relatorio_enxuto(relatorio: Dict[str, Any]) -> Dict[str, Any]:
+    """Mesmo formato do relatório, com cada item passado por item_enxuto."""
+    return {
+        **relatorio,
+        "result": {
+            categoria: {item_id: item_enxuto(item) for item_id, item in itens.items()}
+            for categoria, itens in relatorio.get("result", {}).items()
+        },
+    }
+
+
+def indexar_itens(relatorio: Dict[str, Any]) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+    """item_id -> (categoria, item). Se o id aparece em mais de uma categoria, vale a primeira."""
+    indice: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+    for categoria, itens in relatorio.get("result", {}).items():
+        for item_id, item in itens.items():
+            indice.setdefault(item_id, (categoria, item))
+    return indice
+
+
+class CacheVisoes:
+    """Visões por (nome da visão, ETag do relatório), com no máximo 'max_entradas' (LRU)."""
+
+    def __init__(self, max_entradas: int = 64):
+        self.max_entradas = max_entradas
+        self._valores: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, nome: str, etag: str, calcular: Callable[[], Any]) -> Any:
+        chave = (nome, etag)
+        with self._lock:
+            if chave in self._valores:
+                self._valores.move_to_end(chave)
+                return self._valores[chave]
+
+        valor = calcular()
+        with self._lock:
+            self._valores[chave] = valor
+            while len(self._valores) > self.max_entradas:
+                self._valores.popitem(last=False)
+        return valor
@@ -0,0 +1,270 @@
+"""
+Relatório materializado por mês, mantido atualizado por um watcher do sistema de arquivos.
+
+Com o watcher ativo, o GET /sms só lê o último relatório já montado em memória.
+Os eventos do watchdog (inotify no Linux, ReadDirectoryChangesW no Windows) marcam
+diretórios como sujos; uma thread agrupa as rajadas de eventos (debounce) e refaz
+o scan usando o ScanCache, de modo que só os diretórios alterados são relidos.
+Sem watchdog instalado, a mesma thread faz polling periódico pelo mtime.
+De tempos em tempos é feito um rescan completo (cache descartado) para corrigir
+eventos perdidos. Um relatório parcial (pastas que estouraram o prazo) é refeito
+no intervalo do polling, com essas pastas listadas de novo, mesmo sem eventos:
+uma pasta lenta ou sendo baixada costuma ficar pronta sem gerar nenhum.
+"""
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+from folder_analyzer import montar_relatorio_sms
+from gabarito import GabaritoCompilado
+from scan_cache import ScanCache, chave_diretorio
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # watchdog é opcional: cai no polling
+    FileSystemEventHandler = object
+    Observer = None
+
+logger = logging.getLogger(__name__)
+
+
+class _EventHandler(FileSystemEventHandler):
+    """Repassa qualquer evento do watchdog para o relatório materializado."""
+
+    def __init__(self, materializado: "RelatorioMaterializado"):
+        super().__init__()
+        self.materializado = materializado
+
+    def on_any_event(self, event):
+        if event.event_type in ("opened", "closed_no_write"):
+            return
+        self.materializado.notificar(event.src_path, event.is_directory)
+        dest = getattr(event, "dest_path", "")
+        if dest:
+            self.materializado.notificar(dest, event.is_directory)
+
+
+class RelatorioMaterializado:
+    """
+    Mantém o relatório de um mês em memória.
+
+    Args:
+        base_path: pasta do mês.
+        cache: cache de listagens compartilhado com o scan sob demanda.
+        debounce: segundos sem novos eventos antes de refazer o scan.
+        espera_maxima: teto de espera numa rajada contínua de eventos.
+        intervalo_polling: intervalo do polling quando não há watcher nativo.
+        intervalo_rescan: intervalo do rescan completo de segurança.
+        ao_atualizar: chamado com (base_path, relatorio) a cada versão nova.
+        gabarito: árvore esperada já compilada (padrão: MASTER_TREE).
+        orcamento_diretorio: prazo (s) de cada listagem no scan (ver montar_relatorio_sms).
+    """
+
+    def __init__(
+        self,
+        base_path: Path,
+        cache: ScanCache,
+        debounce: float = 2.0,
+        espera_maxima: float = 15.0,
+        intervalo_polling: float = 30.0,
+        intervalo_rescan: float = 600.0,
+        ao_atualizar: Callable[[Path, Dict[str, Any]], None] | None = None,
+        gabarito: GabaritoCompilado | None = None,
+        orcamento_diretorio: float | None = None,
+    ):
+        self.base_path = Path(base_path)
+        self.cache = cache
+        self.debounce = debounce
+        self.espera_maxima = espera_maxima
+        self.intervalo_polling = intervalo_polling
+        self.intervalo_rescan = intervalo_rescan
+        self.ao_atualizar = ao_atualizar
+        self.gabarito = gabarito
+        self.orcamento_diretorio = orcamento_diretorio
+
+        self.relatorio: Dict[str, Any] | None = None
+        self.versao = 0
+        self.atualizado_em = 0.0
+        self.modo = "polling"
+
+        self._raiz = os.fspath(self.base_path)
+        self._sujos: set = set()
+        self._lock = threading.Lock()
+        self._evento = threading.Event()
+        self._parar = threading.Event()
+        self._observer = None
+        self._thread: threading.Thread | None = None
+        self._ultimo_rescan = 0.0
+        self._parcial = False  # último scan com diretórios desconhecidos
+
+    # --- Ciclo de vida ---
+    def iniciar(self) -> None:
+        """Faz o primeiro scan (síncrono) e inicia o watcher e a thread de atualização."""
+        self._rescan(completo=True)
+
+        if Observer is not None:
+            try:
+                observer = Observer()
+                observer.schedule(_EventHandler(self), self._raiz, recursive=True)
+                observer.daemon = True
+                observer.start()
+                self._observer = observer
+                self.modo = "watchdog"
+            except Exception as e:  # ex.: limite de inotify, compartilhamento sem suporte
+                logger.warning("Watcher nativo indisponível para %s (%s); usando polling.", self._raiz, e)
+
+        self._thread = threading.Thread(target=self._loop, name=f"watcher-{self.base_path.name}", daemon=True)
+        self._thread.start()
+
+    def parar(self) -> None:
+        self._parar.set()
+        self._evento.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    # --- Eventos ---
+    def notificar(self, path: str, is_directory: bool = False) -> None:
+        """Marca como sujo o diretório afetado por um evento (e o pai, cuja listagem mudou)."""
+        path = chave_diretorio(os.fspath(path))
+        with self._lock:
+            self._sujos.add(os.path.dirname(path))
+            if is_directory:
+                self._sujos.add(path)
+        self._evento.set()
+
+    # --- Thread de atualização ---
+    def _loop(self) -> None:
+        while not self._parar.is_set():
+            nativo = self._observer is not None and not self._parcial
+            timeout = self.intervalo_rescan if nativo else self.intervalo_polling
+            houve_evento = self._evento.wait(timeout=timeout)
+            if self._parar.is_set():
+                break
+
+            if houve_evento:
+                self._aguardar_rajada()
+
+            completo = time.monotonic() - self._ultimo_rescan >= self.intervalo_rescan
+            try:
+                self._rescan(completo=completo)
+            except Exception:
+                logger.exception("Falha ao atualizar o relatório de %s", self._raiz)
+
+    def _aguardar_rajada(self) -> None:
+        """Espera a rajada de eventos acalmar (debounce), sem passar de 'espera_maxima'."""
+        inicio = time.monotonic()
+        while not self._parar.is_set():
+            self._evento.clear()
+            restante = self.espera_maxima - (time.monotonic() - inicio)
+            if restante <= 0 or not self._evento.wait(timeout=min(self.debounce, restante)):
+                return
+
+    def _rescan(self, completo: bool) -> None:
+        self._evento.clear()
+        with self._lock:
+            sujos, self._sujos = self._sujos, set()
+
+        if completo:
+            self.cache.invalidar(self._raiz)
+            self._ultimo_rescan = time.monotonic()
+        elif sujos:
+            self.cache.invalidar(self._raiz, sujos)
+
+        desconhecidos: set = set()
+        relatorio = montar_relatorio_sms(
+            self.base_path,
+            cache=self.cache,
+            gabarito=self.gabarito,
+            orcamento_diretorio=self.orcamento_diretorio,
+            caminhos_desconhecidos=desconhecidos,
+        )
+        self.atualizado_em = time.time()
+        # Pastas que estouraram o prazo: sujas, para a próxima passada listá-las de novo
+        self._parcial = bool(desconhecidos)
+        if desconhecidos:
+            with self._lock:
+                self._sujos |= desconhecidos
+        if relatorio != self.relatorio:
+            self.relatorio = relatorio
+            self.versao += 1
+            if self.ao_atualizar is not None:
+                self.ao_atualizar(self.base_path, relatorio)
+
+
+class GerenciadorWatchers:
+    """
+    Um RelatorioMaterializado por mês consultado. Meses sem consulta por
+    'ttl_ocioso' segundos têm o watcher encerrado.
+
+    O primeiro scan de um mês (dentro de iniciar) roda fora do lock geral:
+    um mês frio ou lento só faz esperar as requisições do próprio mês.
+    """
+
+    def __init__(self, cache: ScanCache, ttl_ocioso: float = 3600.0, **opcoes):
+        self.cache = cache
+        self.ttl_ocioso = ttl_ocioso
+        self.opcoes = opcoes
+        self._ativos: Dict[str, RelatorioMaterializado] = {}
+        self._iniciando: Dict[str, threading.Event] = {}  # mês -> sinal do fim do primeiro scan
+        self._acessos: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def obter(self, base_path: Path, cache: ScanCache | None = None) -> RelatorioMaterializado:
+        """'cache' troca o cache padrão (ex.: o do contrato da pasta) ao criar o watcher."""
+        chave = os.fspath(base_path)
+        while True:
+            with self._lock:
+                ociosos = self._remover_ociosos(excecao=chave)
+                self._acessos[chave] = time.monotonic()
+                materializado = self._ativos.get(chave)
+                iniciando = self._iniciando.get(chave)
+                lider = materializado is None and iniciando is None
+                if lider:
+                    iniciando = self._iniciando[chave] = threading.Event()
+
+            for parado in ociosos:
+                parado.parar()
+            if materializado is not None:
+                return materializado
+            if lider:
+                break
+            # Outra requisição está criando o watcher do mês; se ela falhar, esta tenta de novo
+            iniciando.wait()
+
+        try:
+            materializado = RelatorioMaterializado(base_path, cache or self.cache, **self.opcoes)
+            materializado.iniciar()
+            with self._lock:
+                self._ativos[chave] = materializado
+        finally:
+            with self._lock:
+                del self._iniciando[chave]
+                if chave not in self._ativos:
+                    self._acessos.pop(chave, None)
+            iniciando.set()
+        return materializado
+
+    def parar_todos(self) -> None:
+        with self._lock:
+            ativos = list(self._ativos.values())
+            self._ativos.clear()
+            self._acessos.clear()
+        for materializado in ativos:
+            materializado.parar()
+
+    def _remover_ociosos(self, excecao: str) -> list:
+        """Tira do registro os meses ociosos (chamar com o lock); quem chamou os para depois de soltar o lock."""
+        agora = time.monotonic()
+        ociosos = []
+        for chave in [c for c, t in self._acessos.items() if c != excecao and agora - t > self.ttl_ocioso]:
+            if chave in self._ativos:
+                ociosos.append(self._ativos.pop(chave))
+                del self._acessos[chave]
+        return ociosos
@@ -0,0 +1,49 @@
+"""
+Sistema de arquivos com latência injetada, para medir localmente o scan com
+pastas lentas (compartilhamento de rede, OneDrive baixando sob demanda).
+
+SistemaComLatencia envolve outro backend (ver API/sistema_arquivos.py) e
+espera 'atraso' segundos em cada estado/entradas e, nas pastas que casam
+com algum padrão de 'lentas' (fnmatch, com '/' como separador), o tempo
+configurado para o padrão. Vai para o scan pelo parâmetro 'fs'.
+
+Uso:
+    fs = SistemaComLatencia(atraso=0.001, lentas={"*/1. SMS/1. Incidentes": 2.0})
+    montar_relatorio_sms(mes, orcamento_diretorio=0.1, fs=fs)
+"""
+import fnmatch
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "API"))
+
+from sistema_arquivos import DISCO_LOCAL, SistemaArquivos  # noqa: E402
+
+
+class SistemaComLatencia:
+    """Repassa tudo a 'base', com atraso em cada operação."""
+
+    def __init__(self, atraso: float = 0.0, lentas: Dict[str, float] | None = None,
+                 base: SistemaArquivos = DISCO_LOCAL):
+        self.atraso = atraso
+        self.lentas = lentas or {}
+        self.base = base
+        self.chamadas = 0
+
+    def _esperar(self, path) -> None:
+        self.chamadas += 1
+        caminho = os.fspath(path).replace("\\", "/")
+        espera = self.atraso + sum(t for padrao, t in self.lentas.items() if fnmatch.fnmatch(caminho, padrao))
+        if espera:
+            time.sleep(espera)
+
+    def estado(self, path):
+        self._esperar(path)
+        return self.base.estado(path)
+
+    def entradas(self, path):
+        self._esperar(path)
+        return self.base.entradas(path)
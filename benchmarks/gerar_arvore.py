@@ -0,0 +1,127 @@
+"""
+Gera árvores de mês sintéticas no formato do MASTER_TREE, para benchmarks.
+
+Uso:
+    python benchmarks/gerar_arvore.py <destino> [--meses 3] [--arquivos 20]
+        [--faltando 0.1] [--especiais 0.1] [--seed 42]
+
+Cria <destino>/<NN. Mês>/... com arquivos vazios. Com a mesma seed, a árvore
+gerada é sempre a mesma.
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "API"))
+
+from folder_analyzer import MASTER_TREE, SPECIAL_FILENAME_STEM  # noqa: E402
+
+NOMES_MESES = [
+    "01. Janeiro", "02. Fevereiro", "03. Março", "04. Abril", "05. Maio", "06. Junho",
+    "07. Julho", "08. Agosto", "09. Setembro", "10. Outubro", "11. Novembro", "12. Dezembro",
+]
+
+
+def gerar_mes(
+    destino: Path,
+    arquivos_por_folha: int = 20,
+    fracao_faltando: float = 0.1,
+    fracao_especiais: float = 0.1,
+    seed: int = 42,
+    arvore: dict = MASTER_TREE,
+) -> dict:
+    """
+    Cria a árvore de um mês em 'destino'.
+
+    Args:
+        arquivos_por_folha: média de arquivos por pasta-folha (varia de 0 a 2x).
+        fracao_faltando: fração das pastas do gabarito que não são criadas.
+        fracao_especiais: fração das pastas criadas que recebem o arquivo
+            "Não houveram registros no período" (metade delas sem outros arquivos).
+    Retorna contadores do que foi criado.
+    """
+    rnd = random.Random(seed)
+    contagem = {"diretorios": 0, "arquivos": 0, "especiais": 0, "faltando": 0}
+
+    def _criar(path: Path, no: dict):
+        for nome, filho in no.items():
+            atual = path / nome
+            if rnd.random() < fracao_faltando:
+                contagem["faltando"] += 1
+                continue
+            atual.mkdir(parents=True, exist_ok=True)
+            contagem["diretorios"] += 1
+
+            especial = rnd.random() < fracao_especiais
+            if especial:
+                (atual / f"{SPECIAL_FILENAME_STEM}.pdf").touch()
+                contagem["especiais"] += 1
+
+            if filho:
+                _criar(atual, filho)
+                continue
+
+            if especial and rnd.random() < 0.5:
+                continue
+            for i in range(rnd.randint(0, 2 * arquivos_por_folha)):
+                (atual / f"Documento {i:04d} - evidência.pdf").touch()
+                contagem["arquivos"] += 1
+
+    destino.mkdir(parents=True, exist_ok=True)
+    _criar(destino, arvore)
+    envelhecer(destino)
+    return contagem
+
+
+def envelhecer(destino: Path, segundos: int = 3600) -> None:
+    """
+    Recua o mtime de todas as pastas: pastas recém-criadas não entram no
+    ScanCache (janela de mtime instável), o que distorceria o scan "quente".
+    """
+    momento = os.stat(destino).st_mtime - segundos
+    for raiz, _, _ in os.walk(destino):
+        os.utime(raiz, (momento, momento))
+
+
+def gerar_meses(destino: Path, meses: int = 1, **opcoes) -> list:
+    """Gera 'meses' pastas de mês (seed diferente por mês) e retorna os caminhos."""
+    seed = opcoes.pop("seed", 42)
+    caminhos = []
+    for i in range(meses):
+        caminho = destino / NOMES_MESES[i % 12] if meses <= 12 else destino / f"{i:03d}. Mês"
+        gerar_mes(caminho, seed=seed + i, **opcoes)
+        caminhos.append(caminho)
+    return caminhos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera árvores de mês sintéticas (formato do MASTER_TREE).")
+    parser.add_argument("destino", type=Path)
+    parser.add_argument("--meses", type=int, default=1)
+    parser.add_argument("--arquivos", type=int, default=20, help="média de arquivos por pasta-folha")
+    parser.add_argument("--faltando", type=float, default=0.1, help="fração de pastas não criadas")
+    parser.add_argument("--especiais", type=float, default=0.1, help="fração de pastas com o arquivo especial")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--limpar", action="store_true", help="apaga o destino antes de gerar")
+    args = parser.parse_args(argv)
+
+    if args.limpar and args.destino.exists():
+        shutil.rmtree(args.destino)
+
+    caminhos = gerar_meses(
+        args.destino,
+        meses=args.meses,
+        arquivos_por_folha=args.arquivos,
+        fracao_faltando=args.faltando,
+        fracao_especiais=args.especiais,
+        seed=args.seed,
+    )
+    for caminho in caminhos:
+        print(os.fspath(caminho))
+
+
+if __name__ == "__main__":
+    main()
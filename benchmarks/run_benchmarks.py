@@ -0,0 +1,229 @@
+"""
+Micro-benchmarks dos caminhos quentes: scan do mês, merge com o catálogo e
+carga do catálogo, em vários tamanhos de árvore sintética. O scan também é
+medido num "compartilhamento lento" simulado (ver fs_latencia.py), com e sem
+orçamento por diretório, e a partir de um manifesto em memória (sem I/O).
+
+Uso:
+    python benchmarks/run_benchmarks.py [--tamanhos pequeno,medio,grande]
+        [--repeticoes 5] [--saida resultados.json]
+        [--comparar anterior.json] [--tolerancia 0.25]
+
+Com --comparar, cada benchmark cuja mediana piorou mais que a tolerância em
+relação ao arquivo anterior é listado como regressão (código de saída 1).
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+RAIZ_REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ_REPO / "API"))
+sys.path.insert(0, str(RAIZ_REPO))
+
+from comparar_scan import montar_relatorio_sms_legacy  # noqa: E402
+from folder_analyzer import GABARITO_PADRAO, montar_relatorio_sms  # noqa: E402
+from fs_latencia import SistemaComLatencia  # noqa: E402
+from scan_cache import ScanCache  # noqa: E402
+from sistema_arquivos import Manifesto, listar_manifesto  # noqa: E402
+from gerar_arvore import gerar_mes  # noqa: E402
+
+from src.data_service import carregar_catalogo, processar_merge_api  # noqa: E402
+from src.utils import normalizar_responsavel  # noqa: E402
+
+# arquivos: média de arquivos por pasta-folha; fator: cópias do catálogo/relatório no merge
+TAMANHOS = {
+    "pequeno": {"arquivos": 2, "fator": 1},
+    "medio": {"arquivos": 20, "fator": 10},
+    "grande": {"arquivos": 200, "fator": 100},
+}
+
+CATALOGO_REAL = RAIZ_REPO / "static" / "data.json"
+
+# Compartilhamento lento simulado: atraso de cada scandir/stat, pastas que
+# "travam" (ainda sendo baixadas) e o orçamento por diretório do scan
+LATENCIA_REDE = 0.001
+PASTAS_TRAVADAS = 2
+LATENCIA_PASTA_TRAVADA = 0.5
+ORCAMENTO_DIRETORIO = 0.05
+
+
+def medir(funcao, repeticoes, preparar=None):
+    """Executa 'funcao' 'repeticoes' vezes; 'preparar' roda antes de cada execução, fora da medição."""
+    tempos = []
+    for _ in range(repeticoes):
+        argumento = preparar() if preparar else None
+        inicio = time.perf_counter()
+        funcao(argumento) if preparar else funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return {
+        "min_s": min(tempos),
+        "mediana_s": statistics.median(tempos),
+        "media_s": statistics.fmean(tempos),
+        "repeticoes": repeticoes,
+    }
+
+
+def multiplicar_catalogo(item_map, fator):
+    """Catálogo com 'fator' cópias de cada item (ITEM com sufixo .k a partir da 2ª cópia)."""
+    novo = {}
+    for k in range(fator):
+        for chave, item in item_map.items():
+            copia = dict(item)
+            if k:
+                copia["ITEM"] = f"{item['ITEM']}.{k}"
+            novo[f"{chave}-{k}"] = copia
+    return novo
+
+
+def multiplicar_relatorio(relatorio, fator):
+    """Relatório com os mesmos itens replicados, casando com multiplicar_catalogo."""
+    resultado = {}
+    for categoria, itens in relatorio["result"].items():
+        resultado[categoria] = {}
+        for k in range(fator):
+            for item_id, item in itens.items():
+                resultado[categoria][f"{item_id}.{k}" if k else item_id] = item
+    return {**relatorio, "result": resultado}
+
+
+def rodar_tamanho(nome, config, repeticoes, pasta_tmp):
+    resultados = []
+
+    def registrar(benchmark, medicao, **extra):
+        resultados.append({"benchmark": benchmark, "tamanho": nome, **medicao, **extra})
+        print(f"  {benchmark:<28}{medicao['mediana_s'] * 1000:>10.2f} ms (mediana)")
+
+    mes = pasta_tmp / nome
+    contagem = gerar_mes(mes, arquivos_por_folha=config["arquivos"], seed=42)
+    print(f"[{nome}] {contagem}")
+
+    # --- Scan ---
+    registrar("scan_legacy", medir(lambda: montar_relatorio_sms_legacy(mes), repeticoes), **contagem)
+    registrar("scan_frio", medir(lambda: montar_relatorio_sms(mes), repeticoes), **contagem)
+
+    cache = ScanCache()
+    montar_relatorio_sms(mes, cache=cache)
+    registrar("scan_quente", medir(lambda: montar_relatorio_sms(mes, cache=cache), repeticoes), **contagem)
+    registrar(
+        "scan_quente_orcamento",
+        medir(lambda: montar_relatorio_sms(mes, cache=cache, orcamento_diretorio=ORCAMENTO_DIRETORIO), repeticoes),
+        **contagem,
+    )
+
+    # --- Scan num compartilhamento lento ---
+    folhas = [GABARITO_PADRAO.dir_path[i] for i in GABARITO_PADRAO.folha_dir]
+    folhas = [p for p in folhas if (mes / p).is_dir()]
+    travadas = folhas[:: max(len(folhas) // PASTAS_TRAVADAS, 1)][:PASTAS_TRAVADAS]
+    rede = SistemaComLatencia(LATENCIA_REDE, {f"*/{p}": LATENCIA_PASTA_TRAVADA for p in travadas})
+    registrar("scan_rede_lenta", medir(lambda: montar_relatorio_sms(mes, fs=rede), repeticoes), **contagem)
+    cache_rede = ScanCache()
+    desconhecidos = montar_relatorio_sms(
+        mes, cache=cache_rede, orcamento_diretorio=ORCAMENTO_DIRETORIO, fs=rede
+    ).get("diretorios_desconhecidos", 0)
+    registrar(
+        "scan_rede_lenta_orcamento",
+        medir(
+            lambda: montar_relatorio_sms(mes, cache=cache_rede, orcamento_diretorio=ORCAMENTO_DIRETORIO, fs=rede),
+            repeticoes,
+        ),
+        diretorios_desconhecidos=desconhecidos,
+        **contagem,
+    )
+
+    # --- Scan de um manifesto (só o custo do scan, sem I/O) ---
+    manifesto = Manifesto.de_entradas(listar_manifesto(mes), raiz=mes)
+    registrar("scan_manifesto", medir(lambda: montar_relatorio_sms(mes, fs=manifesto), repeticoes), **contagem)
+
+    # --- Catálogo ---
+    with open(CATALOGO_REAL, encoding="utf-8") as f:
+        item_map = multiplicar_catalogo(json.load(f), config["fator"])
+    caminho_catalogo = pasta_tmp / f"catalogo_{nome}.json"
+    caminho_catalogo.write_text(json.dumps(item_map, ensure_ascii=False), encoding="utf-8")
+
+    registrar("carregar_catalogo", medir(lambda: carregar_catalogo(caminho_catalogo), repeticoes), itens=len(item_map))
+
+    responsaveis = [item.get("RESPONSAVEL") for item in item_map.values()]
+    registrar(
+        "normalizar_responsavel",
+        medir(lambda: [normalizar_responsavel(r) for r in responsaveis], repeticoes),
+        itens=len(responsaveis),
+    )
+
+    # --- Merge ---
+    df_catalogo = carregar_catalogo(caminho_catalogo)
+    relatorio = multiplicar_relatorio(montar_relatorio_sms(mes), config["fator"])
+    registrar(
+        "processar_merge_api",
+        medir(lambda df: processar_merge_api(df, relatorio), repeticoes, preparar=df_catalogo.copy),
+        itens=len(df_catalogo),
+    )
+
+    return resultados
+
+
+def comparar(resultados, caminho_anterior, tolerancia):
+    """Retorna as regressões (mediana atual > anterior * (1 + tolerancia))."""
+    with open(caminho_anterior, encoding="utf-8") as f:
+        anteriores = {(r["benchmark"], r["tamanho"]): r for r in json.load(f)["resultados"]}
+
+    regressoes = []
+    print(f"\nComparação com {caminho_anterior}:")
+    for r in resultados:
+        anterior = anteriores.get((r["benchmark"], r["tamanho"]))
+        if anterior is None:
+            continue
+        razao = r["mediana_s"] / anterior["mediana_s"] if anterior["mediana_s"] else float("inf")
+        marca = "REGRESSÃO" if razao > 1 + tolerancia else ""
+        print(f"  {r['benchmark']:<28}{r['tamanho']:<10}{razao:>8.2f}x {marca}")
+        if marca:
+            regressoes.append({**r, "razao": razao})
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do scan, merge e catálogo.")
+    parser.add_argument("--tamanhos", default=",".join(TAMANHOS), help="ex.: pequeno,medio")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--saida", type=Path, default=Path("resultados_benchmark.json"))
+    parser.add_argument("--comparar", type=Path, help="JSON de uma execução anterior")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="piora relativa aceita (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    tamanhos = [t.strip() for t in args.tamanhos.split(",") if t.strip()]
+    desconhecidos = [t for t in tamanhos if t not in TAMANHOS]
+    if desconhecidos:
+        parser.error(f"tamanhos desconhecidos: {', '.join(desconhecidos)}")
+
+    resultados = []
+    with tempfile.TemporaryDirectory(prefix="idf_bench_") as tmp:
+        for nome in tamanhos:
+            resultados += rodar_tamanho(nome, TAMANHOS[nome], args.repeticoes, Path(tmp))
+
+    saida = {
+        "meta": {
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "repeticoes": args.repeticoes,
+        },
+        "resultados": resultados,
+    }
+    args.saida.write_text(json.dumps(saida, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\nResultados salvos em {args.saida}")
+
+    if args.comparar:
+        regressoes = comparar(resultados, args.comparar, args.tolerancia)
+        if regressoes:
+            print(f"{len(regressoes)} regressão(ões) acima de {args.tolerancia:.0%}.")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
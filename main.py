@@ -1,25 +1,59 @@
-import itertools
 from os import replace
 import pandas as pd
 import json
 import requests
 from datetime import datetime
 from pathlib import Path
-from os import getlogin
+from urllib.parse import quote, unquote
+from os import getenv, getlogin
 import streamlit as st
 from streamlit_extras.pdf_viewer import pdf_viewer
 
 
 from static.svg_icons import *
 
-from src.utils import normalizar_responsavel, limpar_id_item
+from src.utils import PADRAO_CONCLUIDO, normalizar_responsavel, limpar_id_item
 from src.ui_components import render_css
-from src.data_service import processar_merge_api
+from src.data_service import IndiceResponsaveis, MergeMemoizado, carregar_catalogo, indexar_itens
+from src.notificacoes import RegistroOuvintes
+from src.poller import RegistroPollers
+from src.embutido import PollerEmbutido, ScannerEmbutido
+from src.api_client import ClienteAPI
 
 # =============================================================================
-BASE_PATH = Path(fr"C:/Users/{getlogin()}/C3 ENGENHARIA/C3 Engenharia SEDE - 3.1.30 - IDF")
+# IDF_RAIZ troca a pasta do IDF (a mesma variável da API; ver API/contratos.py)
+BASE_PATH = Path(getenv("IDF_RAIZ") or fr"C:/Users/{getlogin()}/C3 ENGENHARIA/C3 Engenharia SEDE - 3.1.30 - IDF")
+
+# IDF_MODO=embutido roda o scanner (API/folder_analyzer.py) neste processo e lê
+# o relatório direto da memória, sem HTTP nem JSON; o padrão "http" consulta
+# o serviço FastAPI (que pode estar em outra máquina).
+MODO_EMBUTIDO = getenv("IDF_MODO", "http") == "embutido"
 
 API_URL = "http://localhost:8000/sms?month="
+API_CHANGES_URL = "http://localhost:8000/sms/changes?month="
+API_STREAM_URL = "http://localhost:8000/sms/stream?month="
+API_SUMMARY_URL = "http://localhost:8000/sms/summary?month="
+API_ITEM_URL = "http://localhost:8000/sms/item/"
+
+# Com USAR_RELATORIO_ENXUTO, o relatório vem sem os diretórios/arquivos de cada
+# item (slim=true); os detalhes de um item são buscados só quando abertos.
+USAR_RELATORIO_ENXUTO = True
+
+# Um poller por mês, compartilhado por todas as sessões, mantém o relatório
+# (ver obter_registro_pollers). Com USAR_PUSH, ele só busca quando o
+# /sms/stream anuncia uma versão nova; se a conexão SSE cair, volta ao polling
+# de INTERVALO_POLLING. O fragmento de cada sessão só lê a cópia compartilhada
+# a cada INTERVALO_VERIFICACAO segundos, sem HTTP. Um mês que nenhuma sessão
+# consulta por POLLER_TTL_OCIOSO segundos deixa de ser buscado.
+USAR_PUSH = True
+INTERVALO_VERIFICACAO = 2
+INTERVALO_POLLING = 30
+POLLER_TTL_OCIOSO = 120
+ESPERA_PRIMEIRA_CARGA = 10
+
+# Aba BI & Análise: cards renderizados por página (tamanhos oferecidos ao usuário)
+BI_TAMANHOS_PAGINA = [10, 25, 50, 100]
+BI_TAMANHO_PAGINA_PADRAO = 10
 
 MONTH_OPTIONS = {
     "Março": "3.%20Março",
@@ -40,54 +74,110 @@ MONTH_OPTIONS = {
 
 @st.cache_data
 def carregar_dados_principais():
-    """Carrega dados do JSON."""
+    """Carrega dados do JSON e monta o índice responsável -> itens."""
     try:
-        with open("./static/data.json", 'r', encoding="utf-8") as f:
-            item_map = json.load(f)
-        df = pd.DataFrame.from_dict(item_map, orient="index").reset_index(drop=True)
-        if not df.empty:
-            df["RESPONSAVEL"] = df["RESPONSAVEL"].apply(normalizar_responsavel)
-            df["ITEM"] = df["ITEM"].apply(limpar_id_item)
-        return df
+        df = carregar_catalogo("./static/data.json")
 
     except Exception as e:
         st.error(f"Erro ao carregar data.json: {e}")
-        return pd.DataFrame()
+        df = pd.DataFrame()
+    return df, IndiceResponsaveis(df)
+
+@st.cache_resource
+def obter_cliente_api():
+    """Cliente HTTP da API (pool de conexões, timeouts, retentativas, circuit breaker) do processo."""
+    return ClienteAPI()
+
+@st.cache_resource
+def obter_registro_ouvintes():
+    """Ouvintes SSE compartilhados por todas as sessões do processo."""
+    return RegistroOuvintes(API_STREAM_URL)
+
+@st.cache_resource
+def obter_scanner_embutido():
+    """Scanner do modo embutido (cache de listagens, gabarito e catálogo) do processo."""
+    return ScannerEmbutido(BASE_PATH)
+
+@st.cache_resource
+def obter_registro_pollers():
+    """Pollers por mês compartilhados por todas as sessões: uma busca e uma cópia do relatório por mês."""
+    if MODO_EMBUTIDO:
+        return RegistroPollers(
+            fabrica=PollerEmbutido,
+            scanner=obter_scanner_embutido(),
+            intervalo_verificacao=INTERVALO_VERIFICACAO,
+            intervalo_polling=INTERVALO_POLLING,
+            ttl_ocioso=POLLER_TTL_OCIOSO,
+        )
+    return RegistroPollers(
+        urls={"sms": API_URL, "changes": API_CHANGES_URL},
+        cliente=obter_cliente_api(),
+        ouvintes=obter_registro_ouvintes() if USAR_PUSH else None,
+        enxuto=USAR_RELATORIO_ENXUTO,
+        intervalo_verificacao=INTERVALO_VERIFICACAO,
+        intervalo_polling=INTERVALO_POLLING,
+        ttl_ocioso=POLLER_TTL_OCIOSO,
+    )
 
 # =============================================================================
 # 2. COMPONENTES DE UI (POPUPS / DIALOGS)
 # =============================================================================
 
+def _indice_itens_da_api():
+    """
+    Índice por item do relatório em st.session_state.api_response (ver
+    indexar_itens). É reconstruído só quando o relatório muda: o fragmento
+    de busca troca o objeto inteiro a cada versão nova.
+    """
+    api_data = st.session_state.get('api_response', {})
+    memo = st.session_state.get('indice_itens')
+    if memo is None or memo[0] is not api_data:
+        memo = (api_data, indexar_itens(api_data))
+        st.session_state.indice_itens = memo
+    return memo[1]
+
 def _buscar_detalhes_do_item_na_api(item_codigo):
     """
-    Busca os detalhes completos de um item na API armazenada no session_state.
-    VERSÃO CORRIGIDA - Adiciona tratamento de erros robusto.
+    Detalhes completos de um item (com diretórios e arquivos).
+    Com o relatório enxuto, busca no /sms/item/{item_id} sob demanda e guarda
+    só os itens da versão atual do relatório.
     """
-    try:
-        api_data = st.session_state.get('api_response', {})
-        
-        # Verifica se existe a estrutura esperada
-        if not api_data:
+    detalhes = _indice_itens_da_api().detalhes.get(item_codigo)
+    if detalhes is None or "diretorios" in detalhes:
+        return detalhes
+
+    versao = (st.session_state.get('api_mes'), st.session_state.get('api_versao'))
+    cache = st.session_state.get('detalhes_itens')
+    if cache is None or cache["versao"] != versao:
+        cache = st.session_state.detalhes_itens = {"versao": versao, "itens": {}}
+
+    if item_codigo not in cache["itens"]:
+        try:
+            response = obter_cliente_api().get(API_ITEM_URL + quote(item_codigo, safe=""), params={"month": unquote(versao[0])})
+            response.raise_for_status()
+            payload = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            st.warning(f"Erro ao buscar detalhes do item {item_codigo}: {e}")
             return None
-        
-        # Navega para o segundo 'result' (se existir)
-        if isinstance(api_data, dict):
-            itens_por_setor = api_data.get('result', api_data)
-        else:
-            itens_por_setor = api_data
-        
-        # Itera sobre todos os setores para encontrar o item
-        if isinstance(itens_por_setor, dict):
-            for setor_nome, itens in itens_por_setor.items():
-                if isinstance(itens, dict):
-                    detalhes = itens.get(item_codigo)
-                    if detalhes:
-                        return detalhes
-        return None
-        
-    except Exception as e:
-        st.warning(f"Erro ao buscar detalhes do item {item_codigo}: {e}")
-        return None
+        if payload.get("status") != "ok":
+            return None
+        cache["itens"][item_codigo] = payload["item"]
+    return cache["itens"][item_codigo]
+
+def _diretorios_pendentes(item_codigo):
+    """
+    Diretórios com qtd 0 do item, do índice (o relatório enxuto já traz os
+    nomes). Só uma API antiga, sem 'diretorios_pendentes', leva ao /sms/item.
+    """
+    indice = _indice_itens_da_api()
+    if item_codigo in indice.pendentes:
+        return indice.pendentes[item_codigo]
+
+    resumo = indice.detalhes.get(item_codigo)
+    if not resumo or "diretorios_pendentes" in resumo or not resumo.get("pastas_pendentes"):
+        return []
+    detalhes = _buscar_detalhes_do_item_na_api(item_codigo) or {}
+    return [d for d in detalhes.get('diretorios', []) if d.get("qtd", 0) == 0]
 
 def _render_pendencias_detalhadas(df_pendencias):
     """
@@ -101,42 +191,35 @@ def _render_pendencias_detalhadas(df_pendencias):
     
     # Flag para saber se encontramos algo para exibir
     encontrou_pendencia_diretorio = False
-    
-    for _, item in df_pendencias.iterrows():
+
+    for item in df_pendencias.to_dict("records"):
         item_codigo = item['ITEM']
         
-        # 1. Busca os detalhes originais da API
-        detalhes_api = _buscar_detalhes_do_item_na_api(item_codigo)
+        # 1. e 2. Diretórios pendentes do item (índice do relatório da API)
+        diretorios_pendentes = _diretorios_pendentes(item_codigo)
         
-        # 2. Filtra os diretórios pendentes (qtd: 0)
-        if detalhes_api and detalhes_api.get('diretorios'):
-            diretorios_pendentes = [
-                dir_info for dir_info in detalhes_api['diretorios'] 
-                if dir_info.get("qtd", 0) == 0
-            ]
+        # 3. Só exibe se houver diretórios pendentes
+        if diretorios_pendentes:
+            encontrou_pendencia_diretorio = True
             
-            # 3. Só exibe se houver diretórios pendentes
-            if diretorios_pendentes:
-                encontrou_pendencia_diretorio = True
-                
-                st.markdown(f"#### 📄 Item {item_codigo} ({item['SETOR']})")
-                
-                # Formata lista de responsáveis
-                responsaveis = item.get('RESPONSAVEL', [])
-                if isinstance(responsaveis, list):
-                    resp_str = ', '.join(responsaveis)
-                else:
-                    resp_str = str(responsaveis)
-                
-                st.markdown(f"**Status:** {item['STATUS']} | **Responsáveis:** {resp_str}")
-                
-                with st.container(border=True):
-                    st.markdown("##### 📁 **Diretórios Pendentes (Qtd: 0)**")
-                    for dir_info in diretorios_pendentes:
-                        st.markdown(f"&nbsp;&nbsp;&nbsp;&nbsp;- `{dir_info['diretorio']}`")
-                
-                st.divider()
-    
+            st.markdown(f"#### 📄 Item {item_codigo} ({item['SETOR']})")
+            
+            # Formata lista de responsáveis
+            responsaveis = item.get('RESPONSAVEL', [])
+            if isinstance(responsaveis, list):
+                resp_str = ', '.join(responsaveis)
+            else:
+                resp_str = str(responsaveis)
+            
+            st.markdown(f"**Status:** {item['STATUS']} | **Responsáveis:** {resp_str}")
+            
+            with st.container(border=True):
+                st.markdown("##### 📁 **Diretórios Pendentes (Qtd: 0)**")
+                for dir_info in diretorios_pendentes:
+                    st.markdown(f"&nbsp;&nbsp;&nbsp;&nbsp;- `{dir_info['diretorio']}`")
+            
+            st.divider()
+
     # 4. Mensagem final
     if not encontrou_pendencia_diretorio:
         st.success("🎉 Todos os diretórios possuem arquivos! Nenhuma pendência encontrada.")
@@ -193,7 +276,7 @@ def show_itens_setor(df_completo, setor):
     # 1. Filtra por Setor e por Status (Apenas itens não concluídos)
     df_setor = df_completo[df_completo['SETOR'] == setor].copy()
     df_pendencias = df_setor[
-        ~df_setor['STATUS'].astype(str).str.contains("Concluído|Concluido", case=False, na=False)
+        ~df_setor['STATUS'].astype(str).str.contains(PADRAO_CONCLUIDO, case=False, na=False)
     ]
     
     # 2. Renderiza as pendências
@@ -207,17 +290,16 @@ def show_itens_setor(df_completo, setor):
         st.rerun()
 
 @st.dialog("Itens do Responsável", width="medium")
-def show_itens_responsavel(df_completo, nome):
+def show_itens_responsavel(df_completo, nome, indice_resp):
     """Mostra pendências detalhadas de um responsável específico."""
     st.write(f"### Pendências de: {nome}")
     
-    # 1. Explode o DataFrame e filtra pelo nome do responsável
-    df_exploded = df_completo.explode('RESPONSAVEL')
-    df_resp = df_exploded[df_exploded['RESPONSAVEL'] == nome].copy()
+    # 1. Filtra pelo nome do responsável (índice invertido)
+    df_resp = indice_resp.filtrar(df_completo, [nome])
     
     # 2. Filtra apenas itens não concluídos
     df_pendencias = df_resp[
-        ~df_resp['STATUS'].astype(str).str.contains("Concluído|Concluido", case=False, na=False)
+        ~df_resp['STATUS'].astype(str).str.contains(PADRAO_CONCLUIDO, case=False, na=False)
     ]
     
     # 3. Renderiza as pendências
@@ -329,7 +411,7 @@ def render_setor_row(df_completo, setor, itens, max_itens):
         if st.button(f"{itens}", key=f"btn_setor_{setor}_{itens}", type="secondary"):
             show_itens_setor(df_completo, setor)
 
-def render_responsavel_row(df_completo, sigla, avatar_class, nome, itens_text):
+def render_responsavel_row(df_completo, sigla, avatar_class, nome, itens_text, indice_resp):
     """
     Renderiza a linha do responsável com botão que abre o popup.
     VERSÃO CORRIGIDA - Garante que o dataframe completo seja passado.
@@ -354,11 +436,16 @@ def render_responsavel_row(df_completo, sigla, avatar_class, nome, itens_text):
     with col_btn:
         # CORREÇÃO: Usa um identificador único e estável
         if st.button(f"{itens_text}", key=f"btn_resp_{nome.replace(' ', '_')}", type="secondary"):
-            show_itens_responsavel(df_completo, nome)
+            show_itens_responsavel(df_completo, nome, indice_resp)
 
 
+@st.fragment
 def render_bi_item(item_row, mes_sel):
-    """Renderiza um único card de item na aba BI & Análise."""
+    """
+    Renderiza um único card de item na aba BI & Análise.
+    Cada card é um fragmento: interagir com um card (ex.: abrir os detalhes)
+    só re-renderiza esse card, não a página nem os outros cards.
+    """
     item = item_row 
     
     with st.container(border=True):
@@ -501,11 +588,15 @@ def render_bi_item(item_row, mes_sel):
                 unsafe_allow_html=True
             )
             
-        # --- INÍCIO DA ALTERAÇÃO ---
-        with st.expander("Ver detalhes e documentos"):
+        # Os detalhes só são montados (e, com o relatório enxuto, buscados na API)
+        # quando o toggle está ligado; como o card é um fragmento, só ele re-renderiza.
+        if st.toggle("Ver detalhes e documentos", key=f"detalhes_{item['ID_CATALOGO']}"):
             
             # Pega a lista de diretorios
-            diretorios_list = item.get("DIRETORIOS", [])
+            diretorios_list = item.get("DIRETORIOS") or []
+            if not diretorios_list:
+                detalhes_api = _buscar_detalhes_do_item_na_api(item['ITEM']) or {}
+                diretorios_list = detalhes_api.get("diretorios", [])
             
             if not diretorios_list:
                 st.info("Nenhum diretório ou evidência registrada para este item.")
@@ -551,7 +642,7 @@ def render_bi_item(item_row, mes_sel):
 # 4. RENDERIZAÇÃO DAS PÁGINAS PRINCIPAIS (VIEWS)
 # =============================================================================
 
-def render_sidebar(df: pd.DataFrame):
+def render_sidebar(df: pd.DataFrame, indice_resp: IndiceResponsaveis):
     """Renderiza a barra lateral e retorna as seleções."""
     st.sidebar.header("Filtros")
     
@@ -559,9 +650,8 @@ def render_sidebar(df: pd.DataFrame):
     setores_opcoes = df["SETOR"].unique()
     setores_sel = st.sidebar.multiselect("Selecione o Setor", options=setores_opcoes, placeholder="Selecione o Setor")
     
-    # df["RESPONSAVEL"] já deve estar normalizado aqui
-    responsaveis_opcoes = list(set(itertools.chain.from_iterable(df["RESPONSAVEL"])))
-    resp_sel = st.sidebar.multiselect("Selecione o Responsável", options=sorted(responsaveis_opcoes), placeholder="Selecione o Responsável")
+    # Nomes já normalizados e ordenados no índice
+    resp_sel = st.sidebar.multiselect("Selecione o Responsável", options=indice_resp.nomes, placeholder="Selecione o Responsável")
 
     mes_opcoes = ["Março", "Abril", "Maio", "Junho", "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"]
     
@@ -579,36 +669,89 @@ def render_sidebar(df: pd.DataFrame):
     
     return setores_sel, resp_sel, mes_sel
 
-def render_dashboard_tab(df_completo, setores_sel, resp_sel, mes_sel):
-    """Renderiza o Dashboard com contagem real de itens pendentes por usuário."""
+def _buscar_resumo(api_month_value, setores_sel, resp_sel):
+    """
+    GET /sms/summary (só os agregados do dashboard, já filtrados pela sidebar).
+    O resumo fica em session_state por mês + filtros; enquanto a versão do
+    relatório for a mesma, não há requisição. Depois, o GET é condicional.
+    No modo embutido, os agregados são calculados aqui mesmo.
+    """
+    if MODO_EMBUTIDO:
+        return obter_scanner_embutido().resumir(
+            api_month_value, st.session_state.get('api_versao'), st.session_state.get('api_response', {}),
+            setores_sel, resp_sel,
+        )
+
+    chave = (api_month_value, tuple(setores_sel), tuple(resp_sel))
+    guardado = st.session_state.get('api_resumo')
+    versao_atual = st.session_state.get('api_versao')
+
+    headers = {}
+    if guardado and guardado["chave"] == chave:
+        if versao_atual and guardado["versao"] == versao_atual:
+            return guardado["resumo"]
+        headers["If-None-Match"] = guardado["etag"]
+
+    response = obter_cliente_api().get(
+        API_SUMMARY_URL + api_month_value,
+        params={"setores": ",".join(setores_sel), "responsaveis": ",".join(resp_sel)},
+        headers=headers,
+    )
+    if response.status_code == 304:
+        guardado["versao"] = response.headers.get("X-Versao-Relatorio")
+        return guardado["resumo"]
+    response.raise_for_status()
+    payload = response.json()
+    if payload.get("status") != "ok":
+        return None
+
+    st.session_state.api_resumo = {
+        "chave": chave,
+        "versao": payload.get("versao"),
+        "etag": response.headers.get("ETag"),
+        "resumo": payload["resumo"],
+    }
+    return payload["resumo"]
+
+def render_dashboard_tab(df_completo, setores_sel, resp_sel, mes_sel, indice_resp):
+    """
+    Renderiza o Dashboard com contagem real de itens pendentes por usuário.
+    Os números vêm prontos do /sms/summary; df_completo só é usado nos popups.
+    """
     
     st.title(f"Dashboard de Análise - {mes_sel}") # Opcional: Adicionei o mês no título para feedback visual
     st.divider()
 
-    # --- 1. APLICAR FILTROS DA SIDEBAR (Setor e Responsável) ---
-    df_dash = df_completo.copy()
+    # --- 1. AGREGADOS DA API (já com os filtros da sidebar: Setor e Responsável) ---
+    if mes_sel not in MONTH_OPTIONS:
+        st.info("Sem dados para o mês selecionado.")
+        return
+    try:
+        resumo = _buscar_resumo(MONTH_OPTIONS[mes_sel], setores_sel, resp_sel)
+    except requests.exceptions.RequestException as e:
+        # API fora: mostra o último resumo desses mesmos filtros, se houver
+        guardado = st.session_state.get('api_resumo')
+        if not guardado or guardado["chave"] != (MONTH_OPTIONS[mes_sel], tuple(setores_sel), tuple(resp_sel)):
+            st.error(f"Erro ao buscar o resumo na API: {e}")
+            return
+        resumo = guardado["resumo"]
+        st.caption("⏳ Resumo desatualizado: a API está indisponível.")
+    if resumo is None:
+        st.info("Sem dados para o mês selecionado.")
+        return
 
+    # Base dos popups, filtrada como o resumo
+    df_dash = df_completo
     if setores_sel:
         df_dash = df_dash[df_dash["SETOR"].isin(setores_sel)]
-    
     if resp_sel:
-        df_dash = df_dash[df_dash["RESPONSAVEL"].apply(
-            lambda lista: any(resp in lista for resp in resp_sel)
-        )]
-
-    # --- 2. CÁLCULO DAS MÉTRICAS GERAIS ---
-    total_itens = len(df_dash)
-    
-    if "STATUS" in df_dash.columns:
-        status_series = df_dash["STATUS"].fillna("Não Iniciado").astype(str).str.lower()
-    else:
-        status_series = pd.Series(["não iniciado"] * total_itens)
-
-    qtd_concluido = status_series[status_series.str.contains("concluído|concluido")].count()
-    qtd_andamento = status_series[status_series.str.contains("em andamento|execução")].count()
-    qtd_nao_iniciado = status_series[status_series.str.contains("não iniciado|não enviado")].count()
+        df_dash = indice_resp.filtrar(df_dash, resp_sel)
 
-    taxa_conclusao = (qtd_concluido / total_itens * 100) if total_itens > 0 else 0
+    # --- 2. MÉTRICAS GERAIS ---
+    qtd_concluido = resumo["concluidos"]
+    qtd_andamento = resumo["em_andamento"]
+    qtd_nao_iniciado = resumo["nao_iniciados"]
+    taxa_conclusao = resumo["taxa_conclusao"]
 
     # --- 3. RENDERIZAÇÃO DOS CARDS ---
     with st.container():
@@ -621,66 +764,77 @@ def render_dashboard_tab(df_completo, setores_sel, resp_sel, mes_sel):
     # --- 4. GRÁFICOS E LISTAS ---
     col_setor, col_resp = st.columns(2)
 
-    # --- A. Itens Faltantes por Setor (CORRIGIDO) ---
+    # --- A. Itens Faltantes por Setor ---
     with col_setor:
         with st.container(border=True, height=400):
             st.subheader("Itens Faltantes por Setor")
             
-            # --- CORREÇÃO AQUI ---
-            # Cria um DF temporário apenas com o que NÃO está concluído
-            df_faltantes = df_dash[
-                ~df_dash['STATUS'].astype(str).str.contains("Concluído|Concluido", case=False, na=False)
-            ]
+            pendentes_setor = resumo["pendentes_por_setor"]
             
-            if df_faltantes.empty:
+            if not pendentes_setor:
                  # Se tudo estiver concluído ou não houver dados filtrados
-                if df_dash.empty:
+                if resumo["total_itens"] == 0:
                     st.info("Sem dados para os filtros selecionados.")
                 else:
                     st.success("Todos os itens foram concluídos neste mês!")
             else:
-                # Conta apenas os itens desse DF filtrado (Faltantes)
-                df_setores_view = df_faltantes["SETOR"].value_counts().reset_index()
-                df_setores_view.columns = ["Setor", "Itens"]
+                max_itens = pendentes_setor[0]["itens"]
                 
-                max_itens = df_setores_view["Itens"].max()
-                
-                for _, row in df_setores_view.iterrows():
-                    # Passamos df_faltantes aqui para que o popup abra os itens certos
-                    render_setor_row(df_faltantes, row["Setor"], int(row["Itens"]), int(max_itens))
+                for row in pendentes_setor:
+                    # O popup filtra os não concluídos do setor
+                    render_setor_row(df_dash, row["setor"], row["itens"], max_itens)
 
     # --- B. Itens Pendentes por Responsável ---
     with col_resp:
         with st.container(border=True, height=400):
             st.subheader("Pendências por Responsável")
             
-            if df_dash.empty:
+            if resumo["total_itens"] == 0:
                 st.info("Sem dados.")
+            elif not resumo["pendentes_por_responsavel"]:
+                st.success("Nenhuma pendência encontrada para os filtros atuais!")
             else:
-                df_exploded = df_dash.explode('RESPONSAVEL')
-
-                # Filtra apenas o que NÃO está concluído
-                df_pendentes = df_exploded[
-                    ~df_exploded['STATUS'].astype(str).str.contains("Concluído|Concluido", case=False, na=False)
-                ]
-
-                if df_pendentes.empty:
-                    st.success("Nenhuma pendência encontrada para os filtros atuais!")
-                else:
-                    contagem_resp = df_pendentes['RESPONSAVEL'].value_counts().reset_index()
-                    contagem_resp.columns = ['Nome', 'Qtd_Pendentes']
+                for row in resumo["pendentes_por_responsavel"]:
+                    nome = row["nome"]
+                    qtd = row["pendentes"]
+                    sigla = nome[:2].upper() if isinstance(nome, str) else "??"
+                    avatar_class = "avatar-ta" if qtd < 3 else "avatar-le" 
+                    item_text = f"{qtd} pendentes"
                     
-                    for _, row in contagem_resp.iterrows():
-                        nome = row['Nome']
-                        qtd = row['Qtd_Pendentes']
-                        sigla = nome[:2].upper() if isinstance(nome, str) else "??"
-                        avatar_class = "avatar-ta" if qtd < 3 else "avatar-le" 
-                        item_text = f"{qtd} pendentes"
-                        
-                        render_responsavel_row(df_dash, sigla, avatar_class, nome, item_text)        
+                    render_responsavel_row(df_dash, sigla, avatar_class, nome, item_text, indice_resp)        
 
 
-def render_bi_tab(df_base_normalizada, setores_sel, resp_sel, mes_sel):
+def _render_paginacao_bi(total_itens, filtros):
+    """
+    Controles de paginação da aba BI. Volta para a página 1 quando os filtros
+    mudam. Retorna o intervalo [inicio, fim) de linhas a renderizar.
+    """
+    assinatura = repr(filtros)
+    if st.session_state.get("bi_filtros") != assinatura:
+        st.session_state.bi_filtros = assinatura
+        st.session_state.bi_pagina = 1
+
+    tamanho = st.session_state.get("bi_tamanho_pagina", BI_TAMANHO_PAGINA_PADRAO)
+    total_paginas = max(1, -(-total_itens // tamanho))
+    if st.session_state.get("bi_pagina", 1) > total_paginas:
+        st.session_state.bi_pagina = total_paginas
+
+    col_tamanho, col_pagina, col_info = st.columns([1, 1, 2], vertical_alignment="bottom")
+    with col_tamanho:
+        tamanho = st.selectbox(
+            "Itens por página", BI_TAMANHOS_PAGINA,
+            index=BI_TAMANHOS_PAGINA.index(BI_TAMANHO_PAGINA_PADRAO), key="bi_tamanho_pagina",
+        )
+    with col_pagina:
+        pagina = st.number_input("Página", min_value=1, max_value=total_paginas, step=1, key="bi_pagina")
+
+    inicio = (pagina - 1) * tamanho
+    fim = min(inicio + tamanho, total_itens)
+    with col_info:
+        st.caption(f"Itens {inicio + 1}–{fim} de {total_itens} (página {pagina} de {total_paginas})")
+    return inicio, fim
+
+def render_bi_tab(df_base_normalizada, setores_sel, resp_sel, mes_sel, indice_resp):
     """Renderiza todo o conteúdo da aba 'BI & Análise'."""
     
     if df_base_normalizada.empty:
@@ -694,9 +848,7 @@ def render_bi_tab(df_base_normalizada, setores_sel, resp_sel, mes_sel):
 
     if resp_sel:
         # Filtra o dataframe se a lista 'RESPONSAVEL' contiver QUALQUER um dos responsáveis selecionados
-        df_base_aba = df_base_aba[df_base_aba["RESPONSAVEL"].apply(
-            lambda lista: any(resp in lista for resp in resp_sel)
-        )]
+        df_base_aba = indice_resp.filtrar(df_base_aba, resp_sel)
     
     if setores_sel:
         df_base_aba = df_base_aba[df_base_aba["SETOR"].isin(setores_sel)]
@@ -741,50 +893,94 @@ def render_bi_tab(df_base_normalizada, setores_sel, resp_sel, mes_sel):
         st.write("Filtros da Aba:", {"Status": filtro_status, "Item": filtro_item})
         st.write(df_final[["ITEM", "RESPONSAVEL", "SETOR", "STATUS", "PERCENTUAL"]].head(25))
 
-    # 5. RENDERIZAÇÃO DE ITENS
+    # 5. RENDERIZAÇÃO DE ITENS (só a página atual)
     if df_final.empty:
         st.info("Nenhum item encontrado com os filtros selecionados.")
     else:
-        for _, item in df_final.iterrows():
+        inicio, fim = _render_paginacao_bi(len(df_final), (setores_sel, resp_sel, mes_sel, filtro_status, filtro_item))
+        for item in df_final.iloc[inicio:fim].to_dict("records"):
             render_bi_item(item, mes_sel)
 
 # =============================================================================
 # 7. LÓGICA DE API (MOVIDA PARA O ESCOPO PRINCIPAL)
 # =============================================================================
 
-@st.fragment(run_every=30)
+def _sincronizar_api(mes_selecionado):
+    """
+    Aponta st.session_state.api_response para o relatório compartilhado do mês
+    (ver obter_registro_pollers). Retorna True se o relatório mudou.
+    A sessão não faz HTTP nem guarda cópia própria: só a referência ao objeto
+    mantido pelo poller do mês, que o troca inteiro a cada versão nova.
+    """
+    # mes_selecionado vem da sidebar
+    if mes_selecionado not in MONTH_OPTIONS:
+        # Não mostra toast se for a primeira execução
+        if "sidebar_mes_sel" in st.session_state: 
+            st.toast(f"Mês '{mes_selecionado}' inválido para API.", icon="⚠️")
+        return False # Retorna silenciosamente se o mês for inválido
+
+    api_month_value = MONTH_OPTIONS[mes_selecionado]
+    poller = obter_registro_pollers().obter(api_month_value)
+    if st.session_state.api_mes != api_month_value:
+        # Mês recém-aberto: espera a primeira busca do poller para não abrir vazio
+        poller.carregado.wait(timeout=ESPERA_PRIMEIRA_CARGA)
+
+    estado = poller.estado
+    if estado.falha_desde is not None and st.session_state.api_falha_desde is None:
+        st.toast(f"Erro ao conectar na API: {estado.erro}", icon="🔥")
+    st.session_state.api_falha_desde = estado.falha_desde
+
+    if estado.relatorio is None:
+        return False
+    if estado.relatorio is st.session_state.api_response and st.session_state.api_mes == api_month_value:
+        return False
+
+    st.session_state.api_response = estado.relatorio
+    st.session_state.api_etag = estado.etag
+    st.session_state.api_versao = estado.versao
+    st.session_state.api_mes = api_month_value
+    return True
+
+@st.fragment(run_every=INTERVALO_VERIFICACAO)
 def fetch_api_fragment(mes_selecionado):
     """
-    Busca dados da API e armazena em st.session_state.api_response.
+    Lê o relatório compartilhado do mês e o referencia em st.session_state.api_response.
     Esta função agora é chamada de dentro de main() para rodar sempre.
+    Se a API falhar (ou o circuit breaker do cliente estiver aberto), os
+    últimos dados recebidos continuam na tela com um aviso de desatualizados.
     """
     if 'api_response' not in st.session_state:
         st.session_state.api_response = {}
-        
+    if 'api_etag' not in st.session_state:
+        st.session_state.api_etag = None
+    if 'api_versao' not in st.session_state:
+        st.session_state.api_versao = None
+    if 'api_mes' not in st.session_state:
+        st.session_state.api_mes = None
+    if 'api_falha_desde' not in st.session_state:
+        st.session_state.api_falha_desde = None
+
+    mudou = False
     try:
-        # mes_selecionado vem da sidebar
-        if mes_selecionado not in MONTH_OPTIONS:
-            # Não mostra toast se for a primeira execução
-            if "sidebar_mes_sel" in st.session_state: 
-                st.toast(f"Mês '{mes_selecionado}' inválido para API.", icon="⚠️")
-            return # Retorna silenciosamente se o mês for inválido
-
-        api_month_value = MONTH_OPTIONS[mes_selecionado]
-        
-        response = requests.get(API_URL + api_month_value)
-        response.raise_for_status()
-        new_data = response.json().get("result", {}) 
+        mudou = _sincronizar_api(mes_selecionado)
+    except Exception as e:
+        st.toast(f"Erro ao processar dados da API no fragment: {e}", icon="⚠️")
 
-        old_data = st.session_state.api_response
+    # Marca de dados desatualizados (o fragmento redesenha a cada execução)
+    if st.session_state.api_falha_desde is not None:
+        desde = st.session_state.api_falha_desde.strftime("%H:%M:%S")
+        if st.session_state.api_response:
+            st.warning(f"API indisponível desde {desde}. Exibindo os últimos dados recebidos.", icon="⏳")
+        else:
+            st.error(f"API indisponível desde {desde}. Nenhum dado recebido ainda.", icon="🔥")
 
-        if new_data != old_data:
-            st.session_state.api_response = new_data
-            st.rerun()
+    # Pastas que não responderam dentro do prazo no scan (compartilhamento lento)
+    desconhecidos = st.session_state.api_response.get("diretorios_desconhecidos") if st.session_state.api_response else None
+    if desconhecidos:
+        st.caption(f"⏳ {desconhecidos} pasta(s) não responderam a tempo; os números delas são da última leitura.")
 
-    except requests.exceptions.RequestException as e:
-        st.toast(f"Erro ao conectar na API: {e}", icon="🔥")
-    except Exception as e:
-        st.toast(f"Erro ao processar dados da API no fragment: {e}", icon="⚠️")
+    if mudou:
+        st.rerun()
 
 # =============================================================================
 # 8. APLICAÇÃO PRINCIPAL (MAIN)
@@ -801,32 +997,37 @@ def main():
         show_pdf_popup(st.session_state.pdf_file)
 
     # --- Carregamento e Preparação de Dados Estáticos ---
-    df_principal = carregar_dados_principais()
-
-    # --- Normaliza os responsaveis --- 
-    df_principal["RESPONSAVEL"] = df_principal["RESPONSAVEL"].apply(normalizar_responsavel)
+    df_principal, indice_resp = carregar_dados_principais()
 
     # --- Renderização da Sidebar ---
-    setores_sel, resp_sel, mes_sel = render_sidebar(df_principal)
+    setores_sel, resp_sel, mes_sel = render_sidebar(df_principal, indice_resp)
 
-    # --- Fragmento de Busca de Dados (ATUALIZA o st.session_state.api_response) ---
+    # --- Fragmento de Dados da API (aponta st.session_state.api_response para a cópia compartilhada) ---
     fetch_api_fragment(mes_sel)
 
     # --- Junção de Dados Dinâmicos ---
     # Pega os dados mais recentes da API (do session_state)
     api_data = st.session_state.get('api_response', {})
     
-    # Chama sua função para mesclar os dados estáticos com os da API
-    df_finalziado = processar_merge_api(df_principal, api_data)
+    # Mescla os dados estáticos com os da API (memoizado por mês + versão do relatório:
+    # reruns de widgets reaproveitam o DataFrame já mesclado)
+    if 'merge_memo' not in st.session_state:
+        st.session_state.merge_memo = MergeMemoizado()
+    df_finalziado = st.session_state.merge_memo.obter(
+        df_principal,
+        api_data,
+        mes=st.session_state.get('api_mes'),
+        versao_payload=st.session_state.get('api_etag'),
+    )
 
     # --- Renderização das Abas ---
     tabs = st.tabs(['Dashboard', 'BI & Análise'])
     
     with tabs[0]:
-        render_dashboard_tab(df_finalziado, setores_sel, resp_sel, mes_sel)
+        render_dashboard_tab(df_finalziado, setores_sel, resp_sel, mes_sel, indice_resp)
         
     with tabs[1]:
-        render_bi_tab(df_finalziado, setores_sel, resp_sel, mes_sel)
+        render_bi_tab(df_finalziado, setores_sel, resp_sel, mes_sel, indice_resp)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,100 @@
+# src/api_client.py
+# Cliente HTTP da API compartilhado pelo processo: pool de conexões, timeouts,
+# retentativas com backoff e circuit breaker
+
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class CircuitoAberto(requests.exceptions.ConnectionError):
+    """A API falhou seguidas vezes; nenhuma requisição é feita até o circuito fechar."""
+
+
+class ClienteAPI:
+    """
+    Uma requests.Session com pool de conexões (keep-alive entre polls e sessões).
+
+    - timeout: (conexão, leitura) em segundos, aplicado a toda requisição sem timeout explícito.
+    - tentativas/backoff: retentativas do urllib3 com espera exponencial
+      (backoff * 2^n) para falhas de conexão e 502/503/504.
+    - Circuit breaker: depois de 'limite_falhas' falhas seguidas, o circuito
+      abre e get() levanta CircuitoAberto sem tocar na rede por 'tempo_aberto'
+      segundos; depois disso uma requisição de teste é liberada e, se der
+      certo, o circuito fecha.
+    """
+
+    def __init__(self, timeout=(3.05, 30), tentativas=3, backoff=0.5, limite_falhas=3, tempo_aberto=30, conexoes=10):
+        self.timeout = timeout
+        self.limite_falhas = limite_falhas
+        self.tempo_aberto = tempo_aberto
+
+        retry = Retry(
+            total=tentativas,
+            connect=tentativas,
+            read=1,
+            status=tentativas,
+            backoff_factor=backoff,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"GET"}),
+            raise_on_status=False,
+        )
+        adaptador = HTTPAdapter(pool_connections=conexoes, pool_maxsize=conexoes, max_retries=retry)
+        self.sessao = requests.Session()
+        self.sessao.mount("http://", adaptador)
+        self.sessao.mount("https://", adaptador)
+
+        self.falhas = 0
+        self.aberto_ate = 0.0
+        self.ultimo_erro = None
+        self._testando = False
+        self._lock = threading.Lock()
+
+    @property
+    def saudavel(self):
+        return self.falhas < self.limite_falhas
+
+    def _liberar(self):
+        """
+        Decide se a requisição pode sair (circuito fechado, ou a única de teste).
+        Retorna True se ela é a requisição de teste.
+        """
+        with self._lock:
+            if self.saudavel:
+                return False
+            if time.monotonic() < self.aberto_ate or self._testando:
+                raise CircuitoAberto(f"API indisponível ({self.ultimo_erro}); nova tentativa em breve")
+            self._testando = True
+            return True
+
+    def _registrar(self, erro):
+        with self._lock:
+            self._testando = False
+            if erro is None:
+                self.falhas = 0
+                self.ultimo_erro = None
+                return
+            self.falhas += 1
+            self.ultimo_erro = erro
+            if self.falhas >= self.limite_falhas:
+                self.aberto_ate = time.monotonic() + self.tempo_aberto
+
+    def get(self, url, **kwargs):
+        teste = self._liberar()
+        kwargs.setdefault("timeout", self.timeout)
+        try:
+            response = self.sessao.get(url, **kwargs)
+            # Erro do servidor conta como falha; 4xx é problema da requisição, não da API
+            self._registrar(f"HTTP {response.status_code}" if response.status_code >= 500 else None)
+            return response
+        except requests.exceptions.RequestException as e:
+            self._registrar(e)
+            raise
+        finally:
+            # Qualquer outra exceção não pode deixar o circuito preso em "testando"
+            if teste:
+                with self._lock:
+                    self._testando = False
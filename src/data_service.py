@@ -1,9 +1,71 @@
 # src/data_service.py
 # Lógica de dados, API e JSON
 
+import json
+import os
+from collections import OrderedDict
+from typing import NamedTuple
+
+import numpy as np
 import pandas as pd
 import streamlit as st
 
+from src.utils import normalizar_responsavel, limpar_id_item
+
+def carregar_catalogo(caminho):
+    """
+    Lê o data.json e normaliza RESPONSAVEL e ITEM (sem cache; ver carregar_dados_principais).
+    A versão do arquivo (mtime + tamanho) fica em df.attrs["versao"], usada
+    como chave do MergeMemoizado. ID_CATALOGO numera as linhas e sobrevive ao
+    merge com a API (é a chave do IndiceResponsaveis).
+    """
+    with open(caminho, 'r', encoding="utf-8") as f:
+        item_map = json.load(f)
+        st_arquivo = os.fstat(f.fileno())
+    df = pd.DataFrame.from_dict(item_map, orient="index").reset_index(drop=True)
+    if not df.empty:
+        df["RESPONSAVEL"] = df["RESPONSAVEL"].apply(normalizar_responsavel)
+        df["ITEM"] = df["ITEM"].apply(limpar_id_item)
+    df["ID_CATALOGO"] = np.arange(len(df))
+    df.attrs["versao"] = f"{st_arquivo.st_mtime_ns}-{st_arquivo.st_size}"
+    return df
+
+class IndiceResponsaveis:
+    """
+    Índice invertido responsável -> linhas do catálogo (ID_CATALOGO), montado
+    uma vez junto com o catálogo. Os pares (ID_CATALOGO, RESPONSAVEL) ficam
+    num DataFrame com RESPONSAVEL categórico, e cada responsável já tem o
+    array das suas linhas: os filtros viram um isin vetorizado, sem
+    percorrer as listas de RESPONSAVEL linha a linha.
+    """
+
+    def __init__(self, df_catalogo):
+        if df_catalogo.empty or "RESPONSAVEL" not in df_catalogo.columns:
+            pares = pd.DataFrame({"ID_CATALOGO": [], "RESPONSAVEL": []})
+        else:
+            pares = df_catalogo[["ID_CATALOGO", "RESPONSAVEL"]].explode("RESPONSAVEL").dropna()
+        self.pares = pd.DataFrame({
+            "ID_CATALOGO": pares["ID_CATALOGO"].to_numpy(dtype=np.int64),
+            "RESPONSAVEL": pd.Categorical(pares["RESPONSAVEL"]),
+        })
+        self.nomes = sorted(self.pares["RESPONSAVEL"].cat.categories)
+        self._linhas = {
+            nome: ids.to_numpy()
+            for nome, ids in self.pares.groupby("RESPONSAVEL", observed=True)["ID_CATALOGO"]
+        }
+
+    def linhas(self, nomes):
+        """ID_CATALOGO das linhas de QUALQUER um dos responsáveis."""
+        arrays = [self._linhas[n] for n in nomes if n in self._linhas]
+        if not arrays:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(arrays))
+
+    def filtrar(self, df, nomes):
+        """Linhas de 'df' (catálogo ou já mesclado) atribuídas a algum dos responsáveis."""
+        return df[df["ID_CATALOGO"].isin(self.linhas(nomes))]
+
+
 def processar_merge_api(df_principal, api_data):
     """
     Extrai 'status', 'soma_total' (PERCENTUAL) e 'diretorios' da API
@@ -70,4 +132,99 @@ def processar_merge_api(df_principal, api_data):
         if 'DIRETORIOS' not in df_principal.columns:
             df_principal['DIRETORIOS'] = [[]] * len(df_principal)
         return df_principal
-    
\ No newline at end of file
+
+
+class MergeMemoizado:
+    """
+    Guarda o resultado de processar_merge_api por (mês, versão do catálogo,
+    versão do payload), para que reruns sem mudança (cliques em widgets)
+    reaproveitem o DataFrame já mesclado. A versão do payload é o ETag/token
+    da API; sem ele, a identidade do objeto (o fragmento troca o objeto
+    inteiro quando o relatório muda), nunca um hash do dicionário aninhado.
+
+    Limitado a 'max_entradas'; entradas de meses que não são o atual são
+    descartadas a cada consulta.
+    """
+
+    def __init__(self, max_entradas=3):
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()  # chave -> (api_data, df_merged)
+
+    def obter(self, df_principal, api_data, mes, versao_payload=None):
+        chave = (mes, df_principal.attrs.get("versao"), versao_payload or id(api_data))
+
+        for antiga in [c for c in self._entradas if c[0] != mes]:
+            del self._entradas[antiga]
+
+        entrada = self._entradas.get(chave)
+        # Sem versão, o id só vale enquanto for o mesmo objeto (a entrada guarda a referência)
+        if entrada is not None and (versao_payload or entrada[0] is api_data):
+            self._entradas.move_to_end(chave)
+            return entrada[1]
+
+        df_merged = processar_merge_api(df_principal, api_data)
+        self._entradas[chave] = (api_data, df_merged)
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+        return df_merged
+
+
+class IndiceItens(NamedTuple):
+    detalhes: dict   # item_codigo -> detalhes do item no relatório da API
+    pendentes: dict  # item_codigo -> diretórios com qtd == 0 (só itens que têm algum; no enxuto, sem 'itens')
+
+
+def indexar_itens(api_data):
+    """
+    Indexa o relatório da API por código de item, numa única passada. Se o
+    mesmo código aparece em mais de um setor, vale o primeiro (como na busca
+    linear que isto substitui).
+    """
+    itens_por_setor = api_data.get('result', api_data) if isinstance(api_data, dict) else {}
+    detalhes_por_item = {}
+    pendentes = {}
+
+    for itens in itens_por_setor.values():
+        if not isinstance(itens, dict):
+            continue
+        for item_codigo, detalhes in itens.items():
+            if not detalhes or item_codigo in detalhes_por_item:
+                continue
+            detalhes_por_item[item_codigo] = detalhes
+            if 'diretorios' in detalhes:
+                diretorios_pendentes = [d for d in detalhes['diretorios'] if d.get("qtd", 0) == 0]
+            else:
+                # Relatório enxuto: só os nomes das pastas vazias
+                diretorios_pendentes = [
+                    {"diretorio": nome, "qtd": 0, "itens": []}
+                    for nome in detalhes.get('diretorios_pendentes', [])
+                ]
+            if diretorios_pendentes:
+                pendentes[item_codigo] = diretorios_pendentes
+
+    return IndiceItens(detalhes_por_item, pendentes)
+
+
+def aplicar_mudancas(api_data, delta):
+    """
+    Aplica um delta de /sms/changes sobre o relatório já em cache e retorna
+    um novo dicionário (o original não é alterado). Só as categorias tocadas
+    pelo delta são copiadas. Com 'cabecalho', os campos fora de 'result'
+    (ex.: diretorios_desconhecidos) passam a ser exatamente os do delta.
+    """
+    resultado = dict(api_data.get('result', {}))
+
+    for setor_nome, itens in delta.get('mudancas', {}).items():
+        itens_setor = dict(resultado.get(setor_nome, {}))
+        itens_setor.update(itens)
+        resultado[setor_nome] = itens_setor
+
+    for setor_nome, item_codigo in delta.get('removidos', []):
+        if item_codigo in resultado.get(setor_nome, {}):
+            itens_setor = dict(resultado[setor_nome])
+            del itens_setor[item_codigo]
+            resultado[setor_nome] = itens_setor
+
+    novo = dict(delta['cabecalho']) if 'cabecalho' in delta else dict(api_data)
+    novo['result'] = resultado
+    return novo
@@ -0,0 +1,99 @@
+# src/embutido.py
+# Modo embutido: o scanner do API/ roda no próprio processo do dashboard,
+# sem o salto HTTP nem a serialização do relatório
+
+import itertools
+import sys
+import time
+from os import getenv
+from pathlib import Path
+from urllib.parse import unquote
+
+from src.poller import EstadoMes, PollerMes
+
+API_DIR = Path(__file__).resolve().parent.parent / "API"
+
+# Versões dos relatórios embutidos: um contador único no processo, para que um
+# poller recriado depois de ocioso nunca repita a versão de outro relatório
+_versoes = itertools.count(1)
+
+
+def _importar_api():
+    """Os módulos do API/ usam imports planos (rodam com API/ como diretório atual)."""
+    if str(API_DIR) not in sys.path:
+        sys.path.insert(0, str(API_DIR))
+
+
+class ScannerEmbutido:
+    """
+    O que o serviço FastAPI mantém entre requisições, no processo do dashboard:
+    cache das listagens (só diretórios alterados são relidos), gabarito
+    compilado (IDF_GABARITO), prazo por diretório (IDF_ORCAMENTO_DIRETORIO) e
+    o cruzamento com o catálogo usado no resumo.
+    """
+
+    def __init__(self, raiz):
+        _importar_api()
+        from folder_analyzer import montar_relatorio_sms
+        from gabarito import carregar_gabarito
+        from resumo import CacheCruzamentos, Catalogo
+        from scan_cache import ScanCache
+
+        self.raiz = Path(raiz)
+        self._montar = montar_relatorio_sms
+        self.cache = ScanCache()
+        self.gabarito = carregar_gabarito(getenv("IDF_GABARITO")) if getenv("IDF_GABARITO") else None
+        self.orcamento_diretorio = float(getenv("IDF_ORCAMENTO_DIRETORIO", "5")) or None
+        self.cruzamentos = CacheCruzamentos(Catalogo(getenv("IDF_CATALOGO")) if getenv("IDF_CATALOGO") else Catalogo())
+
+    def caminho_mes(self, api_month_value):
+        return self.raiz / unquote(api_month_value)
+
+    def montar(self, api_month_value):
+        base_path = self.caminho_mes(api_month_value)
+        if not base_path.exists():
+            raise FileNotFoundError(f"O mês '{unquote(api_month_value)}' não foi encontrado em {base_path}")
+        return self._montar(
+            base_path, cache=self.cache, gabarito=self.gabarito, orcamento_diretorio=self.orcamento_diretorio
+        )
+
+    def resumir(self, api_month_value, versao, relatorio, setores=(), responsaveis=()):
+        """Mesmos agregados do /sms/summary, cruzados uma vez por versão do relatório."""
+        from resumo import resumir
+
+        cruzado = self.cruzamentos.obter(api_month_value, versao, relatorio)
+        return resumir(cruzado, setores, responsaveis)
+
+
+class PollerEmbutido(PollerMes):
+    """
+    PollerMes que, em vez de chamar a API, roda montar_relatorio_sms nesta
+    thread a cada 'intervalo_polling' segundos. O relatório novo só substitui
+    o anterior se o conteúdo mudou, e as sessões o leem como objeto Python.
+    A mudança é detectada comparando os objetos (sem serializar o relatório),
+    e cada versão nova ganha um número do contador do processo (o resumo é
+    cacheado por versão).
+    """
+
+    def __init__(self, api_month_value, scanner, intervalo_verificacao=2, intervalo_polling=30, ttl_ocioso=120):
+        self.scanner = scanner
+        super().__init__(
+            api_month_value,
+            urls=None,
+            cliente=None,
+            intervalo_verificacao=intervalo_verificacao,
+            intervalo_polling=intervalo_polling,
+            ttl_ocioso=ttl_ocioso,
+        )
+
+    def _precisa_buscar(self):
+        if self.estado.relatorio is None:
+            return True
+        return time.monotonic() - self._ultimo_poll >= self.intervalo_polling
+
+    def _sincronizar(self):
+        relatorio = self.scanner.montar(self.api_month_value)
+        if relatorio == self.estado.relatorio:
+            return
+        versao = f"embutido-{next(_versoes)}"
+        self.estado = EstadoMes(relatorio=relatorio, etag=versao, versao=versao)
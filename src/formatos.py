@@ -0,0 +1,65 @@
+# src/formatos.py
+# Formato das respostas do /sms: pede o mais compacto disponível e decodifica
+
+import json
+
+try:
+    import msgpack
+except ImportError:  # opcional: sem ele, JSON
+    msgpack = None
+
+try:
+    import brotli  # noqa: F401  (o urllib3 usa para decodificar 'br')
+    _BROTLI = True
+except ImportError:
+    _BROTLI = False
+
+MSGPACK = "application/x-msgpack"
+ESQUEMA_COMPACTO = "compacto-1"
+
+
+def cabecalhos_negociacao():
+    """Accept/Accept-Encoding pedindo o formato mais compacto que este cliente sabe ler."""
+    return {
+        "Accept": f"{MSGPACK}, application/json;q=0.9" if msgpack is not None else "application/json",
+        "Accept-Encoding": "br, gzip" if _BROTLI else "gzip",
+    }
+
+
+def decodificar(response):
+    """Corpo da resposta como dicionário (msgpack ou JSON; a descompressão é do requests)."""
+    if msgpack is not None and response.headers.get("Content-Type", "").startswith(MSGPACK):
+        return msgpack.unpackb(response.content, raw=False)
+    return json.loads(response.content)
+
+
+def _expandir_diretorio(segmentos, caminho, qtd, arquivos, desconhecido=False):
+    diretorio = {"diretorio": "/".join(segmentos[i] for i in caminho), "qtd": qtd, "itens": arquivos}
+    if desconhecido:
+        diretorio["desconhecido"] = True
+    return diretorio
+
+
+def expandir_compacto(relatorio):
+    """
+    Converte um relatório no esquema compacto (segmentos dos caminhos numa
+    tabela, diretórios como [segmentos, qtd, itens] ou [segmentos, qtd, itens, true]
+    se desconhecido) de volta ao formato normal.
+    Relatórios no formato normal são devolvidos sem alteração.
+    """
+    if not isinstance(relatorio, dict) or relatorio.get("esquema") != ESQUEMA_COMPACTO:
+        return relatorio
+
+    segmentos = relatorio["segmentos"]
+    resultado = {}
+    for categoria, itens in relatorio.get("result", {}).items():
+        resultado[categoria] = {}
+        for item_id, item in itens.items():
+            novo = dict(item)
+            if "diretorios" in item:
+                novo["diretorios"] = [_expandir_diretorio(segmentos, *d) for d in item["diretorios"]]
+            resultado[categoria][item_id] = novo
+
+    expandido = {k: v for k, v in relatorio.items() if k not in ("esquema", "segmentos")}
+    expandido["result"] = resultado
+    return expandido
@@ -0,0 +1,73 @@
+# src/notificacoes.py
+# Cliente do /sms/stream (Server-Sent Events) compartilhado pelas sessões
+
+import json
+import threading
+import time
+
+import requests
+
+
+class OuvinteSSE:
+    """
+    Mantém uma conexão SSE com o /sms/stream de um mês numa thread de fundo e
+    guarda o token da última versão anunciada. Reconecta com espera crescente
+    e encerra sozinho quando nenhuma sessão consulta o mês por 'ttl_ocioso' segundos.
+    """
+
+    def __init__(self, url, ttl_ocioso=300):
+        self.url = url
+        self.ttl_ocioso = ttl_ocioso
+        self.versao = None
+        self.conectado = False
+        self.ultimo_uso = time.monotonic()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    @property
+    def ativo(self):
+        return self._thread.is_alive()
+
+    def tocar(self):
+        self.ultimo_uso = time.monotonic()
+
+    def _ocioso(self):
+        return time.monotonic() - self.ultimo_uso > self.ttl_ocioso
+
+    def _loop(self):
+        espera = 1
+        while not self._ocioso():
+            try:
+                # Timeout de leitura maior que o keep-alive do servidor (15s)
+                with requests.get(self.url, stream=True, timeout=(5, 45)) as response:
+                    response.raise_for_status()
+                    self.conectado = True
+                    espera = 1
+                    for linha in response.iter_lines(decode_unicode=True):
+                        if linha and linha.startswith("data:"):
+                            self.versao = json.loads(linha[5:]).get("versao")
+                        if self._ocioso():
+                            break
+            except (requests.exceptions.RequestException, ValueError):
+                pass
+            self.conectado = False
+            time.sleep(espera)
+            espera = min(espera * 2, 60)
+
+
+class RegistroOuvintes:
+    """Um OuvinteSSE por mês, criado sob demanda e recriado se tiver encerrado."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self._ouvintes = {}
+        self._lock = threading.Lock()
+
+    def obter(self, api_month_value):
+        with self._lock:
+            ouvinte = self._ouvintes.get(api_month_value)
+            if ouvinte is None or not ouvinte.ativo:
+                ouvinte = OuvinteSSE(self.base_url + api_month_value)
+                self._ouvintes[api_month_value] = ouvinte
+        ouvinte.tocar()
+        return ouvinte
@@ -0,0 +1,156 @@
+# src/poller.py
+# Um poller por mês, compartilhado por todas as sessões do processo Streamlit
+
+import threading
+import time
+from datetime import datetime
+from typing import Any, NamedTuple
+
+import requests
+
+from src.data_service import aplicar_mudancas
+from src.formatos import cabecalhos_negociacao, decodificar, expandir_compacto
+
+
+class EstadoMes(NamedTuple):
+    """Foto imutável do relatório de um mês; trocada inteira a cada versão nova."""
+    relatorio: Any = None
+    etag: str | None = None
+    versao: str | None = None
+    falha_desde: datetime | None = None  # primeira falha desde o último sucesso
+    erro: str | None = None
+
+
+class PollerMes:
+    """
+    Thread de fundo que mantém o relatório de um mês atualizado para todas as
+    sessões: a primeira busca traz o relatório completo (GET /sms condicional)
+    e as seguintes pedem só o que mudou (/sms/changes). Com o push (SSE)
+    conectado, só busca quando uma versão nova é anunciada; sem ele, a cada
+    'intervalo_polling' segundos. Encerra sozinho quando nenhuma sessão
+    consulta o mês por 'ttl_ocioso' segundos.
+    """
+
+    def __init__(self, api_month_value, urls, cliente, ouvintes=None, enxuto=True,
+                 intervalo_verificacao=2, intervalo_polling=30, ttl_ocioso=120):
+        self.api_month_value = api_month_value
+        self.urls = urls  # {"sms": ..., "changes": ...}, terminando em "month="
+        self.cliente = cliente
+        self.ouvintes = ouvintes
+        self.enxuto = enxuto
+        self.intervalo_verificacao = intervalo_verificacao
+        self.intervalo_polling = intervalo_polling
+        self.ttl_ocioso = ttl_ocioso
+
+        self.estado = EstadoMes()
+        self.carregado = threading.Event()  # primeira tentativa concluída (com ou sem sucesso)
+        self.ultimo_uso = time.monotonic()
+        self._ultimo_poll = 0.0
+        self._thread = threading.Thread(target=self._loop, daemon=True, name=f"poller-{api_month_value}")
+        self._thread.start()
+
+    @property
+    def ativo(self):
+        return self._thread.is_alive()
+
+    def tocar(self):
+        self.ultimo_uso = time.monotonic()
+
+    def _ocioso(self):
+        return time.monotonic() - self.ultimo_uso > self.ttl_ocioso
+
+    def _loop(self):
+        while not self._ocioso():
+            try:
+                if self._precisa_buscar():
+                    self._sincronizar()
+                    self._ultimo_poll = time.monotonic()
+                if self.estado.falha_desde is not None:
+                    self.estado = self.estado._replace(falha_desde=None, erro=None)
+            except (requests.exceptions.RequestException, OSError, ValueError) as e:
+                if self.estado.falha_desde is None:
+                    self.estado = self.estado._replace(falha_desde=datetime.now())
+                self.estado = self.estado._replace(erro=str(e))
+            self.carregado.set()
+            time.sleep(self.intervalo_verificacao)
+
+    def _precisa_buscar(self):
+        if self.estado.relatorio is None:
+            return True
+        ouvinte = self.ouvintes.obter(self.api_month_value) if self.ouvintes is not None else None
+        if ouvinte is not None and ouvinte.conectado:
+            # Push ativo: nada a fazer enquanto a versão anunciada for a que já temos
+            return ouvinte.versao not in (None, self.estado.versao)
+        return time.monotonic() - self._ultimo_poll >= self.intervalo_polling
+
+    def _sincronizar(self):
+        if self.estado.versao is None:
+            self._buscar_relatorio_completo()
+        else:
+            self._buscar_mudancas()
+
+    def _buscar_relatorio_completo(self):
+        """GET /sms condicional, no formato mais compacto disponível."""
+        headers = cabecalhos_negociacao()
+        if self.estado.etag:
+            headers["If-None-Match"] = self.estado.etag
+
+        params = {"formato": "compacto", "slim": str(self.enxuto).lower()}
+        response = self.cliente.get(self.urls["sms"] + self.api_month_value, headers=headers, params=params)
+        if response.status_code == 304:
+            return
+        response.raise_for_status()
+        relatorio = expandir_compacto(decodificar(response).get("result", {}))
+
+        # Sem ETag (API antiga), ainda é preciso comparar o conteúdo: o objeto
+        # só é trocado quando muda, e é pela identidade dele que as sessões
+        # percebem a versão nova
+        if response.headers.get("ETag") is None and relatorio == self.estado.relatorio:
+            return
+        self.estado = EstadoMes(
+            relatorio=relatorio,
+            etag=response.headers.get("ETag"),
+            versao=response.headers.get("X-Versao-Relatorio"),
+        )
+
+    def _buscar_mudancas(self):
+        """GET /sms/changes: aplica só os itens alterados sobre a foto atual."""
+        response = self.cliente.get(
+            self.urls["changes"] + self.api_month_value,
+            params={"since": self.estado.versao, "slim": str(self.enxuto).lower()},
+        )
+        if response.status_code == 304:
+            return
+        response.raise_for_status()
+        payload = response.json()
+        if payload.get("status") != "ok":
+            return
+
+        if payload["tipo"] == "delta":
+            relatorio = aplicar_mudancas(self.estado.relatorio, payload)
+        else:
+            relatorio = payload.get("result", {})
+        self.estado = EstadoMes(relatorio=relatorio, etag=payload.get("etag"), versao=payload.get("versao"))
+
+
+class RegistroPollers:
+    """
+    Um poller por mês, criado sob demanda e recriado se tiver encerrado por
+    ociosidade. 'fabrica' é a classe do poller (PollerMes busca na API via
+    HTTP; ver src/embutido.py para o scan no próprio processo).
+    """
+
+    def __init__(self, fabrica=PollerMes, **opcoes):
+        self.fabrica = fabrica
+        self.opcoes = opcoes
+        self._pollers = {}
+        self._lock = threading.Lock()
+
+    def obter(self, api_month_value):
+        with self._lock:
+            poller = self._pollers.get(api_month_value)
+            if poller is None or not poller.ativo:
+                poller = self.fabrica(api_month_value, **self.opcoes)
+                self._pollers[api_month_value] = poller
+        poller.tocar()
+        return poller
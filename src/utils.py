@@ -1,5 +1,13 @@
 # src/utils
 # Funções auxiliares (Helpers, formatadores)
+# Só biblioteca padrão: a API também importa daqui (API/resumo.py), para o
+# dashboard e o /sms/summary normalizarem o catálogo do mesmo jeito.
+
+# Padrões de status (para texto em minúsculas ou busca sem distinção de caixa)
+PADRAO_CONCLUIDO = "concluído|concluido"
+PADRAO_ANDAMENTO = "em andamento|execução"
+PADRAO_NAO_INICIADO = "não iniciado|não enviado"
+
 
 def normalizar_responsavel(x):
     """Transforma a coluna 'RESPONSAVEL' em uma lista limpa."""